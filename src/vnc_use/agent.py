@@ -1,22 +1,101 @@
 """LangGraph agent for VNC Computer Use."""
 
 import asyncio
+import functools
 import logging
 import time
-from collections.abc import Awaitable, Callable
+from collections.abc import Awaitable, Callable, Iterator
 from typing import Any
 
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 from langgraph.graph import END, START, StateGraph
+from langgraph.graph.state import CompiledStateGraph
 from langgraph.types import interrupt
 
 from .backends.vnc import VNCController
 from .logging_utils import RunLogger
 from .safety import HITLGate, requires_confirmation, should_block
-from .types import CUAState
+from .types import ActionResult, CUAState, StepLog
 
 
 logger = logging.getLogger(__name__)
 
+# Number of most recent actions sent to the planner as text context. Older
+# entries stay in state (and the run report) but are not re-sent every step.
+# Planners send the history they are given as-is, so this is the only window.
+ACTION_HISTORY_WINDOW = 10
+
+
+def _bound_agent(config: RunnableConfig) -> "VncUseAgent":
+    """Get the agent instance bound to a graph run.
+
+    Args:
+        config: Run config passed to graph nodes
+
+    Returns:
+        Agent that invoked the graph
+    """
+    return config["configurable"]["agent"]
+
+
+def _agent_node(name: str, method: str, async_method: str) -> RunnableLambda:
+    """Create a graph node that dispatches to the bound agent's methods.
+
+    Methods are looked up at call time, so per-instance overrides (such as
+    the MCP server's streaming wrappers) apply without recompiling the graph.
+
+    Args:
+        name: Node name
+        method: Agent method used by graph.invoke()
+        async_method: Agent coroutine method used by graph.ainvoke()
+
+    Returns:
+        Runnable with both sync and async implementations
+    """
+
+    def node(state: CUAState, config: RunnableConfig) -> dict:
+        return getattr(_bound_agent(config), method)(state)
+
+    async def async_node(state: CUAState, config: RunnableConfig) -> dict:
+        return await getattr(_bound_agent(config), async_method)(state)
+
+    return RunnableLambda(node, afunc=async_node, name=name)
+
+
+def _route_after_propose(state: CUAState, config: RunnableConfig) -> str:
+    return _bound_agent(config)._route_after_propose(state)
+
+
+def _route_after_hitl(state: CUAState, config: RunnableConfig) -> str:
+    return _bound_agent(config)._route_after_hitl(state)
+
+
+@functools.cache
+def build_graph() -> CompiledStateGraph:
+    """Build the LangGraph state machine.
+
+    The topology is identical for every agent, so the graph is compiled once
+    per process. Nodes resolve the agent from ``config["configurable"]["agent"]``.
+
+    Returns:
+        Compiled graph
+    """
+    builder = StateGraph(CUAState)
+
+    # Add nodes (sync implementations serve invoke(), async ones ainvoke())
+    builder.add_node("propose", _agent_node("propose", "_propose_node", "_apropose_node"))
+    builder.add_node("act", _agent_node("act", "_act_node", "_aact_node"))
+    builder.add_node("hitl_gate", _agent_node("hitl_gate", "_hitl_gate_node", "_ahitl_gate_node"))
+
+    # Add edges
+    builder.add_edge(START, "propose")
+    builder.add_conditional_edges("propose", _route_after_propose)
+    builder.add_conditional_edges("hitl_gate", _route_after_hitl)
+    builder.add_edge("act", "propose")
+
+    # Compile without checkpointer for now (TODO: fix checkpointing)
+    return builder.compile()
+
 
 class VncUseAgent:
     """VNC Computer Use Agent powered by Gemini and LangGraph.
@@ -101,39 +180,37 @@ class VncUseAgent:
         self.hitl_gate = HITLGate()
         self.run_logger: RunLogger | None = None  # Set during run()
 
-        # Build graph
-        self.graph = self._build_graph()
+        # Shared compiled graph; this instance is bound per run via the config
+        self.graph = build_graph()
+
+    def _propose_node(self, state: CUAState) -> dict:
+        """Propose node: Call Gemini to get next actions.
 
-    def _build_graph(self) -> StateGraph:
-        """Build LangGraph state machine.
+        Args:
+            state: Current state
 
         Returns:
-            Compiled graph
+            State updates
         """
-        builder = StateGraph(CUAState)
-
-        # Add nodes
-        builder.add_node("propose", self._propose_node)
-        builder.add_node("act", self._act_node)
-        builder.add_node("hitl_gate", self._hitl_gate_node)
-
-        # Add edges
-        builder.add_edge(START, "propose")
-        builder.add_conditional_edges(
-            "propose",
-            self._route_after_propose,
-        )
-        builder.add_conditional_edges(
-            "hitl_gate",
-            self._route_after_hitl,
-        )
-        builder.add_edge("act", "propose")
+        guard = self._check_propose_guards(state)
+        if guard is not None:
+            return guard
+
+        # Call Gemini with stateless approach
+        try:
+            response = self.planner.generate_stateless(
+                task=state["task"],
+                action_history=state["action_history"][-ACTION_HISTORY_WINDOW:],
+                screenshot_png=state["last_screenshot_png"],
+            )
+            return self._process_proposal(state, response)
 
-        # Compile without checkpointer for now (TODO: fix checkpointing)
-        return builder.compile()
+        except Exception as e:
+            logger.error(f"Propose failed: {e}")
+            return {"done": True, "error": str(e)}
 
-    def _propose_node(self, state: CUAState) -> dict:
-        """Propose node: Call Gemini to get next actions.
+    async def _apropose_node(self, state: CUAState) -> dict:
+        """Async propose node: Call the planner without blocking the event loop.
 
         Args:
             state: Current state
@@ -141,80 +218,100 @@ class VncUseAgent:
         Returns:
             State updates
         """
+        guard = self._check_propose_guards(state)
+        if guard is not None:
+            return guard
+
+        try:
+            response = await self.planner.agenerate_stateless(
+                task=state["task"],
+                action_history=state["action_history"][-ACTION_HISTORY_WINDOW:],
+                screenshot_png=state["last_screenshot_png"],
+            )
+            return self._process_proposal(state, response)
+
+        except Exception as e:
+            logger.error(f"Propose failed: {e}")
+            return {"done": True, "error": str(e)}
+
+    def _check_propose_guards(self, state: CUAState) -> dict | None:
+        """Check step/time limits and screenshot availability before proposing.
+
+        Args:
+            state: Current state
+
+        Returns:
+            Terminal state updates if a guard tripped, None otherwise
+        """
         step = state["step"]
         logger.info(f"Step {step}: Proposing actions...")
 
         # Check guards
-        elapsed = time.time() - state["start_time"]
         if step >= self.step_limit:
             logger.warning(f"Step limit reached: {step}/{self.step_limit}")
             return {"done": True, "error": f"Step limit reached: {self.step_limit}"}
 
-        if elapsed >= self.seconds_timeout:
-            logger.warning(f"Timeout reached: {elapsed:.1f}s/{self.seconds_timeout}s")
+        if time.monotonic() >= state["deadline"]:
+            logger.warning(f"Timeout reached: {self.seconds_timeout}s")
             return {"done": True, "error": f"Timeout reached: {self.seconds_timeout}s"}
 
         # Get current screenshot
-        screenshot_png = state.get("last_screenshot_png")
-        if not screenshot_png:
+        if not state.get("last_screenshot_png"):
             logger.error("No screenshot available")
             return {"done": True, "error": "No screenshot available"}
 
-        # Call Gemini with stateless approach
-        try:
-            response = self.planner.generate_stateless(
-                task=state["task"],
-                action_history=state["action_history"],
-                screenshot_png=screenshot_png,
-            )
+        return None
+
+    def _process_proposal(self, state: CUAState, response: Any) -> dict:
+        """Turn a planner response into propose-node state updates.
+
+        Args:
+            state: Current state
+            response: Raw planner response
 
-            # Extract text observation/reasoning
-            observation = self.planner.extract_text(response)
-            logger.debug(f"Model observation: {observation[:100]}...")
-
-            # Extract function calls
-            function_calls = self.planner.extract_function_calls(response)
-            logger.info(f"Received {len(function_calls)} function call(s)")
-
-            # Extract safety decision
-            safety_decision = self.planner.extract_safety_decision(response)
-            if safety_decision:
-                logger.info(f"Safety decision received: {safety_decision}")
-
-            if not function_calls:
-                logger.info("No function calls - task complete")
-                return {
-                    "done": True,
-                    "pending_calls": [],
-                    "safety": safety_decision,
-                    "observation": observation,
-                }
-
-            # Check for blocking safety decision
-            if should_block(safety_decision):
-                reason = safety_decision.get("reason", "Unknown")
-                logger.warning(f"Action blocked by safety: {reason}")
-                return {
-                    "done": True,
-                    "error": f"Blocked by safety: {reason}",
-                    "safety": safety_decision,
-                    "observation": observation,
-                }
+        Returns:
+            State updates
+        """
+        step = state["step"]
 
+        # Extract text observation/reasoning, function calls and safety decision
+        observation, function_calls, safety_decision = self.planner.extract_all(response)
+        logger.debug(f"Model observation: {observation[:100]}...")
+        logger.info(f"Received {len(function_calls)} function call(s)")
+
+        if safety_decision:
+            logger.info(f"Safety decision received: {safety_decision}")
+
+        if not function_calls:
+            logger.info("No function calls - task complete")
             return {
-                "pending_calls": function_calls,
+                "done": True,
+                "pending_calls": [],
                 "safety": safety_decision,
-                "step": step + 1,
                 "observation": observation,
-                "proposed_actions": function_calls,
             }
 
-        except Exception as e:
-            logger.error(f"Propose failed: {e}")
-            return {"done": True, "error": str(e)}
+        # Check for blocking safety decision
+        if should_block(safety_decision):
+            reason = safety_decision.get("reason", "Unknown")
+            logger.warning(f"Action blocked by safety: {reason}")
+            return {
+                "done": True,
+                "error": f"Blocked by safety: {reason}",
+                "safety": safety_decision,
+                "observation": observation,
+            }
+
+        return {
+            "pending_calls": function_calls,
+            "safety": safety_decision,
+            "step": step + 1,
+            "observation": observation,
+            "proposed_actions": function_calls,
+        }
 
     def _act_node(self, state: CUAState) -> dict:
-        """Act node: Execute one pending function call.
+        """Act node: Execute the next batch of pending function calls.
 
         Args:
             state: Current state
@@ -227,107 +324,209 @@ class VncUseAgent:
             logger.warning("Act called with no pending calls")
             return {"done": True}
 
-        # Pop first call
-        call = pending[0]
-        remaining = pending[1:]
+        batch = self._next_batch(pending)
+        updates: dict[str, Any] = {"action_history": [], "step_logs": []}
+        executed = 0
+        for call in batch:
+            executed += 1
+            is_last = executed == len(batch)
+            logger.info(f"Executing: {call['name']}({call['args']})")
+
+            try:
+                result = self.vnc.execute_action(call["name"], call["args"], capture=is_last)
+            except Exception as e:
+                logger.error(f"Action failed: {e}")
+                # Still try to get screenshot for error reporting
+                screenshot = self.vnc.error_screenshot_png()
+                self._merge_act_updates(
+                    updates, self._record_action_error(state, call, e, screenshot)
+                )
+                break
+
+            self._merge_act_updates(updates, self._record_action(state, call, result))
+            if result.error:
+                break
+
+        updates["pending_calls"] = pending[executed:]
+        return updates
+
+    async def _aact_node(self, state: CUAState) -> dict:
+        """Async act node: Execute the next batch without blocking the event loop.
 
+        Args:
+            state: Current state
+
+        Returns:
+            State updates
+        """
+        pending = state["pending_calls"]
+        if not pending:
+            logger.warning("Act called with no pending calls")
+            return {"done": True}
+
+        batch = self._next_batch(pending)
+        updates: dict[str, Any] = {"action_history": [], "step_logs": []}
+        executed = 0
+        for call in batch:
+            executed += 1
+            is_last = executed == len(batch)
+            logger.info(f"Executing: {call['name']}({call['args']})")
+
+            try:
+                result = await self.vnc.execute_action_async(
+                    call["name"], call["args"], capture=is_last
+                )
+            except Exception as e:
+                logger.error(f"Action failed: {e}")
+                # Still try to get screenshot for error reporting
+                screenshot = await self.vnc.error_screenshot_png_async()
+                self._merge_act_updates(
+                    updates, self._record_action_error(state, call, e, screenshot)
+                )
+                break
+
+            self._merge_act_updates(updates, self._record_action(state, call, result))
+            if result.error:
+                break
+
+        updates["pending_calls"] = pending[executed:]
+        return updates
+
+    def _next_batch(self, pending: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Select the pending calls that can run without an observation in between.
+
+        Coordinates in a call refer to the screenshot the planner saw, so once
+        any action has run, a coordinate-targeted call needs a fresh screenshot
+        first. The batch is therefore the first call plus any following calls
+        without coordinates (e.g. key_combination, scroll_document). Remaining
+        calls are left pending for the next propose round.
+
+        Args:
+            pending: Pending function calls
+
+        Returns:
+            Calls to execute in this act visit (never empty for non-empty input)
+        """
+        batch = pending[:1]
+        for call in pending[1:]:
+            if "x" in call["args"] or "y" in call["args"]:
+                break
+            batch.append(call)
+        return batch
+
+    def _merge_act_updates(self, updates: dict[str, Any], delta: dict[str, Any]) -> None:
+        """Fold one executed call's state updates into the batch updates.
+
+        Args:
+            updates: Accumulated batch updates (modified in place)
+            delta: Updates for a single call
+        """
+        updates["action_history"].extend(delta.pop("action_history"))
+        updates["step_logs"].extend(delta.pop("step_logs"))
+        # Deferred captures are empty; keep the last real screenshot
+        screenshot = delta.pop("last_screenshot_png")
+        if screenshot or "error" in delta:
+            updates["last_screenshot_png"] = screenshot
+        updates.update(delta)
+
+    def _record_action(self, state: CUAState, call: dict[str, Any], result: ActionResult) -> dict:
+        """Build act-node state updates for an executed action.
+
+        Args:
+            state: Current state
+            call: Executed function call
+            result: Result of executing the call
+
+        Returns:
+            State updates
+        """
         function_name = call["name"]
         args = call["args"]
+        step_number = state["step"]
 
-        logger.info(f"Executing: {function_name}({args})")
+        result_text = f"Error: {result.error}" if result.error else "Success"
 
-        # Format action text
-        args_str = ", ".join(f"{k}={v}" for k, v in args.items())
-        action_text = f"Executed {function_name}({args_str})"
+        # Save screenshot after action
+        screenshot_path = None
+        if self.run_logger and result.screenshot_png:
+            path = self.run_logger.log_screenshot(
+                step_number, result.screenshot_png, f"step_{step_number:03d}_after"
+            )
+            # None when the artifact level skips this frame
+            screenshot_path = path.name if path else None
+
+        # Create step log
+        step_log = StepLog(
+            step_number=step_number,
+            observation=state.get("observation", ""),
+            proposed_actions=tuple(state.get("proposed_actions", ())),
+            executed_action={"name": function_name, "args": args},
+            result=result_text,
+            screenshot_path=screenshot_path,
+            timestamp=time.time(),
+        )
+        if self.run_logger:
+            self.run_logger.log_step(step_log)
 
-        step_number = state["step"]
+        # Add to text history
+        action_text = f"Executed {step_log.formatted_action} - {result_text}"
 
-        try:
-            # Execute action
-            result = self.vnc.execute_action(function_name, args)
+        return {
+            "last_screenshot_png": result.screenshot_png,
+            "action_history": [action_text],
+            "step_logs": [step_log],
+        }
 
-            # Add to text history
-            if result.error:
-                action_text += f" - Error: {result.error}"
-                result_text = f"Error: {result.error}"
-            else:
-                action_text += " - Success"
-                result_text = "Success"
-
-            updated_history = state["action_history"] + [action_text]
-
-            # Save screenshot after action
-            screenshot_path = None
-            if self.run_logger and result.screenshot_png:
-                path = self.run_logger.log_screenshot(
-                    step_number, result.screenshot_png, f"step_{step_number:03d}_after"
-                )
-                screenshot_path = str(path.name)
-
-            # Create step log
-            from .types import StepLog
-
-            step_log: StepLog = {
-                "step_number": step_number,
-                "observation": state.get("observation", ""),
-                "proposed_actions": state.get("proposed_actions", []),
-                "executed_action": {"name": function_name, "args": args},
-                "result": result_text,
-                "screenshot_path": screenshot_path,
-                "timestamp": time.time(),
-            }
+    def _record_action_error(
+        self, state: CUAState, call: dict[str, Any], error: Exception, screenshot: bytes
+    ) -> dict:
+        """Build act-node state updates for an action that raised.
 
-            updated_step_logs = state.get("step_logs", []) + [step_log]
+        Args:
+            state: Current state
+            call: Function call that raised
+            error: Exception raised while executing the call
+            screenshot: Screenshot captured after the failure (may be empty)
 
-            return {
-                "pending_calls": remaining,
-                "last_screenshot_png": result.screenshot_png,
-                "action_history": updated_history,
-                "step_logs": updated_step_logs,
-            }
+        Returns:
+            State updates
+        """
+        function_name = call["name"]
+        args = call["args"]
+        step_number = state["step"]
 
-        except Exception as e:
-            logger.error(f"Action failed: {e}")
-            # Still try to get screenshot for error reporting
-            try:
-                screenshot = self.vnc.screenshot_png()
-            except:
-                screenshot = b""
-
-            action_text += f" - Exception: {e!s}"
-            result_text = f"Exception: {e!s}"
-            updated_history = state["action_history"] + [action_text]
-
-            # Save screenshot even on error
-            screenshot_path = None
-            if self.run_logger and screenshot:
-                path = self.run_logger.log_screenshot(
-                    step_number, screenshot, f"step_{step_number:03d}_error"
-                )
-                screenshot_path = str(path.name)
-
-            # Create step log for error
-            from .types import StepLog
-
-            step_log: StepLog = {
-                "step_number": step_number,
-                "observation": state.get("observation", ""),
-                "proposed_actions": state.get("proposed_actions", []),
-                "executed_action": {"name": function_name, "args": args},
-                "result": result_text,
-                "screenshot_path": screenshot_path,
-                "timestamp": time.time(),
-            }
+        result_text = f"Exception: {error!s}"
 
-            updated_step_logs = state.get("step_logs", []) + [step_log]
+        # Save screenshot even on error
+        screenshot_path = None
+        if self.run_logger and screenshot:
+            path = self.run_logger.log_screenshot(
+                step_number, screenshot, f"step_{step_number:03d}_error"
+            )
+            # None when the artifact level skips this frame
+            screenshot_path = path.name if path else None
+
+        # Create step log for error
+        step_log = StepLog(
+            step_number=step_number,
+            observation=state.get("observation", ""),
+            proposed_actions=tuple(state.get("proposed_actions", ())),
+            executed_action={"name": function_name, "args": args},
+            result=result_text,
+            screenshot_path=screenshot_path,
+            timestamp=time.time(),
+        )
+        if self.run_logger:
+            self.run_logger.log_step(step_log)
 
-            return {
-                "pending_calls": remaining,
-                "last_screenshot_png": screenshot,
-                "action_history": updated_history,
-                "step_logs": updated_step_logs,
-                "error": str(e),
-            }
+        action_text = f"Executed {step_log.formatted_action} - {result_text}"
+
+        return {
+            "last_screenshot_png": screenshot,
+            "action_history": [action_text],
+            "step_logs": [step_log],
+            "error": str(error),
+        }
 
     def _hitl_gate_node(self, state: CUAState) -> dict:
         """HITL gate node: Wait for user approval.
@@ -347,39 +546,90 @@ class VncUseAgent:
         self.hitl_gate.request_confirmation(safety, pending)
 
         # Use callback if provided, otherwise use LangGraph interrupt
-        if self.hitl_callback:
-            logger.debug("Using HITL callback for user decision")
-            try:
-                # Call async callback from sync context
-                approved = asyncio.run(self.hitl_callback(safety, pending))
+        if not self.hitl_callback:
+            return self._hitl_interrupt(safety, pending)
 
-                if not approved:
-                    logger.warning("User denied action via callback")
-                    return {"done": True, "error": "User denied action"}
+        logger.debug("Using HITL callback for user decision")
+        try:
+            # Call async callback from sync context (graph.invoke without a loop)
+            approved = asyncio.run(self.hitl_callback(safety, pending))
+        except Exception as e:
+            logger.error(f"HITL callback failed: {e}")
+            return {"done": True, "error": f"HITL callback failed: {e}"}
 
-                logger.info("User approved action via callback")
-                return {}
-            except Exception as e:
-                logger.error(f"HITL callback failed: {e}")
-                return {"done": True, "error": f"HITL callback failed: {e}"}
-        else:
-            # Use LangGraph interrupt mechanism
-            logger.debug("Using LangGraph interrupt for user decision")
-            decision = interrupt(
-                {
-                    "type": "hitl_confirmation",
-                    "reason": safety.get("reason") if safety else "Unknown",
-                    "pending_calls": pending,
-                }
-            )
+        return self._hitl_callback_result(approved)
 
-            # Process user decision
-            if decision == "deny":
-                logger.warning("User denied action")
-                return {"done": True, "error": "User denied action"}
+    async def _ahitl_gate_node(self, state: CUAState) -> dict:
+        """Async HITL gate node: Await the approval callback on the running loop.
 
-            logger.info("User approved action")
-            return {}
+        Args:
+            state: Current state
+
+        Returns:
+            State updates (interrupts if no decision)
+        """
+        logger.info("HITL gate: Waiting for user decision...")
+
+        safety = state["safety"]
+        pending = state["pending_calls"]
+
+        # Log the confirmation request
+        self.hitl_gate.request_confirmation(safety, pending)
+
+        if not self.hitl_callback:
+            return self._hitl_interrupt(safety, pending)
+
+        logger.debug("Using HITL callback for user decision")
+        try:
+            approved = await self.hitl_callback(safety, pending)
+        except Exception as e:
+            logger.error(f"HITL callback failed: {e}")
+            return {"done": True, "error": f"HITL callback failed: {e}"}
+
+        return self._hitl_callback_result(approved)
+
+    def _hitl_callback_result(self, approved: bool) -> dict:
+        """Build HITL gate state updates from a callback decision.
+
+        Args:
+            approved: Whether the user approved the pending calls
+
+        Returns:
+            State updates
+        """
+        if not approved:
+            logger.warning("User denied action via callback")
+            return {"done": True, "error": "User denied action"}
+
+        logger.info("User approved action via callback")
+        return {}
+
+    def _hitl_interrupt(self, safety: dict | None, pending: list[dict[str, Any]]) -> dict:
+        """Ask for a decision via the LangGraph interrupt mechanism.
+
+        Args:
+            safety: Safety decision requiring confirmation
+            pending: Pending function calls
+
+        Returns:
+            State updates
+        """
+        logger.debug("Using LangGraph interrupt for user decision")
+        decision = interrupt(
+            {
+                "type": "hitl_confirmation",
+                "reason": safety.get("reason") if safety else "Unknown",
+                "pending_calls": pending,
+            }
+        )
+
+        # Process user decision
+        if decision == "deny":
+            logger.warning("User denied action")
+            return {"done": True, "error": "User denied action"}
+
+        logger.info("User approved action")
+        return {}
 
     def _route_after_propose(self, state: CUAState) -> str:
         """Route after propose node.
@@ -424,73 +674,214 @@ class VncUseAgent:
         Returns:
             Final state and run artifacts
         """
-        logger.info(f"Starting task: {task}")
+        result: dict[str, Any] = {}
+        for result in self.run_iter(task, thread_id):
+            pass
+        return result
 
-        # Initialize run logger
-        run_logger = RunLogger(task=task)
-        self.run_logger = run_logger  # Make it available to nodes
+    def run_iter(self, task: str, thread_id: str | None = None) -> Iterator[dict[str, Any]]:
+        """Run the agent on a task, yielding the graph state after each step.
+
+        The last item is the run result that run() returns; unlike the graph
+        states it always has a "success" key. Closing the iterator early
+        (e.g. breaking out of the loop) stops the run and disconnects VNC.
+
+        Args:
+            task: User's task description
+            thread_id: Optional thread ID for resumable runs
+
+        Yields:
+            Graph states, then the final state and run artifacts
+        """
+        logger.info(f"Starting task: {task}")
+        run_logger = self._start_run_logger(task)
 
         # Connect to VNC
         try:
             self.vnc.connect(self.vnc_server, self.vnc_password)
             logger.info("VNC connected")
         except Exception as e:
-            logger.error(f"VNC connection failed: {e}")
-            return {"error": f"VNC connection failed: {e}"}
+            yield self._fail_connect(run_logger, e)
+            return
 
         try:
             # Capture initial screenshot
-            initial_screenshot = self.vnc.screenshot_png()
-            run_logger.log_screenshot(0, initial_screenshot, "initial")
-            logger.info("Initial screenshot captured")
-
-            # Initialize state with text-only history
-            initial_state: CUAState = {
-                "task": task,
-                "action_history": [],
-                "step_logs": [],
-                "pending_calls": [],
-                "last_screenshot_png": initial_screenshot,
-                "step": 0,
-                "done": False,
-                "safety": None,
-                "start_time": time.time(),
-                "error": None,
-            }
+            initial_state = self._initial_state(task, self.vnc.screenshot_png())
 
-            # Run graph with increased recursion limit
+            # Stream full states so callers can follow the run step by step
             logger.info("Invoking graph...")
-            final_state = self.graph.invoke(
+            final_state = initial_state
+            for final_state in self.graph.stream(
                 initial_state,
-                config={"recursion_limit": 100},  # Allow up to 100 steps
-            )
+                config=self._run_config(),
+                stream_mode="values",
+            ):
+                yield final_state
             logger.info("Graph execution completed")
 
-            # Finalize logging
-            metadata_path = run_logger.finalize(
-                done=final_state.get("done", False) if final_state else False,
-                final_state=final_state or {},
-            )
+            result = self._finish_run(run_logger, final_state)
 
-            logger.info(f"Task completed. Run artifacts: {run_logger.get_run_dir()}")
-
-            return {
-                "success": final_state.get("done", False) if final_state else False,
-                "final_state": final_state,
-                "run_id": run_logger.get_run_id(),
-                "run_dir": str(run_logger.get_run_dir()),
-                "metadata": str(metadata_path),
-            }
+        except GeneratorExit:
+            logger.info("Run stopped by caller")
+            run_logger.close()
+            raise
 
         except Exception as e:
-            logger.error(f"Agent failed: {e}", exc_info=True)
-            return {
-                "success": False,
-                "error": str(e),
-                "run_id": run_logger.get_run_id(),
-                "run_dir": str(run_logger.get_run_dir()),
-            }
+            result = self._fail_run(run_logger, e)
 
         finally:
             self.vnc.disconnect()
             logger.info("VNC disconnected")
+
+        yield result
+
+    async def arun(self, task: str, thread_id: str | None = None) -> dict[str, Any]:
+        """Run the agent on a task without blocking the event loop.
+
+        Uses the async node implementations so planner calls and VNC I/O
+        yield to other coroutines (e.g. MCP progress streaming).
+
+        Args:
+            task: User's task description
+            thread_id: Optional thread ID for resumable runs
+
+        Returns:
+            Final state and run artifacts
+        """
+        logger.info(f"Starting task: {task}")
+        run_logger = self._start_run_logger(task)
+
+        # Connect to VNC
+        try:
+            await asyncio.to_thread(self.vnc.connect, self.vnc_server, self.vnc_password)
+            logger.info("VNC connected")
+        except Exception as e:
+            return self._fail_connect(run_logger, e)
+
+        try:
+            # Capture initial screenshot
+            initial_state = self._initial_state(task, await self.vnc.screenshot_png_async())
+
+            logger.info("Invoking graph...")
+            final_state = await self.graph.ainvoke(
+                initial_state,
+                config=self._run_config(),
+            )
+            logger.info("Graph execution completed")
+
+            return self._finish_run(run_logger, final_state)
+
+        except Exception as e:
+            return self._fail_run(run_logger, e)
+
+        finally:
+            await asyncio.to_thread(self.vnc.disconnect)
+            logger.info("VNC disconnected")
+
+    def _run_config(self) -> RunnableConfig:
+        """Build the graph run config binding this agent to the shared graph.
+
+        Returns:
+            Run config for graph.invoke()/graph.ainvoke()
+        """
+        return {
+            "recursion_limit": 100,  # Allow up to 100 steps
+            "configurable": {"agent": self},
+        }
+
+    def _start_run_logger(self, task: str) -> RunLogger:
+        """Create the run logger for a new run and expose it to the nodes.
+
+        Args:
+            task: User's task description
+
+        Returns:
+            Run logger for this run
+        """
+        run_logger = RunLogger(task=task)
+        self.run_logger = run_logger  # Make it available to nodes
+        return run_logger
+
+    def _initial_state(self, task: str, initial_screenshot: bytes) -> CUAState:
+        """Log the initial screenshot and build the initial graph state.
+
+        Args:
+            task: User's task description
+            initial_screenshot: Screenshot captured before the first step
+
+        Returns:
+            Initial state with text-only history
+        """
+        self.run_logger.log_screenshot(0, initial_screenshot, "initial")
+        logger.info("Initial screenshot captured")
+
+        return {
+            "task": task,
+            "action_history": [],
+            "step_logs": [],
+            "pending_calls": [],
+            "last_screenshot_png": initial_screenshot,
+            "step": 0,
+            "done": False,
+            "safety": None,
+            "deadline": time.monotonic() + self.seconds_timeout,
+            "error": None,
+        }
+
+    def _finish_run(self, run_logger: RunLogger, final_state: dict[str, Any]) -> dict[str, Any]:
+        """Finalize logging and build the result of a completed graph run.
+
+        Args:
+            run_logger: Run logger for this run
+            final_state: Final graph state
+
+        Returns:
+            Final state and run artifacts
+        """
+        metadata_path = run_logger.finalize(
+            done=final_state.get("done", False) if final_state else False,
+            final_state=final_state or {},
+        )
+
+        logger.info(f"Task completed. Run artifacts: {run_logger.get_run_dir()}")
+
+        return {
+            "success": final_state.get("done", False) if final_state else False,
+            "final_state": final_state,
+            "run_id": run_logger.get_run_id(),
+            "run_dir": str(run_logger.get_run_dir()),
+            "metadata": str(metadata_path),
+        }
+
+    def _fail_connect(self, run_logger: RunLogger, error: Exception) -> dict[str, Any]:
+        """Close the run logger and build the result of a failed VNC connection.
+
+        Args:
+            run_logger: Run logger for this run
+            error: Exception raised while connecting
+
+        Returns:
+            Error result
+        """
+        logger.error(f"VNC connection failed: {error}")
+        run_logger.close()
+        return {"success": False, "error": f"VNC connection failed: {error}"}
+
+    def _fail_run(self, run_logger: RunLogger, error: Exception) -> dict[str, Any]:
+        """Build the result of a run that raised.
+
+        Args:
+            run_logger: Run logger for this run
+            error: Exception raised during the run
+
+        Returns:
+            Error result with run artifacts
+        """
+        logger.error(f"Agent failed: {error}", exc_info=True)
+        run_logger.close()
+        return {
+            "success": False,
+            "error": str(error),
+            "run_id": run_logger.get_run_id(),
+            "run_dir": str(run_logger.get_run_dir()),
+        }
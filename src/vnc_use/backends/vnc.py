@@ -1,20 +1,135 @@
 """VNC backend controller for executing UI actions."""
 
+import asyncio
 import io
 import logging
-import tempfile
 import time
-from pathlib import Path
 from typing import Literal
 
-from PIL import Image
+import xxhash
+from twisted.internet import reactor
+from twisted.internet.defer import Deferred
 from vncdotool import api as vnc_api
+from vncdotool.client import VNCDoToolClient, VNCDoToolFactory
 
 from ..types import ActionResult
 
 
 logger = logging.getLogger(__name__)
 
+# Request a full (non-incremental) framebuffer update every N screenshots
+FULL_REFRESH_INTERVAL = 10
+# Seconds to wait for an incremental update before treating the screen as unchanged
+INCREMENTAL_UPDATE_TIMEOUT = 0.25
+# Browser-only Computer Use actions with no VNC desktop equivalent; they never
+# touch the screen, so no fresh capture is needed after them
+UNSUPPORTED_ACTIONS = frozenset({"open_web_browser", "navigate", "go_back", "go_forward", "search"})
+
+
+class BatchingVNCClient(VNCDoToolClient):
+    """vncdotool client with batched input helpers.
+
+    Every call made through vncdotool's threaded API proxy is a synchronous
+    hop into the Twisted reactor thread. These helpers emit a whole sequence
+    of RFB events in a single hop instead of one hop per event.
+    """
+
+    def typeText(self, text: str) -> "BatchingVNCClient":
+        """Send key presses for every character of text.
+
+        Args:
+            text: Text to type
+        """
+        for char in text:
+            self.keyPress(char)
+        return self
+
+    def repeatKeyPress(self, key: str, count: int) -> "BatchingVNCClient":
+        """Press and release a key count times back-to-back.
+
+        Args:
+            key: Key name accepted by keyPress (e.g. "pgdn")
+            count: Number of presses
+        """
+        for _ in range(count):
+            self.keyPress(key)
+        return self
+
+    def doubleClick(self, x: int, y: int, button: int = 1) -> "BatchingVNCClient":
+        """Move to (x, y) and send two clicks back-to-back.
+
+        Emitting both clicks in one reactor call keeps them well inside the
+        desktop's double-click interval.
+
+        Args:
+            x: Pixel x coordinate
+            y: Pixel y coordinate
+            button: Mouse button (1=left, 2=middle, 3=right)
+        """
+        self.mouseMove(x, y)
+        self.mousePress(button)
+        self.mousePress(button)
+        return self
+
+    def refreshScreenIncremental(self, timeout: float) -> Deferred:
+        """Request only the framebuffer regions that changed since the last update.
+
+        vncdotool pastes each received rectangle into ``self.screen``, so the
+        cached framebuffer stays current without a full transfer. Servers only
+        answer an incremental request once something changes, so the refresh
+        completes after ``timeout`` seconds when the screen is static (or the
+        server is slow to answer). The timeout is logged because the cached
+        frame may then be stale; an update that arrives later is still pasted
+        into it and shows up in the next capture.
+
+        Args:
+            timeout: Seconds to wait for a framebuffer update
+
+        Returns:
+            Deferred firing with this client once the screen is current
+        """
+        d = self.refreshScreen(incremental=True)
+
+        def expire() -> None:
+            if self.deferred is d:
+                logger.info(f"No framebuffer update within {timeout}s, using the cached frame")
+                self.deferred = None
+                d.callback(self)
+
+        expiry = reactor.callLater(timeout, expire)
+
+        def cancel_expiry(result: object) -> object:
+            if expiry.active():
+                expiry.cancel()
+            return result
+
+        d.addBoth(cancel_expiry)
+        return d
+
+    def snapshotScreen(self, incremental: bool, timeout: float) -> Deferred:
+        """Refresh the framebuffer and snapshot it on the reactor thread.
+
+        vncdotool pastes received rectangles into ``self.screen`` on the
+        reactor thread, so other threads must not read it directly. The copy
+        is taken in the refresh callback, between updates, so hashing and
+        encoding it never see a half-pasted frame.
+
+        Args:
+            incremental: Request only changed regions instead of a full update
+            timeout: Seconds to wait for an incremental update
+
+        Returns:
+            Deferred firing with a copy of the refreshed framebuffer
+        """
+        d = self.refreshScreenIncremental(timeout) if incremental else self.refreshScreen()
+        return d.addCallback(lambda _: self.screen.copy())
+
+
+class BatchingVNCFactory(VNCDoToolFactory):
+    """vncdotool factory producing BatchingVNCClient connections."""
+
+    protocol = BatchingVNCClient
+
 
 def denorm_x(x: int, width: int) -> int:
     """Convert normalized x coordinate (0-999) to pixel x.
@@ -54,6 +169,17 @@ class VNCController:
         """Initialize VNC controller (not yet connected)."""
         self.client: vnc_api.VNCDoToolClient | None = None
         self._screen_size: tuple[int, int] | None = None
+        # Pixel lookup tables for the 0-999 normalized grid, rebuilt on resize
+        self._x_pixels: list[int] = []
+        self._y_pixels: list[int] = []
+        # Screenshots since the last full framebuffer request (None = never)
+        self._captures_since_full: int | None = None
+        # Most recent screenshot, reused by actions that leave the screen untouched
+        self._last_png: bytes = b""
+        # (size, xxh64 of raw pixels) of the frame _last_png was encoded from
+        self._last_frame_key: tuple[tuple[int, int], int] | None = None
+        # Last pointer position we sent, to skip redundant mouseMove calls
+        self._cursor: tuple[int, int] | None = None
 
     def connect(self, server: str, password: str | None = None) -> "VNCController":
         """Connect to VNC server.
@@ -69,8 +195,13 @@ class VNCController:
             Exception: If connection fails
         """
         logger.info(f"Connecting to VNC server: {server}")
-        self.client = vnc_api.connect(server, password=password)
-        logger.info("VNC connection established")
+        self.client = vnc_api.connect(server, password=password, factory_class=BatchingVNCFactory)
+
+        # Block until the RFB handshake completes; the server init message
+        # carries the framebuffer geometry, so cache it once here
+        self.client.pause(0)
+        self.refresh_size()
+        logger.info(f"VNC connection established ({self._screen_size[0]}x{self._screen_size[1]})")
         return self
 
     def disconnect(self) -> None:
@@ -78,11 +209,24 @@ class VNCController:
         if self.client:
             self.client.disconnect()
             self.client = None
+            self._captures_since_full = None
+            self._last_png = b""
+            self._last_frame_key = None
+            self._cursor = None
             logger.info("VNC connection closed")
 
-    def screenshot_png(self) -> bytes:
+    def screenshot_png(self, full_refresh: bool = False) -> bytes:
         """Capture current screen as PNG bytes.
 
+        The first capture fetches the whole framebuffer; later captures only
+        request changed regions, which vncdotool blits into its cached screen.
+        A full update is forced every FULL_REFRESH_INTERVAL captures. If the
+        framebuffer is unchanged since the previous capture, the previous PNG
+        is returned without re-encoding.
+
+        Args:
+            full_refresh: Force a full (non-incremental) framebuffer update
+
         Returns:
             PNG screenshot as bytes
 
@@ -92,22 +236,128 @@ class VNCController:
         if not self.client:
             raise RuntimeError("Not connected to VNC server")
 
-        # Capture to temporary file
-        with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp:
-            tmp_path = Path(tmp.name)
+        # Refresh vncdotool's in-memory framebuffer and encode a snapshot of it
+        # directly, avoiding a temp-file write/read and a PNG re-decode just for the size
+        incremental = not (
+            full_refresh
+            or self._captures_since_full is None
+            or self._captures_since_full >= FULL_REFRESH_INTERVAL
+        )
+        img = self.client.snapshotScreen(incremental, INCREMENTAL_UPDATE_TIMEOUT)
+        self._captures_since_full = self._captures_since_full + 1 if incremental else 0
+        self._set_screen_size(img.size)
+
+        # Hashing the raw pixels is far cheaper than deflating them again
+        frame_key = (img.size, xxhash.xxh64_intdigest(img.tobytes()))
+        if frame_key == self._last_frame_key:
+            logger.debug(f"Screenshot unchanged: {img.size}")
+            return self._last_png
+
+        # Fast zlib level: deflate dominates the cost of encoding a full frame
+        buf = io.BytesIO()
+        img.save(buf, format="PNG", compress_level=1)
+        logger.debug(f"Screenshot captured: {img.size}")
+
+        self._last_png = buf.getvalue()
+        self._last_frame_key = frame_key
+        return self._last_png
+
+    async def screenshot_png_async(self, full_refresh: bool = False) -> bytes:
+        """Capture current screen as PNG bytes without blocking the event loop.
+
+        vncdotool's threaded proxy blocks the calling thread until the Twisted
+        reactor thread answers, so the capture and encode run in a worker thread.
+
+        Args:
+            full_refresh: Force a full (non-incremental) framebuffer update
+
+        Returns:
+            PNG screenshot as bytes
+
+        Raises:
+            RuntimeError: If not connected
+        """
+        return await asyncio.to_thread(self.screenshot_png, full_refresh)
+
+    def error_screenshot_png(self) -> bytes:
+        """Best-effort screenshot for error reporting.
 
+        Returns:
+            PNG screenshot as bytes, or empty bytes if none can be captured
+        """
+        # A dropped connection would otherwise raise (and build a traceback) every step
+        if not self.client:
+            return b""
         try:
-            self.client.captureScreen(str(tmp_path))
-            png_bytes = tmp_path.read_bytes()
+            return self.screenshot_png()
+        except Exception as e:
+            logger.debug(f"Error screenshot failed: {e}")
+            return b""
+
+    async def error_screenshot_png_async(self) -> bytes:
+        """Best-effort screenshot for error reporting without blocking the event loop.
+
+        Returns:
+            PNG screenshot as bytes, or empty bytes if none can be captured
+        """
+        if not self.client:
+            return b""
+        return await asyncio.to_thread(self.error_screenshot_png)
+
+    def refresh_size(self) -> tuple[int, int]:
+        """Re-read screen dimensions from the VNC framebuffer.
+
+        The size is cached at connect time and kept in sync by each screenshot,
+        so this is only needed if the remote desktop is resized mid-session.
+
+        Returns:
+            Tuple of (width, height) in pixels
+
+        Raises:
+            RuntimeError: If not connected
+        """
+        if not self.client:
+            raise RuntimeError("Not connected to VNC server")
 
-            # Update cached screen size
-            img = Image.open(io.BytesIO(png_bytes))
-            self._screen_size = img.size
-            logger.debug(f"Screenshot captured: {img.size}")
+        protocol = self.client.protocol
+        if protocol.screen is not None:
+            self._set_screen_size(protocol.screen.size)
+        else:
+            self._set_screen_size((protocol.width, protocol.height))
+        return self._screen_size
 
-            return png_bytes
-        finally:
-            tmp_path.unlink(missing_ok=True)
+    def _set_screen_size(self, size: tuple[int, int]) -> None:
+        """Cache screen size and precompute normalized-to-pixel tables.
+
+        Args:
+            size: Tuple of (width, height) in pixels
+        """
+        if size != self._screen_size:
+            width, height = size
+            self._x_pixels = [denorm_x(x, width) for x in range(1000)]
+            self._y_pixels = [denorm_y(y, height) for y in range(1000)]
+        self._screen_size = size
+
+    def _to_pixels(self, x: int, y: int) -> tuple[int, int]:
+        """Convert normalized coordinates (0-999) to pixel coordinates.
+
+        Uses the precomputed tables for in-range integers and falls back to
+        denorm_x/denorm_y for anything else (e.g. float arguments).
+
+        Args:
+            x: Normalized x coordinate (0-999)
+            y: Normalized y coordinate (0-999)
+
+        Returns:
+            Tuple of (x, y) in pixels
+
+        Raises:
+            RuntimeError: If screen size not yet known
+        """
+        width, height = self.get_screen_size()
+        px = self._x_pixels[x] if type(x) is int and 0 <= x < 1000 else denorm_x(x, width)
+        py = self._y_pixels[y] if type(y) is int and 0 <= y < 1000 else denorm_y(y, height)
+        return px, py
 
     def get_screen_size(self) -> tuple[int, int]:
         """Get current screen dimensions.
@@ -134,9 +384,20 @@ class VNCController:
         """
         if not self.client:
             raise RuntimeError("Not connected to VNC server")
-        self.client.mouseMove(x, y)
+        self._move_to(x, y)
         logger.debug(f"Mouse moved to ({x}, {y})")
 
+    def _move_to(self, x: int, y: int) -> None:
+        """Send a pointer move unless the pointer is already at (x, y).
+
+        Args:
+            x: Pixel x coordinate
+            y: Pixel y coordinate
+        """
+        if self._cursor != (x, y):
+            self.client.mouseMove(x, y)
+            self._cursor = (x, y)
+
     def click(self, x: int, y: int, button: int = 1) -> None:
         """Click at pixel coordinates.
 
@@ -151,8 +412,8 @@ class VNCController:
         if not self.client:
             raise RuntimeError("Not connected to VNC server")
 
-        # Move first to avoid injection glitches
-        self.client.mouseMove(x, y)
+        # Move first to avoid injection glitches (skipped if already there)
+        self._move_to(x, y)
         self.client.mousePress(button)
         logger.debug(f"Clicked button {button} at ({x}, {y})")
 
@@ -169,9 +430,8 @@ class VNCController:
         if not self.client:
             raise RuntimeError("Not connected to VNC server")
 
-        self.client.mouseMove(x, y)
-        self.client.mousePress(1)
-        self.client.mousePress(1)
+        self.client.doubleClick(x, y)
+        self._cursor = (x, y)
         logger.debug(f"Double-clicked at ({x}, {y})")
 
     def drag_and_drop(self, x0: int, y0: int, x1: int, y1: int) -> None:
@@ -189,9 +449,10 @@ class VNCController:
         if not self.client:
             raise RuntimeError("Not connected to VNC server")
 
-        self.client.mouseMove(x0, y0)
+        self._move_to(x0, y0)
         self.client.mouseDown(1)
         self.client.mouseDrag(x1, y1)
+        self._cursor = (x1, y1)
         self.client.mouseUp(1)
         logger.debug(f"Dragged from ({x0}, {y0}) to ({x1}, {y1})")
 
@@ -213,9 +474,8 @@ class VNCController:
             self.client.keyPress("ctrl-a")
             self.client.keyPress("delete")
 
-        # vncdotool handles string typing
-        for char in text:
-            self.client.keyPress(char)
+        # Send the whole string in one reactor call rather than one per character
+        self.client.typeText(text)
 
         if press_enter:
             self.client.keyPress("enter")
@@ -267,10 +527,10 @@ class VNCController:
         }
         key = key_map[direction]
 
-        # Repeat based on magnitude (heuristic: 400 pixels per press)
+        # Repeat based on magnitude (heuristic: 400 pixels per press), sending
+        # all presses in one reactor call rather than relying on autorepeat
         repeats = max(1, magnitude // 400)
-        for _ in range(repeats):
-            self.client.keyPress(key)
+        self.client.repeatKeyPress(key, repeats)
 
         logger.debug(f"Scrolled {direction} with magnitude {magnitude} ({repeats} repeats)")
 
@@ -278,39 +538,50 @@ class VNCController:
         self,
         action_name: str,
         args: dict,
+        capture: bool = True,
     ) -> ActionResult:
         """Execute a Computer Use action and capture result.
 
         Args:
             action_name: Name of action to execute
             args: Action arguments (with normalized coordinates if applicable)
+            capture: Capture a screenshot after a successful action. Pass False
+                when more actions follow before the next observation; failed
+                actions always capture one for debugging.
 
         Returns:
-            ActionResult with screenshot and execution status
+            ActionResult with screenshot (empty if not captured) and execution status
         """
+        if action_name in UNSUPPORTED_ACTIONS and self._last_png:
+            # Nothing was sent to the desktop; the previous screenshot is current
+            logger.warning(f"Action {action_name} is not supported on a VNC desktop")
+            return ActionResult(
+                success=False,
+                error=f"Unsupported action on VNC desktop: {action_name}",
+                screenshot_png=self._last_png,
+                url="",
+            )
+
         try:
-            width, height = self.get_screen_size()
+            # Fail fast if the screen size is unknown
+            self.get_screen_size()
 
             if action_name == "click_at":
-                px = denorm_x(args["x"], width)
-                py = denorm_y(args["y"], height)
+                px, py = self._to_pixels(args["x"], args["y"])
                 # Use double-click for VNC desktop - needed for launching apps/folders
                 self.double_click(px, py)
 
             elif action_name == "double_click_at":
                 # Fallback for compatibility if model somehow calls this
-                px = denorm_x(args["x"], width)
-                py = denorm_y(args["y"], height)
+                px, py = self._to_pixels(args["x"], args["y"])
                 self.double_click(px, py)
 
             elif action_name == "hover_at":
-                px = denorm_x(args["x"], width)
-                py = denorm_y(args["y"], height)
+                px, py = self._to_pixels(args["x"], args["y"])
                 self.move(px, py)
 
             elif action_name == "type_text_at":
-                px = denorm_x(args["x"], width)
-                py = denorm_y(args["y"], height)
+                px, py = self._to_pixels(args["x"], args["y"])
                 self.click(px, py)  # Focus first
                 self.type_text(
                     args["text"],
@@ -325,16 +596,13 @@ class VNCController:
                 self.scroll(args["direction"], args.get("magnitude", 800))
 
             elif action_name == "scroll_at":
-                px = denorm_x(args["x"], width)
-                py = denorm_y(args["y"], height)
+                px, py = self._to_pixels(args["x"], args["y"])
                 self.move(px, py)  # Move to location first
                 self.scroll(args["direction"], args.get("magnitude", 800))
 
             elif action_name == "drag_and_drop":
-                x0 = denorm_x(args["x"], width)
-                y0 = denorm_y(args["y"], height)
-                x1 = denorm_x(args["destination_x"], width)
-                y1 = denorm_y(args["destination_y"], height)
+                x0, y0 = self._to_pixels(args["x"], args["y"])
+                x1, y1 = self._to_pixels(args["destination_x"], args["destination_y"])
                 self.drag_and_drop(x0, y0, x1, y1)
 
             elif action_name == "wait_5_seconds":
@@ -345,7 +613,7 @@ class VNCController:
                 raise ValueError(f"Unknown action: {action_name}")
 
             # Capture screenshot after action
-            screenshot = self.screenshot_png()
+            screenshot = self.screenshot_png() if capture else b""
 
             return ActionResult(
                 success=True,
@@ -357,10 +625,7 @@ class VNCController:
         except Exception as e:
             logger.error(f"Action {action_name} failed: {e}")
             # Still try to capture screenshot for debugging
-            try:
-                screenshot = self.screenshot_png()
-            except:
-                screenshot = b""
+            screenshot = self.error_screenshot_png()
 
             return ActionResult(
                 success=False,
@@ -368,3 +633,21 @@ class VNCController:
                 screenshot_png=screenshot,
                 url="",
             )
+
+    async def execute_action_async(
+        self,
+        action_name: str,
+        args: dict,
+        capture: bool = True,
+    ) -> ActionResult:
+        """Execute a Computer Use action without blocking the event loop.
+
+        Args:
+            action_name: Name of action to execute
+            args: Action arguments (with normalized coordinates if applicable)
+            capture: Capture a screenshot after a successful action
+
+        Returns:
+            ActionResult with screenshot (empty if not captured) and execution status
+        """
+        return await asyncio.to_thread(self.execute_action, action_name, args, capture)
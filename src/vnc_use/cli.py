@@ -1,12 +1,66 @@
 """CLI entrypoint for vnc-use."""
 
 import argparse
+import atexit
 import logging
+import logging.handlers
+import queue
 import sys
 
 from .agent import VncUseAgent
 
 
+_EPILOG = """
+Examples:
+  # Run with default VNC server (localhost::5901)
+  vnc-use run --task "Open a browser and search for LangGraph"
+
+  # Specify custom VNC server
+  vnc-use run --vnc remote-host:5901 --password secret --task "..."
+
+  # Disable HITL safety confirmations
+  vnc-use run --no-hitl --task "..."
+
+  # Set custom limits
+  vnc-use run --step-limit 50 --timeout 600 --task "..."
+"""
+
+
+class _BurstFlushHandler(logging.handlers.MemoryHandler):
+    """Buffer log records and write each burst to the target stream at once.
+
+    Flushes when the buffer is full, on ERROR, or as soon as the log queue is
+    drained, so lines are batched under load but never held back when idle.
+    """
+
+    def __init__(
+        self,
+        log_queue: queue.SimpleQueue,
+        target: logging.StreamHandler,
+        capacity: int = 512,
+    ) -> None:
+        super().__init__(capacity, flushLevel=logging.ERROR, target=target, flushOnClose=True)
+        self.log_queue = log_queue
+
+    def shouldFlush(self, record: logging.LogRecord) -> bool:
+        return super().shouldFlush(record) or self.log_queue.empty()
+
+    def flush(self) -> None:
+        with self.lock:
+            if not self.buffer or self.target is None:
+                return
+            target = self.target
+            text = "".join(target.format(record) + target.terminator for record in self.buffer)
+            self.buffer.clear()
+            # One write (and one flush) per burst instead of one per record
+            target.acquire()
+            try:
+                target.stream.write(text)
+                target.flush()
+            finally:
+                target.release()
+
+
 def setup_logging(verbose: bool = False) -> None:
     """Setup logging configuration.
 
@@ -14,11 +68,27 @@ def setup_logging(verbose: bool = False) -> None:
         verbose: Enable verbose (DEBUG) logging
     """
     level = logging.DEBUG if verbose else logging.INFO
-    logging.basicConfig(
-        level=level,
-        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
+
+    # Records are queued on the calling thread and written to stderr by a
+    # listener thread, so log output never blocks the agent loop
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(
+        logging.Formatter(
+            "%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+            datefmt="%Y-%m-%d %H:%M:%S",
+        )
+    )
+    log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(
+        log_queue, _BurstFlushHandler(log_queue, stream_handler), respect_handler_level=True
     )
+    listener.start()
+    atexit.register(listener.stop)
+
+    # Only the message is rendered before queueing; stream_handler adds the rest
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.setFormatter(logging.Formatter("%(message)s"))
+    logging.basicConfig(level=level, handlers=[queue_handler])
 
 
 def main() -> None:
@@ -26,20 +96,7 @@ def main() -> None:
     parser = argparse.ArgumentParser(
         description="VNC Computer Use Agent powered by Gemini",
         formatter_class=argparse.RawDescriptionHelpFormatter,
-        epilog="""
-Examples:
-  # Run with default VNC server (localhost::5901)
-  vnc-use run --task "Open a browser and search for LangGraph"
-
-  # Specify custom VNC server
-  vnc-use run --vnc remote-host:5901 --password secret --task "..."
-
-  # Disable HITL safety confirmations
-  vnc-use run --no-hitl --task "..."
-
-  # Set custom limits
-  vnc-use run --step-limit 50 --timeout 600 --task "..."
-        """,
+        epilog=_EPILOG,
     )
 
     parser.add_argument("command", choices=["run"], help="Command to execute")
@@ -67,6 +124,8 @@ Examples:
         action="store_true",
         help="Disable human-in-the-loop safety confirmations",
     )
+    # Keep nargs="+": a repeated action="append" option parses in quadratic
+    # time for long lists (python/cpython gh-116159)
     parser.add_argument(
         "--excluded-actions",
         nargs="+",
@@ -92,15 +151,21 @@ Examples:
 
     if args.command == "run":
         logger.info("Starting VNC Computer Use Agent")
-        logger.info(f"Task: {args.task}")
-        logger.info(f"VNC Server: {args.vnc}")
+        logger.info("Task: %s", args.task)
+        logger.info("VNC Server: %s", args.vnc)
 
         try:
             # Determine model provider
             import os
 
             model_provider = args.model_provider or os.getenv("MODEL_PROVIDER", "gemini")
-            logger.info(f"Using model provider: {model_provider}")
+
+            # Drop duplicates once (order kept for the planner's tool schema);
+            # None keeps the agent's default browser-action exclusions
+            excluded_actions = (
+                list(dict.fromkeys(args.excluded_actions)) if args.excluded_actions else None
+            )
+            logger.info("Using model provider: %s", model_provider)
 
             # Initialize agent
             agent = VncUseAgent(
@@ -110,7 +175,7 @@ Examples:
                 seconds_timeout=args.timeout,
                 hitl_mode=not args.no_hitl,
                 model_provider=model_provider,
-                excluded_actions=args.excluded_actions,
+                excluded_actions=excluded_actions,
             )
 
             # Run task
@@ -125,7 +190,7 @@ Examples:
                 sys.exit(0)
             else:
                 error = result.get("error", "Unknown error")
-                logger.error(f"✗ Task failed: {error}")
+                logger.error("✗ Task failed: %s", error)
                 print(f"\n✗ Task failed: {error}")
                 if result.get("run_dir"):
                     print(f"Run artifacts: {result.get('run_dir')}")
@@ -137,7 +202,7 @@ Examples:
             sys.exit(130)
 
         except Exception as e:
-            logger.error(f"Fatal error: {e}", exc_info=True)
+            logger.error("Fatal error: %s", e, exc_info=True)
             print(f"\n✗ Fatal error: {e}")
             sys.exit(1)
 
@@ -8,14 +8,51 @@ Provides pluggable credential stores with multiple backend implementations:
 Each store keys credentials by VNC server hostname/address.
 """
 
+import functools
+import importlib.util
+import itertools
 import json
 import logging
+import netrc
 import os
+import re
+import tempfile
+import time
 from abc import ABC, abstractmethod
+from collections.abc import Iterable
+from types import ModuleType
 
 
 logger = logging.getLogger(__name__)
 
+# Parsed netrc files by path, tagged with the (mtime_ns, size) they were parsed at
+_netrc_cache: dict[str, tuple[tuple[int, int], netrc.netrc]] = {}
+
+
+@functools.cache
+def _import_keyring() -> ModuleType:
+    """Import the optional keyring package once per process.
+
+    Returns:
+        The keyring module
+
+    Raises:
+        ImportError: If keyring is not installed
+    """
+    import keyring
+
+    return keyring
+
+
+@functools.lru_cache(maxsize=32)
+def _netrc_entry_re(hostname: str) -> re.Pattern[str]:
+    """Compile a pattern matching a netrc machine entry up to the next entry."""
+    return re.compile(
+        rf"^[ \t]*machine[ \t]+{re.escape(hostname)}(?:[ \t].*)?(?:\n|$)"
+        r"(?:(?![ \t]*(?:machine|default)\b).*(?:\n|$))*",
+        re.MULTILINE,
+    )
+
 
 class VNCCredentials:
     """VNC connection credentials."""
@@ -50,6 +87,20 @@ class CredentialStore(ABC):
             VNCCredentials if found, None otherwise
         """
 
+    def get_many(self, hostnames: Iterable[str]) -> dict[str, VNCCredentials | None]:
+        """Get credentials for several hostnames at once.
+
+        The default implementation calls get() per hostname; backends override
+        it when a batch lookup is cheaper.
+
+        Args:
+            hostnames: VNC server hostnames or addresses
+
+        Returns:
+            Mapping of each hostname to its VNCCredentials, or None if not found
+        """
+        return {hostname: self.get(hostname) for hostname in hostnames}
+
     @abstractmethod
     def set(self, hostname: str, server: str, password: str | None = None) -> None:
         """Store credentials for a VNC server hostname.
@@ -104,25 +155,53 @@ class NetrcStore(CredentialStore):
             file_path = "~/.vnc_credentials"
         self.file_path = os.path.expanduser(file_path)
 
+    def _parse(self) -> netrc.netrc:
+        """Parse the netrc file, reusing the last parse while the file is unchanged.
+
+        Returns:
+            Parsed netrc file
+
+        Raises:
+            FileNotFoundError: If the file does not exist
+            netrc.NetrcParseError: If the file is malformed
+        """
+        st = os.stat(self.file_path)
+        version = (st.st_mtime_ns, st.st_size)
+        cached = _netrc_cache.get(self.file_path)
+        if cached and cached[0] == version:
+            return cached[1]
+
+        parsed = netrc.netrc(self.file_path)
+        _netrc_cache[self.file_path] = (version, parsed)
+        return parsed
+
     def get(self, hostname: str) -> VNCCredentials | None:
         """Get credentials from netrc file."""
+        return self.get_many([hostname])[hostname]
+
+    def get_many(self, hostnames: Iterable[str]) -> dict[str, VNCCredentials | None]:
+        """Get credentials for several hostnames from a single parse of the file."""
+        hostnames = list(hostnames)
         try:
-            import netrc
+            n = self._parse()
+        except FileNotFoundError:
+            logger.debug("Netrc file not found: %s", self.file_path)
+            return dict.fromkeys(hostnames)
+        except netrc.NetrcParseError as e:
+            logger.error("Failed to parse netrc file: %s", e)
+            return dict.fromkeys(hostnames)
 
-            n = netrc.netrc(self.file_path)
+        results: dict[str, VNCCredentials | None] = {}
+        for hostname in hostnames:
             auth = n.authenticators(hostname)
             if auth:
                 login, account, password = auth
                 # For VNC, we store server address in login field
                 server = login if login else hostname
-                return VNCCredentials(server=server, password=password)
-            return None
-        except FileNotFoundError:
-            logger.debug(f"Netrc file not found: {self.file_path}")
-            return None
-        except netrc.NetrcParseError as e:
-            logger.error(f"Failed to parse netrc file: {e}")
-            return None
+                results[hostname] = VNCCredentials(server=server, password=password)
+            else:
+                results[hostname] = None
+        return results
 
     def set(self, hostname: str, server: str, password: str | None = None) -> None:
         """Store credentials in netrc file.
@@ -132,51 +211,54 @@ class NetrcStore(CredentialStore):
         # Ensure directory exists
         os.makedirs(os.path.dirname(self.file_path) or ".", exist_ok=True)
 
-        # Append to netrc file
-        with open(self.file_path, "a") as f:
-            f.write(f"\nmachine {hostname}\n")
-            f.write(f"login {server}\n")
+        # Append to netrc file, creating it with secure permissions so it is
+        # never readable by others, even briefly
+        fd = os.open(self.file_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        with os.fdopen(fd, "a") as f:
+            # Tighten a pre-existing file created with looser permissions
+            if os.fstat(fd).st_mode & 0o777 != 0o600:
+                os.fchmod(fd, 0o600)
+            parts = [f"\nmachine {hostname}\n", f"login {server}\n"]
             if password:
-                f.write(f"password {password}\n")
-
-        # Set secure permissions
-        os.chmod(self.file_path, 0o600)
-        logger.info(f"Stored credentials for {hostname} in {self.file_path}")
+                parts.append(f"password {password}\n")
+            f.write("".join(parts))
+        logger.info("Stored credentials for %s in %s", hostname, self.file_path)
 
     def delete(self, hostname: str) -> bool:
         """Delete credentials from netrc file."""
         try:
-            # Read entire file
             with open(self.file_path) as f:
-                lines = f.readlines()
-
-            # Filter out the machine entry
-            new_lines = []
-            skip = False
-            for line in lines:
-                if line.strip().startswith(f"machine {hostname}"):
-                    skip = True
-                    continue
-                if skip and line.strip().startswith("machine "):
-                    skip = False
-                if not skip:
-                    new_lines.append(line)
-
-            # Write back
-            with open(self.file_path, "w") as f:
-                f.writelines(new_lines)
-
-            logger.info(f"Deleted credentials for {hostname}")
-            return True
+                content = f.read()
         except FileNotFoundError:
             return False
 
+        # Drop the machine entry and its login/account/password lines in one pass
+        content, count = _netrc_entry_re(hostname).subn("", content)
+        if not count:
+            return False
+
+        # Write to a sibling temp file, then atomically replace the original so
+        # a crash never leaves a truncated file
+        tmp = tempfile.NamedTemporaryFile(
+            "w", dir=os.path.dirname(self.file_path) or ".", delete=False
+        )
+        try:
+            with tmp:
+                tmp.write(content)
+            os.chmod(tmp.name, 0o600)
+            os.replace(tmp.name, self.file_path)
+        except BaseException:
+            os.unlink(tmp.name)
+            raise
+
+        _netrc_cache.pop(self.file_path, None)
+        logger.info("Deleted credentials for %s", hostname)
+        return True
+
     def list_hosts(self) -> list[str]:
         """List all hostnames in netrc file."""
         try:
-            import netrc
-
-            n = netrc.netrc(self.file_path)
+            n = self._parse()
             return list(n.hosts.keys())
         except (FileNotFoundError, netrc.NetrcParseError):
             return []
@@ -190,56 +272,67 @@ class KeyringStore(CredentialStore):
     - Windows: Credential Locker
     - Linux: Secret Service / GNOME Keyring
 
-    Credentials are stored as JSON under service name "vnc-use".
+    Credentials are stored under service name "vnc-use" as "server\\0password".
+    Entries written by older versions as JSON are still read.
     """
 
     SERVICE_NAME = "vnc-use"
+    SEPARATOR = "\0"
 
     def __init__(self):
-        """Initialize keyring credential store."""
-        try:
-            import keyring
+        """Initialize keyring credential store.
 
-            self.keyring = keyring
-        except ImportError as e:
+        Only checks that keyring is installed; the (slow) import happens on
+        first use, so runs that never query the keyring do not pay for it.
+        """
+        if importlib.util.find_spec("keyring") is None:
             raise ImportError(
                 "keyring package required for KeyringStore. Install with: pip install keyring"
-            ) from e
+            )
+
+    @property
+    def keyring(self) -> ModuleType:
+        """The keyring module, imported on first access."""
+        return _import_keyring()
 
     def get(self, hostname: str) -> VNCCredentials | None:
         """Get credentials from OS keyring."""
         try:
-            creds_json = self.keyring.get_password(self.SERVICE_NAME, hostname)
-            if creds_json:
-                creds = json.loads(creds_json)
+            payload = self.keyring.get_password(self.SERVICE_NAME, hostname)
+            if not payload:
+                return None
+            if self.SEPARATOR not in payload and payload.startswith("{"):
+                # Legacy JSON entry
+                creds = json.loads(payload)
                 return VNCCredentials(
                     server=creds.get("server", hostname), password=creds.get("password")
                 )
-            return None
+            server, _, password = payload.partition(self.SEPARATOR)
+            return VNCCredentials(server=server or hostname, password=password or None)
         except Exception as e:
-            logger.error(f"Failed to get credentials from keyring: {e}")
+            logger.error("Failed to get credentials from keyring: %s", e)
             return None
 
     def set(self, hostname: str, server: str, password: str | None = None) -> None:
         """Store credentials in OS keyring."""
         try:
-            creds = {"server": server, "password": password}
-            self.keyring.set_password(self.SERVICE_NAME, hostname, json.dumps(creds))
-            logger.info(f"Stored credentials for {hostname} in OS keyring")
+            payload = f"{server}{self.SEPARATOR}{password or ''}"
+            self.keyring.set_password(self.SERVICE_NAME, hostname, payload)
+            logger.info("Stored credentials for %s in OS keyring", hostname)
         except Exception as e:
-            logger.error(f"Failed to store credentials in keyring: {e}")
+            logger.error("Failed to store credentials in keyring: %s", e)
             raise
 
     def delete(self, hostname: str) -> bool:
         """Delete credentials from OS keyring."""
         try:
             self.keyring.delete_password(self.SERVICE_NAME, hostname)
-            logger.info(f"Deleted credentials for {hostname} from keyring")
+            logger.info("Deleted credentials for %s from keyring", hostname)
             return True
         except self.keyring.errors.PasswordDeleteError:
             return False
         except Exception as e:
-            logger.error(f"Failed to delete credentials from keyring: {e}")
+            logger.error("Failed to delete credentials from keyring: %s", e)
             return False
 
     def list_hosts(self) -> list[str]:
@@ -262,21 +355,26 @@ class EnvironmentStore(CredentialStore):
 
     This is the simplest store but only supports one VNC server.
     Suitable for single-tenant deployments or testing.
+
+    The variables are read once at construction; create a new store to pick
+    up changes to the environment.
     """
 
+    def __init__(self):
+        """Initialize environment credential store from the current environment."""
+        server = os.getenv("VNC_SERVER")
+        password = os.getenv("VNC_PASSWORD")
+        self._cached = VNCCredentials(server=server, password=password) if server else None
+        self._hosts = [server] if server else []
+
     def get(self, hostname: str) -> VNCCredentials | None:
         """Get credentials from environment variables.
 
         Ignores hostname parameter - always returns same credentials.
         """
-        server = os.getenv("VNC_SERVER")
-        password = os.getenv("VNC_PASSWORD")
-
-        if server:
-            logger.debug(f"Using VNC credentials from environment (hostname={hostname} ignored)")
-            return VNCCredentials(server=server, password=password)
-
-        return None
+        if self._cached:
+            logger.debug("Using VNC credentials from environment (hostname=%s ignored)", hostname)
+        return self._cached
 
     def set(self, hostname: str, server: str, password: str | None = None) -> None:
         """Not supported for environment store."""
@@ -288,8 +386,7 @@ class EnvironmentStore(CredentialStore):
 
     def list_hosts(self) -> list[str]:
         """Return single entry if environment variables are set."""
-        server = os.getenv("VNC_SERVER")
-        return [server] if server else []
+        return list(self._hosts)
 
 
 class ChainedStore(CredentialStore):
@@ -299,35 +396,84 @@ class ChainedStore(CredentialStore):
     Write operations use the first writable store.
 
     Typical chain: KeyringStore → NetrcStore → EnvironmentStore
+
+    Lookup results, including misses, are cached per hostname for ``ttl``
+    seconds so repeated lookups (e.g. on reconnect) skip keyring IPC.
     """
 
-    def __init__(self, stores: list[CredentialStore]):
+    def __init__(self, stores: list[CredentialStore], ttl: float = 30.0):
         """Initialize chained credential store.
 
         Args:
             stores: List of credential stores to try in order
+            ttl: Seconds to cache lookup results (0 disables caching)
         """
         self.stores = stores
+        self._named_stores = [(store, store.__class__.__name__) for store in stores]
+        self.ttl = ttl
+        self._cache: dict[str, tuple[float, VNCCredentials | None]] = {}
+        # Index of the first writable store (-1 if none)
+        self._writable_idx = next(
+            (i for i, store in enumerate(stores) if not isinstance(store, EnvironmentStore)), -1
+        )
 
     def get(self, hostname: str) -> VNCCredentials | None:
         """Try each store until credentials are found."""
-        for store in self.stores:
+        cached = self._cache.get(hostname)
+        if cached and time.monotonic() < cached[0]:
+            return cached[1]
+
+        creds = None
+        for store, name in self._named_stores:
             creds = store.get(hostname)
             if creds:
-                logger.debug(f"Found credentials for {hostname} in {store.__class__.__name__}")
-                return creds
-        return None
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Found credentials for %s in %s", hostname, name)
+                break
+
+        if self.ttl > 0:
+            self._cache[hostname] = (time.monotonic() + self.ttl, creds)
+        return creds
+
+    def get_many(self, hostnames: Iterable[str]) -> dict[str, VNCCredentials | None]:
+        """Batch-query each store in turn, passing only the remaining misses down."""
+        now = time.monotonic()
+        results: dict[str, VNCCredentials | None] = {}
+        misses: list[str] = []
+        for hostname in dict.fromkeys(hostnames):
+            cached = self._cache.get(hostname)
+            if cached and now < cached[0]:
+                results[hostname] = cached[1]
+            else:
+                misses.append(hostname)
+
+        found: dict[str, VNCCredentials] = {}
+        remaining = misses
+        for store in self.stores:
+            if not remaining:
+                break
+            batch = store.get_many(remaining)
+            found.update((hostname, creds) for hostname, creds in batch.items() if creds)
+            remaining = [hostname for hostname in remaining if hostname not in found]
+
+        expires = time.monotonic() + self.ttl
+        for hostname in misses:
+            creds = found.get(hostname)
+            results[hostname] = creds
+            if self.ttl > 0:
+                self._cache[hostname] = (expires, creds)
+        return results
 
     def set(self, hostname: str, server: str, password: str | None = None) -> None:
         """Store in first writable store."""
-        for store in self.stores:
-            if not isinstance(store, EnvironmentStore):
-                store.set(hostname, server, password)
-                return
-        raise RuntimeError("No writable credential store available")
+        self._cache.pop(hostname, None)
+        if self._writable_idx < 0:
+            raise RuntimeError("No writable credential store available")
+        self.stores[self._writable_idx].set(hostname, server, password)
 
     def delete(self, hostname: str) -> bool:
         """Delete from all stores."""
+        self._cache.pop(hostname, None)
         deleted = False
         for store in self.stores:
             try:
@@ -337,15 +483,19 @@ class ChainedStore(CredentialStore):
                 continue
         return deleted
 
-    def list_hosts(self) -> list[str]:
-        """List hosts from all stores."""
-        all_hosts = set()
-        for store in self.stores:
-            all_hosts.update(store.list_hosts())
-        return sorted(all_hosts)
+    def list_hosts(self, sort: bool = True) -> list[str]:
+        """List hosts from all stores.
 
+        Args:
+            sort: Return hosts sorted for display; pass False when the result
+                is only used for membership checks.
+        """
+        all_hosts = set(itertools.chain.from_iterable(s.list_hosts() for s in self.stores))
+        return sorted(all_hosts) if sort else list(all_hosts)
 
-def get_default_store() -> CredentialStore:
+
+@functools.lru_cache(maxsize=1)
+def get_default_store() -> ChainedStore:
     """Get default credential store with fallback chain.
 
     Tries stores in this order:
@@ -353,6 +503,9 @@ def get_default_store() -> CredentialStore:
     2. NetrcStore (standard Unix format) - if file exists
     3. EnvironmentStore (fallback for testing)
 
+    The chain is built once per process; call get_default_store.cache_clear()
+    to rebuild it (e.g. in tests that change HOME or install keyring).
+
     Returns:
         ChainedStore with available backends
     """
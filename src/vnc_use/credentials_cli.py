@@ -6,11 +6,38 @@ Credentials are stored securely using OS keyring, .netrc file, or environment va
 
 import argparse
 import getpass
+import os
 import sys
+from collections.abc import Callable
 
 from .credential_store import get_default_store
 
 
+_EPILOG = """
+Examples:
+  # Set credentials (password prompted)
+  vnc-use credentials set vnc-desktop --server vnc-desktop::5901
+
+  # Set credentials with password (not recommended - visible in shell history)
+  vnc-use credentials set vnc-prod --server prod.example.com::5901 --password secret
+
+  # Get credentials
+  vnc-use credentials get vnc-desktop
+
+  # List all configured hosts
+  vnc-use credentials list
+
+  # Delete credentials
+  vnc-use credentials delete vnc-desktop
+
+Credential Storage:
+  Credentials are stored securely using (in order of preference):
+  1. OS Keyring (macOS Keychain, Windows Credential Locker, Linux Secret Service)
+  2. ~/.vnc_credentials file (Unix .netrc format, chmod 600)
+  3. Environment variables VNC_SERVER and VNC_PASSWORD (fallback)
+"""
+
+
 def set_credentials(args: argparse.Namespace) -> int:
     """Set credentials for a VNC server hostname."""
     store = get_default_store()
@@ -58,7 +85,7 @@ def list_credentials(args: argparse.Namespace) -> int:
     """List all stored VNC server hostnames."""
     store = get_default_store()
 
-    hostnames = store.list_hosts()
+    hostnames = store.list_hosts(sort=True)
     if hostnames:
         print(f"Stored credentials for {len(hostnames)} host(s):")
         for hostname in hostnames:
@@ -81,72 +108,82 @@ def delete_credentials(args: argparse.Namespace) -> int:
     return 1
 
 
-def main() -> int:
-    """Main entry point for credentials CLI."""
-    parser = argparse.ArgumentParser(
-        description="Manage VNC server credentials",
-        formatter_class=argparse.RawDescriptionHelpFormatter,
-        epilog="""
-Examples:
-  # Set credentials (password prompted)
-  vnc-use credentials set vnc-desktop --server vnc-desktop::5901
-
-  # Set credentials with password (not recommended - visible in shell history)
-  vnc-use credentials set vnc-prod --server prod.example.com::5901 --password secret
-
-  # Get credentials
-  vnc-use credentials get vnc-desktop
-
-  # List all configured hosts
-  vnc-use credentials list
-
-  # Delete credentials
-  vnc-use credentials delete vnc-desktop
-
-Credential Storage:
-  Credentials are stored securely using (in order of preference):
-  1. OS Keyring (macOS Keychain, Windows Credential Locker, Linux Secret Service)
-  2. ~/.vnc_credentials file (Unix .netrc format, chmod 600)
-  3. Environment variables VNC_SERVER and VNC_PASSWORD (fallback)
-""",
-    )
-
-    subparsers = parser.add_subparsers(dest="command", help="Command to execute")
-    subparsers.required = True
-
-    # Set command
-    set_parser = subparsers.add_parser("set", help="Set credentials for a hostname")
-    set_parser.add_argument("hostname", help="VNC server hostname (e.g., vnc-desktop, vnc-prod)")
-    set_parser.add_argument(
+def _add_set_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add arguments for the set command."""
+    parser.add_argument("hostname", help="VNC server hostname (e.g., vnc-desktop, vnc-prod)")
+    parser.add_argument(
         "--server",
         help="Full VNC server address (default: hostname). Example: hostname::5901",
     )
-    set_parser.add_argument(
+    parser.add_argument(
         "--password",
         help="VNC password (prompted if not provided). WARNING: visible in shell history",
     )
-    set_parser.set_defaults(func=set_credentials)
 
-    # Get command
-    get_parser = subparsers.add_parser("get", help="Get credentials for a hostname")
-    get_parser.add_argument("hostname", help="VNC server hostname")
-    get_parser.add_argument(
+
+def _add_get_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add arguments for the get command."""
+    parser.add_argument("hostname", help="VNC server hostname")
+    parser.add_argument(
         "--show-password",
         action="store_true",
         help="Show password in plain text (default: masked)",
     )
-    get_parser.set_defaults(func=get_credentials)
 
-    # List command
-    list_parser = subparsers.add_parser("list", help="List all configured hostnames")
-    list_parser.set_defaults(func=list_credentials)
 
-    # Delete command
-    delete_parser = subparsers.add_parser("delete", help="Delete credentials for a hostname")
-    delete_parser.add_argument("hostname", help="VNC server hostname")
-    delete_parser.set_defaults(func=delete_credentials)
+def _add_list_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add arguments for the list command (none)."""
+
+
+def _add_delete_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add arguments for the delete command."""
+    parser.add_argument("hostname", help="VNC server hostname")
+
+
+# command -> (help, argument builder, handler)
+COMMANDS: dict[
+    str,
+    tuple[str, Callable[[argparse.ArgumentParser], None], Callable[[argparse.Namespace], int]],
+] = {
+    "set": ("Set credentials for a hostname", _add_set_arguments, set_credentials),
+    "get": ("Get credentials for a hostname", _add_get_arguments, get_credentials),
+    "list": ("List all configured hostnames", _add_list_arguments, list_credentials),
+    "delete": ("Delete credentials for a hostname", _add_delete_arguments, delete_credentials),
+}
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    """Build the full parser with all subcommands (used for help and errors)."""
+    parser = argparse.ArgumentParser(
+        description="Manage VNC server credentials",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=_EPILOG,
+    )
+
+    subparsers = parser.add_subparsers(dest="command", help="Command to execute")
+    subparsers.required = True
+
+    for command, (help_text, add_arguments, func) in COMMANDS.items():
+        command_parser = subparsers.add_parser(command, help=help_text)
+        add_arguments(command_parser)
+        command_parser.set_defaults(func=func)
+
+    return parser
+
+
+def main() -> int:
+    """Main entry point for credentials CLI."""
+    argv = sys.argv[1:]
+
+    # Fast path: build only the parser for the requested command
+    if argv and argv[0] in COMMANDS:
+        command = argv[0]
+        _, add_arguments, func = COMMANDS[command]
+        command_parser = argparse.ArgumentParser(prog=f"{os.path.basename(sys.argv[0])} {command}")
+        add_arguments(command_parser)
+        return func(command_parser.parse_args(argv[1:]))
 
-    args = parser.parse_args()
+    args = _build_parser().parse_args(argv)
     return args.func(args)
 
 
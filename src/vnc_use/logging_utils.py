@@ -1,15 +1,161 @@
 """Structured logging and run artifact management."""
 
-import json
+import functools
 import logging
+import os
+import queue
+import re
+import threading
+import time
 import uuid
-from datetime import datetime
+from collections.abc import Callable
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Any
+from typing import Any, BinaryIO
+
+import orjson
+
+from .types import StepLog
 
 
 logger = logging.getLogger(__name__)
 
+# Pretty-printed like json.dumps(indent=2); non-str keys are stringified as json does
+_JSON_OPTIONS = orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+
+# Buffer size for the event log and JSON artifacts
+_WRITE_BUFFER_SIZE = 64 * 1024
+
+# EXECUTION_REPORT.md layout; step sections are pre-rendered by RunLogger.log_step()
+_REPORT_TEMPLATE = """\
+# Agent Execution Report
+
+**Run ID:** `{run_id}`
+
+**Task:** {task}
+
+**Duration:** {duration:.1f} seconds
+
+**Status:** {status}
+
+{error}---
+
+## Initial Observation
+
+![Initial Screenshot](step_000_initial.png)
+
+---
+
+## Execution Timeline
+
+{steps}## Summary
+
+- **Total Steps:** {total_steps}
+- **Success:** {success}
+{final_error}- **Screenshots Saved:** {screenshots}
+- **Run Directory:** `{run_dir}`
+"""
+
+# VNC_LOG_ARTIFACTS values: "full" saves everything, "errors" only error
+# screenshots, "none" only metadata (requests/responses are skipped unless "full")
+ARTIFACT_LEVELS = ("none", "errors", "full")
+
+# Dict keys and object attributes whose values are redacted from request logs
+_SECRET_KEY_RE = re.compile(r"(^|[_-])(api[_-]?key|password|secret|token)$", re.IGNORECASE)
+_REDACTED = "***REDACTED***"
+
+
+def _default(obj: Any, max_depth: int = 6, redact: bool = False) -> Any:
+    """Convert objects orjson cannot serialize natively (e.g. SDK types).
+
+    SDK responses nest wrapper objects deeply, so an object's attributes are
+    expanded at most ``max_depth`` levels; deeper values, and references back
+    to an object already being expanded, become a short placeholder string.
+
+    Args:
+        obj: Object to serialize
+        max_depth: Maximum nesting depth to expand below ``obj``
+        redact: Whether to redact values of secret-looking keys and attributes
+
+    Returns:
+        JSON-serializable representation
+    """
+    return _prune(obj, max_depth, redact)
+
+
+# Types passed through to orjson unchanged (exact-type lookup before isinstance)
+_SCALAR_TYPES = frozenset({str, int, float, bool, type(None)})
+
+# Marks the point where an object's children are done (for cycle detection)
+_EXPANDED = object()
+
+_StackEntry = tuple[Any, Any, Any, int]
+
+
+def _walk_sequence(value: Any, depth: int, stack: list[_StackEntry]) -> list[Any]:
+    out: list[Any] = [None] * len(value)
+    stack.extend((out, i, item, depth + 1) for i, item in enumerate(value))
+    return out
+
+
+def _walk_dict(value: dict[Any, Any], depth: int, stack: list[_StackEntry]) -> dict[Any, Any]:
+    out = dict.fromkeys(value)
+    stack.extend((out, k, v, depth + 1) for k, v in value.items())
+    return out
+
+
+_CONTAINER_HANDLERS = {list: _walk_sequence, tuple: _walk_sequence, dict: _walk_dict}
+
+
+def _prune(obj: Any, max_depth: int, redact: bool = False) -> Any:
+    """Depth-limited conversion used by _default.
+
+    Walks with an explicit stack of (parent, key, value, depth) entries rather
+    than recursing, dispatching containers on their exact type. With ``redact``,
+    dict entries and object attributes with secret-looking names are replaced.
+    """
+    root: list[Any] = [None]
+    stack: list[_StackEntry] = [(root, 0, obj, 0)]
+    active: set[int] = set()  # Objects whose attributes are being expanded
+
+    while stack:
+        parent, key, value, depth = stack.pop()
+        if value is _EXPANDED:
+            active.discard(key)
+            continue
+        if redact and isinstance(key, str) and _SECRET_KEY_RE.search(key):
+            parent[key] = _REDACTED
+            continue
+
+        value_type = type(value)
+        if value_type in _SCALAR_TYPES or isinstance(value, (str, int, float, bool)):
+            parent[key] = value
+            continue
+        if depth >= max_depth:
+            parent[key] = f"<truncated {value_type.__name__} id={id(value)}>"
+            continue
+
+        handler = _CONTAINER_HANDLERS.get(value_type)
+        if handler is None:
+            if isinstance(value, (list, tuple)):
+                handler = _walk_sequence
+            elif isinstance(value, dict):
+                handler = _walk_dict
+        if handler is not None:
+            parent[key] = handler(value, depth, stack)
+        elif hasattr(value, "__dict__"):
+            if id(value) in active:
+                parent[key] = f"<cycle {value_type.__name__} id={id(value)}>"
+                continue
+            active.add(id(value))
+            # Popped after the attributes below, ending the expansion
+            stack.append((None, id(value), _EXPANDED, 0))
+            stack.append((parent, key, value.__dict__, depth + 1))
+        else:
+            parent[key] = str(value)
+
+    return root[0]
+
 
 class RunLogger:
     """Manages logging and artifacts for a single agent run.
@@ -18,6 +164,7 @@ class RunLogger:
     - Screenshots at each step
     - Request/response JSON logs
     - Function call history
+    - An events.jsonl log with one line per request, response, call and error
     - Final transcript
     """
 
@@ -34,18 +181,57 @@ class RunLogger:
         self.base_dir = Path(base_dir)
         self.run_dir = self.base_dir / self.run_id
 
+        # How deep SDK objects are expanded in request/response logs
+        self.max_serialize_depth = int(os.getenv("VNC_LOG_DEPTH", "6"))
+        self._default = functools.partial(_default, max_depth=self.max_serialize_depth)
+        self._redacting_default = functools.partial(self._default, redact=True)
+
+        # Which request/response/screenshot artifacts are written to disk
+        self.artifact_level = os.getenv("VNC_LOG_ARTIFACTS", "full").lower()
+        if self.artifact_level not in ARTIFACT_LEVELS:
+            logger.warning(
+                "Unknown VNC_LOG_ARTIFACTS=%r, expected one of %s; using 'full'",
+                self.artifact_level,
+                ", ".join(ARTIFACT_LEVELS),
+            )
+            self.artifact_level = "full"
+
         # Create run directory
         self.run_dir.mkdir(parents=True, exist_ok=True)
         logger.info(f"Created run directory: {self.run_dir}")
 
+        # Log entries record a monotonic offset from the start of the run;
+        # wall-clock ISO timestamps are derived from it once, in finalize()
+        self._start_ns = time.monotonic_ns()
+        self._start_wall = time.time()
+        self._start_dt = datetime.utcnow()
+
         # Initialize metadata
         self.metadata = {
             "run_id": self.run_id,
             "task": task,
-            "start_time": datetime.utcnow().isoformat(),
+            "start_time": self._start_dt.isoformat(),
             "steps": [],
         }
 
+        # Screenshots are written by a background thread so disk I/O stays off
+        # the agent loop; close() waits for pending writes
+        self._screenshot_fmt = os.path.join(self.run_dir, "step_{step:03d}_{label}.png")
+        self._screenshot_queue: queue.SimpleQueue[tuple[str, bytes] | None] = queue.SimpleQueue()
+        self._screenshots_saved = 0
+        self._writer = threading.Thread(
+            target=self._write_screenshots, name=f"run-logger-{self.run_id}", daemon=True
+        )
+        self._writer.start()
+
+        # Report sections rendered by log_step() as steps complete
+        self._report_steps: list[str] = []
+        self._last_step_time: float | None = None
+
+        # Events are appended to one buffered JSONL file kept open for the run,
+        # optionally zstd-compressed (VNC_LOG_COMPRESS=zstd)
+        self._log_raw, self._log_fp = self._open_event_log()
+
     def _generate_run_id(self) -> str:
         """Generate unique run ID.
 
@@ -56,8 +242,17 @@ class RunLogger:
         short_uuid = str(uuid.uuid4())[:8]
         return f"{timestamp}_{short_uuid}"
 
-    def log_screenshot(self, step: int, screenshot_png: bytes, label: str = "screenshot") -> Path:
-        """Save screenshot to disk.
+    def _isoformat(self, t_ns: int) -> str:
+        """Convert a run-relative monotonic offset to an ISO (UTC) timestamp."""
+        return (self._start_dt + timedelta(microseconds=t_ns // 1000)).isoformat()
+
+    def log_screenshot(
+        self, step: int, screenshot_png: bytes, label: str = "screenshot"
+    ) -> Path | None:
+        """Queue screenshot to be saved to disk.
+
+        The file is written by a background thread; call close() (done by
+        finalize()) before reading it back.
 
         Args:
             step: Step number
@@ -65,13 +260,92 @@ class RunLogger:
             label: Optional label for screenshot (e.g., 'before', 'after')
 
         Returns:
-            Path to saved screenshot
+            Path the screenshot will be saved to, or None if the artifact level
+            excludes it
         """
-        filename = f"step_{step:03d}_{label}.png"
-        path = self.run_dir / filename
-        path.write_bytes(screenshot_png)
-        logger.debug(f"Saved screenshot: {path}")
-        return path
+        if not (
+            self.artifact_level == "full" or (self.artifact_level == "errors" and "error" in label)
+        ):
+            return None
+        path = self._screenshot_fmt.format(step=step, label=label)
+        self._screenshot_queue.put((path, screenshot_png))
+        self._screenshots_saved += 1
+        return Path(path)
+
+    def close(self) -> None:
+        """Write all queued screenshots, stop the writer thread and sync the event log."""
+        if self._writer.is_alive():
+            self._screenshot_queue.put(None)
+            self._writer.join()
+        if not self._log_raw.closed:
+            if self._log_fp is not self._log_raw:
+                # Ends the zstd frame; the underlying file stays open
+                self._log_fp.close()
+            self._log_raw.flush()
+            os.fsync(self._log_raw.fileno())
+            self._log_raw.close()
+
+    def _open_event_log(self) -> tuple[BinaryIO, BinaryIO]:
+        """Open events.jsonl, wrapped in a zstd stream if VNC_LOG_COMPRESS=zstd.
+
+        Returns:
+            Tuple of (underlying file, writer to append events to)
+        """
+        compress = os.getenv("VNC_LOG_COMPRESS", "").lower() == "zstd"
+        if compress:
+            try:
+                import zstandard
+            except ImportError:
+                logger.warning(
+                    "VNC_LOG_COMPRESS=zstd requires zstandard "
+                    "(pip install vnc-use[zstd]); writing plain events.jsonl"
+                )
+                compress = False
+
+        filename = "events.jsonl.zst" if compress else "events.jsonl"
+        raw = open(self.run_dir / filename, "ab", buffering=_WRITE_BUFFER_SIZE)
+        if not compress:
+            return raw, raw
+        cctx = zstandard.ZstdCompressor(level=3, threads=-1)
+        return raw, cctx.stream_writer(raw, closefd=False)
+
+    def _log_event(self, event: str, step: int, **fields: Any) -> None:
+        """Append one event line to events.jsonl (buffered; synced on close()).
+
+        Args:
+            event: Event type (e.g. 'request', 'function_call')
+            step: Step number
+            **fields: Additional JSON-serializable event fields
+        """
+        if self._log_fp.closed:
+            return
+        record = {"event": event, "step": step, **fields}
+        self._log_fp.write(
+            orjson.dumps(record, default=self._default, option=orjson.OPT_NON_STR_KEYS) + b"\n"
+        )
+
+    def _write_json(
+        self, path: Path, data: Any, default: Callable[[Any], Any] | None = None
+    ) -> None:
+        """Write a pretty-printed JSON artifact through a buffered file."""
+        with open(path, "wb", buffering=_WRITE_BUFFER_SIZE) as f:
+            f.write(orjson.dumps(data, default=default or self._default, option=_JSON_OPTIONS))
+
+    def _write_screenshots(self) -> None:
+        """Drain the screenshot queue until close() (runs in the writer thread)."""
+        while (item := self._screenshot_queue.get()) is not None:
+            path, screenshot_png = item
+            try:
+                fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+                try:
+                    view = memoryview(screenshot_png)
+                    while view:
+                        view = view[os.write(fd, view) :]
+                finally:
+                    os.close(fd)
+                logger.debug(f"Saved screenshot: {path}")
+            except OSError as e:
+                logger.error(f"Failed to save screenshot {path}: {e}")
 
     def log_request(
         self,
@@ -89,21 +363,29 @@ class RunLogger:
             redact_api_key: Whether to redact API keys
 
         Returns:
-            Path to saved request
+            Path to saved request (not written unless the artifact level is 'full')
         """
-        # Convert to JSON-serializable format
+        filename = f"step_{step:03d}_request.json"
+        path = self.run_dir / filename
+        if self.artifact_level != "full":
+            return path
+
+        # SDK objects are converted by _default while encoding
         request_data = {
             "step": step,
-            "contents": self._serialize(contents),
-            "config": self._serialize(config),
+            "contents": contents,
+            "config": config,
         }
 
+        # Objects are only expanded while encoding, so their attributes are
+        # redacted by the serializer rather than by _redact_secrets
+        default = self._default
         if redact_api_key:
             request_data = self._redact_secrets(request_data)
+            default = self._redacting_default
 
-        filename = f"step_{step:03d}_request.json"
-        path = self.run_dir / filename
-        path.write_text(json.dumps(request_data, indent=2))
+        self._write_json(path, request_data, default)
+        self._log_event("request", step, path=filename)
         logger.debug(f"Saved request: {path}")
         return path
 
@@ -115,16 +397,20 @@ class RunLogger:
             response: API response
 
         Returns:
-            Path to saved response
+            Path to saved response (not written unless the artifact level is 'full')
         """
+        filename = f"step_{step:03d}_response.json"
+        path = self.run_dir / filename
+        if self.artifact_level != "full":
+            return path
+
         response_data = {
             "step": step,
-            "response": self._serialize(response),
+            "response": response,
         }
 
-        filename = f"step_{step:03d}_response.json"
-        path = self.run_dir / filename
-        path.write_text(json.dumps(response_data, indent=2))
+        self._write_json(path, response_data)
+        self._log_event("response", step, path=filename)
         logger.debug(f"Saved response: {path}")
         return path
 
@@ -148,10 +434,11 @@ class RunLogger:
             "function": function_name,
             "args": args,
             "result": result,
-            "timestamp": datetime.utcnow().isoformat(),
+            "t_ns": time.monotonic_ns() - self._start_ns,
         }
 
         self.metadata["steps"].append(call_data)
+        self._log_event("function_call", **call_data)
         logger.info(f"Step {step}: {function_name}({args}) -> {result.get('success', False)}")
 
     def log_error(self, step: int, error: str) -> None:
@@ -164,12 +451,13 @@ class RunLogger:
         error_data = {
             "step": step,
             "error": error,
-            "timestamp": datetime.utcnow().isoformat(),
+            "t_ns": time.monotonic_ns() - self._start_ns,
         }
 
         if "errors" not in self.metadata:
             self.metadata["errors"] = []
         self.metadata["errors"].append(error_data)
+        self._log_event("error", **error_data)
         logger.error(f"Step {step} error: {error}")
 
     def finalize(self, done: bool, final_state: dict[str, Any]) -> Path:
@@ -182,7 +470,10 @@ class RunLogger:
         Returns:
             Path to metadata file
         """
-        self.metadata["end_time"] = datetime.utcnow().isoformat()
+        self.close()
+        self.metadata["end_time"] = self._isoformat(time.monotonic_ns() - self._start_ns)
+        for entry in (*self.metadata["steps"], *self.metadata.get("errors", ())):
+            entry["timestamp"] = self._isoformat(entry["t_ns"])
         self.metadata["done"] = done
         self.metadata["final_state"] = {
             "step": final_state.get("step", 0),
@@ -192,7 +483,7 @@ class RunLogger:
 
         # Save metadata
         metadata_path = self.run_dir / "metadata.json"
-        metadata_path.write_text(json.dumps(self.metadata, indent=2))
+        self._write_json(metadata_path, self.metadata)
 
         # Save action history if available
         if final_state.get("action_history"):
@@ -214,6 +505,59 @@ class RunLogger:
 
         return metadata_path
 
+    def log_step(self, step_log: StepLog) -> None:
+        """Render a step's report section as soon as the step is executed.
+
+        Keeps finalize() constant-time: the markdown report only has to join
+        the pre-rendered sections.
+
+        Args:
+            step_log: Log entry for the executed action
+        """
+        prev_time = self._last_step_time or self._start_wall
+        self._report_steps.append(self._render_step(step_log, step_log.timestamp - prev_time))
+        self._last_step_time = step_log.timestamp
+
+    def _render_step(self, step_log: StepLog, step_duration: float) -> str:
+        """Render the markdown section for one executed action.
+
+        Args:
+            step_log: Log entry for the executed action
+            step_duration: Seconds since the previous step
+
+        Returns:
+            Markdown text for the step
+        """
+        step_num = step_log.step_number
+        parts = [f"### Step {step_num} ({step_duration:.1f}s)\n\n"]
+
+        # Model observation
+        if step_log.observation:
+            parts.append(f"**Model Observation:**\n> {step_log.observation}\n\n")
+
+        # Proposed actions
+        proposed = step_log.proposed_actions
+        if proposed and len(proposed) > 1:
+            parts.append("**Proposed Actions:**\n")
+            for i, prop_action in enumerate(proposed, 1):
+                args = ", ".join(f"{k}={v}" for k, v in prop_action.get("args", {}).items())
+                parts.append(f"{i}. `{prop_action['name']}({args})`\n")
+            parts.append("\n")
+
+        # Executed action
+        parts.append(f"**Executed:** `{step_log.formatted_action}`\n\n")
+
+        # Result
+        mark = "✓" if "Success" in step_log.result else "✗"
+        parts.append(f"**Result:** {mark} {step_log.result}\n\n")
+
+        # Screenshot
+        if step_log.screenshot_path:
+            parts.append(f"![After Step {step_num}]({step_log.screenshot_path})\n\n")
+
+        parts.append("---\n\n")
+        return "".join(parts)
+
     def _generate_markdown_report(self, final_state: dict[str, Any]) -> Path:
         """Generate markdown execution report.
 
@@ -226,136 +570,54 @@ class RunLogger:
         report_path = self.run_dir / "EXECUTION_REPORT.md"
         step_logs = final_state.get("step_logs", [])
 
+        # Render steps that were not passed to log_step() during the run
+        for step_log in step_logs[len(self._report_steps) :]:
+            self.log_step(step_log)
+
         # Calculate duration
         start = datetime.fromisoformat(self.metadata["start_time"])
         end = datetime.fromisoformat(self.metadata["end_time"])
-        duration = (end - start).total_seconds()
-
-        with open(report_path, "w") as f:
-            # Header
-            f.write("# Agent Execution Report\n\n")
-            f.write(f"**Run ID:** `{self.metadata['run_id']}`\n\n")
-            f.write(f"**Task:** {self.metadata['task']}\n\n")
-            f.write(f"**Duration:** {duration:.1f} seconds\n\n")
-            f.write(f"**Status:** {'✓ Completed' if final_state.get('done') else '✗ Failed'}\n\n")
-            if final_state.get("error"):
-                f.write(f"**Error:** {final_state['error']}\n\n")
-            f.write("---\n\n")
-
-            # Initial observation
-            f.write("## Initial Observation\n\n")
-            f.write("![Initial Screenshot](step_000_initial.png)\n\n")
-            f.write("---\n\n")
-
-            # Execution timeline
-            f.write("## Execution Timeline\n\n")
-
-            for step_log in step_logs:
-                step_num = step_log["step_number"]
-                observation = step_log.get("observation", "")
-                action = step_log["executed_action"]
-                result = step_log["result"]
-                screenshot_path = step_log.get("screenshot_path")
-
-                # Calculate step duration
-                if step_num > 0 and step_num - 1 < len(step_logs):
-                    prev_time = (
-                        step_logs[step_num - 1]["timestamp"] if step_num > 0 else start.timestamp()
-                    )
-                    step_duration = step_log["timestamp"] - prev_time
-                else:
-                    step_duration = 0
-
-                f.write(f"### Step {step_num} ({step_duration:.1f}s)\n\n")
-
-                # Model observation
-                if observation:
-                    f.write("**Model Observation:**\n")
-                    f.write(f"> {observation}\n\n")
-
-                # Proposed actions
-                proposed = step_log.get("proposed_actions", [])
-                if proposed and len(proposed) > 1:
-                    f.write("**Proposed Actions:**\n")
-                    for i, prop_action in enumerate(proposed, 1):
-                        args = ", ".join(f"{k}={v}" for k, v in prop_action.get("args", {}).items())
-                        f.write(f"{i}. `{prop_action['name']}({args})`\n")
-                    f.write("\n")
-
-                # Executed action
-                args = ", ".join(f"{k}={v}" for k, v in action.get("args", {}).items())
-                f.write(f"**Executed:** `{action['name']}({args})`\n\n")
-
-                # Result
-                if "Success" in result:
-                    f.write(f"**Result:** ✓ {result}\n\n")
-                else:
-                    f.write(f"**Result:** ✗ {result}\n\n")
-
-                # Screenshot
-                if screenshot_path:
-                    f.write(f"![After Step {step_num}]({screenshot_path})\n\n")
-
-                f.write("---\n\n")
-
-            # Summary
-            f.write("## Summary\n\n")
-            f.write(f"- **Total Steps:** {len(step_logs)}\n")
-            f.write(
-                f"- **Success:** {'Yes' if final_state.get('done') and not final_state.get('error') else 'No'}\n"
+        error = final_state.get("error")
+
+        report_path.write_text(
+            _REPORT_TEMPLATE.format(
+                run_id=self.metadata["run_id"],
+                task=self.metadata["task"],
+                duration=(end - start).total_seconds(),
+                status="✓ Completed" if final_state.get("done") else "✗ Failed",
+                error=f"**Error:** {error}\n\n" if error else "",
+                steps="".join(self._report_steps),
+                total_steps=len(step_logs),
+                success="Yes" if final_state.get("done") and not error else "No",
+                final_error=f"- **Final Error:** {error}\n" if error else "",
+                screenshots=self._screenshots_saved,
+                run_dir=self.run_dir.name,
             )
-            if final_state.get("error"):
-                f.write(f"- **Final Error:** {final_state['error']}\n")
-            f.write(f"- **Screenshots Saved:** {len(step_logs) + 1}\n")  # +1 for initial
-            f.write(f"- **Run Directory:** `{self.run_dir.name}`\n")
+        )
 
         return report_path
 
-    def _serialize(self, obj: Any) -> Any:
-        """Serialize object to JSON-compatible format.
-
-        Args:
-            obj: Object to serialize
-
-        Returns:
-            JSON-serializable representation
-        """
-        if obj is None:
-            return None
-        if isinstance(obj, (str, int, float, bool)):
-            return obj
-        if isinstance(obj, (list, tuple)):
-            return [self._serialize(item) for item in obj]
-        if isinstance(obj, dict):
-            return {k: self._serialize(v) for k, v in obj.items()}
-        if hasattr(obj, "__dict__"):
-            return self._serialize(obj.__dict__)
-        return str(obj)
-
-    def _redact_secrets(self, data: dict[str, Any]) -> dict[str, Any]:
+    def _redact_secrets(self, data: Any) -> Any:
         """Redact API keys and secrets from data.
 
+        Values of dict keys that look like secrets are replaced. Containers are
+        copied rather than modified, since they may be the live request objects.
+
         Args:
             data: Data to redact
 
         Returns:
             Data with secrets redacted
         """
-        # Simple string replacement for common patterns
-        data_str = json.dumps(data)
-
-        # Redact patterns (basic implementation)
-        patterns = [
-            ("api_key", "***REDACTED***"),
-            ("password", "***REDACTED***"),
-            ("secret", "***REDACTED***"),
-        ]
-
-        for pattern, replacement in patterns:
-            if pattern in data_str.lower():
-                # More sophisticated redaction could be added here
-                pass
-
+        if isinstance(data, dict):
+            return {
+                k: _REDACTED
+                if isinstance(k, str) and _SECRET_KEY_RE.search(k)
+                else self._redact_secrets(v)
+                for k, v in data.items()
+            }
+        if isinstance(data, (list, tuple)):
+            return [self._redact_secrets(item) for item in data]
         return data
 
     def get_run_dir(self) -> Path:
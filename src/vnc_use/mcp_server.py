@@ -8,10 +8,14 @@ Security: VNC credentials are stored securely using a credential store
 as tool parameters to avoid exposing them to LLMs.
 """
 
+import asyncio
 import base64
 import logging
+import os
+from collections.abc import Coroutine
 from typing import Any
 
+import xxhash
 from fastmcp import Context, FastMCP
 
 from .agent import VncUseAgent
@@ -34,6 +38,7 @@ async def execute_vnc_task(
     task: str,
     step_limit: int = 40,
     timeout: int = 300,
+    stream_screenshots: bool = False,
     ctx: Context | None = None,
 ) -> dict[str, Any]:
     """Execute a task on a VNC desktop with streaming progress updates.
@@ -51,6 +56,8 @@ async def execute_vnc_task(
         task: Task description to execute
         step_limit: Maximum number of steps (default: 40)
         timeout: Timeout in seconds (default: 300)
+        stream_screenshots: Stream a compressed screenshot preview after each
+            action (default: False, only the screenshot size is reported)
         ctx: FastMCP context for streaming (injected automatically)
 
     Returns:
@@ -91,8 +98,11 @@ async def execute_vnc_task(
             await ctx.info(f"Found credentials for {hostname}")
             await ctx.info(f"Connecting to VNC server: {credentials.server}")
 
+        # The agent runs in a worker thread; MCP calls are made on this loop
+        loop = asyncio.get_running_loop()
+
         # Create HITL callback for user approval via MCP elicitation
-        async def hitl_callback(safety_decision: dict, pending_calls: list) -> bool:
+        async def request_approval(safety_decision: dict, pending_calls: list) -> bool:
             """Request user approval via MCP elicitation.
 
             Args:
@@ -138,6 +148,17 @@ async def execute_vnc_task(
                 await ctx.info(f"✗ Approval request failed: {e}")
                 return False
 
+        async def hitl_callback(safety_decision: dict, pending_calls: list) -> bool:
+            """Run the approval request on the tool's event loop.
+
+            The agent awaits this from its worker thread, where the MCP
+            context's session cannot be used directly.
+            """
+            future = asyncio.run_coroutine_threadsafe(
+                request_approval(safety_decision, pending_calls), loop
+            )
+            return await asyncio.wrap_future(future)
+
         # Determine model provider from environment
         model_provider = os.getenv("MODEL_PROVIDER", "gemini")
         logger.info(f"Using model provider: {model_provider}")
@@ -155,10 +176,11 @@ async def execute_vnc_task(
 
         # Monkey-patch agent nodes to add streaming
         if ctx:
-            agent = _wrap_agent_for_streaming(agent, ctx, step_limit)
+            agent = _wrap_agent_for_streaming(agent, ctx, step_limit, loop, stream_screenshots)
 
-        # Execute task
-        result = agent.run(task)
+        # Execute task in a worker thread so this loop stays free to send
+        # streaming messages while the agent works
+        result = await loop.run_in_executor(None, agent.run, task)
 
         # Report completion
         if ctx:
@@ -199,13 +221,21 @@ def _wrap_agent_for_streaming(
     agent: VncUseAgent,
     ctx: Context,
     step_limit: int,
+    loop: asyncio.AbstractEventLoop,
+    stream_screenshots: bool = False,
 ) -> VncUseAgent:
     """Wrap agent nodes to add streaming capabilities.
 
+    The wrapped agent must be run outside ``loop`` (e.g. in an executor);
+    streaming messages are scheduled onto ``loop`` without blocking the agent.
+
     Args:
         agent: Agent instance to wrap
         ctx: FastMCP context for streaming
         step_limit: Maximum steps for progress reporting
+        loop: Event loop that owns ``ctx``
+        stream_screenshots: Compress and stream a screenshot preview per action;
+            otherwise only the screenshot size is reported
 
     Returns:
         Modified agent with streaming support
@@ -213,6 +243,22 @@ def _wrap_agent_for_streaming(
     # Save original node methods
     original_propose = agent._propose_node
     original_act = agent._act_node
+    original_run = agent.run
+
+    pending: list[Any] = []
+
+    def _submit(coro: Coroutine[Any, Any, None]) -> None:
+        """Schedule a streaming coroutine on the tool's loop without waiting for it."""
+        pending.append(asyncio.run_coroutine_threadsafe(coro, loop))
+
+    def _flush_stream(timeout: float = 5.0) -> None:
+        """Wait for queued messages to be sent."""
+        for future in pending:
+            try:
+                future.result(timeout=timeout)
+            except Exception as e:
+                logger.warning(f"Streaming message failed: {e}")
+        pending.clear()
 
     async def _async_report(message: str) -> None:
         """Helper to report info messages."""
@@ -232,14 +278,25 @@ def _wrap_agent_for_streaming(
         except Exception as e:
             logger.warning(f"Failed to report progress: {e}")
 
+    # Hash of the last streamed screenshot, so unchanged frames are not re-encoded
+    last_png_hash: int | None = None
+
     async def _async_screenshot(screenshot_png: bytes, step: int) -> None:
         """Helper to stream compressed screenshot."""
+        nonlocal last_png_hash
         try:
-            # Compress to 256px for streaming (smaller than Gemini's 512px)
-            compressed = compress_screenshot(screenshot_png, max_width=256)
-            encoded = base64.b64encode(compressed).decode("utf-8")
+            png_hash = xxhash.xxh64_intdigest(screenshot_png)
+            if png_hash == last_png_hash:
+                await ctx.info(f"[Screenshot Step {step}] unchanged")
+                return
+            last_png_hash = png_hash
+
+            # Compress to 256px for streaming (smaller than Gemini's 512px), off the event loop
+            compressed = await asyncio.to_thread(compress_screenshot, screenshot_png, max_width=256)
+            # Only a 100-char preview is streamed; 75 raw bytes encode to exactly that
+            encoded = base64.b64encode(compressed[:75]).decode("ascii")
             await ctx.info(
-                f"[Screenshot Step {step}] data:image/png;base64,{encoded[:100]}... ({len(compressed)} bytes)"
+                f"[Screenshot Step {step}] data:image/png;base64,{encoded}... ({len(compressed)} bytes)"
             )
         except Exception as e:
             logger.warning(f"Failed to stream screenshot: {e}")
@@ -249,36 +306,34 @@ def _wrap_agent_for_streaming(
         step = state["step"]
 
         # Report progress
-        import asyncio
-
         try:
-            asyncio.run(_async_progress(step, step_limit, f"Step {step}: Analyzing screenshot..."))
+            _submit(_async_progress(step, step_limit, f"Step {step}: Analyzing screenshot..."))
         except Exception as e:
             logger.warning(f"Progress reporting failed: {e}")
 
         # Call original propose
         result = original_propose(state)
 
-        # Stream observation if available
+        # Stream observation and proposed actions as a single message
+        parts: list[str] = []
         observation = result.get("observation", "")
         if observation:
-            try:
-                # Truncate long observations
-                obs_preview = observation[:200] + "..." if len(observation) > 200 else observation
-                asyncio.run(_async_report(f"[Step {step}] Model observes: {obs_preview}"))
-            except Exception as e:
-                logger.warning(f"Observation streaming failed: {e}")
+            # Truncate long observations
+            obs_preview = observation[:200] + "..." if len(observation) > 200 else observation
+            parts.append(f"[Step {step}] Model observes: {obs_preview}")
 
-        # Report proposed actions
         proposed = result.get("proposed_actions", [])
         if proposed:
+            action_summary = ", ".join(a["name"] for a in proposed[:3])
+            if len(proposed) > 3:
+                action_summary += f" (+{len(proposed) - 3} more)"
+            parts.append(f"[Step {step}] Proposed: {action_summary}")
+
+        if parts:
             try:
-                action_summary = ", ".join(a["name"] for a in proposed[:3])
-                if len(proposed) > 3:
-                    action_summary += f" (+{len(proposed) - 3} more)"
-                asyncio.run(_async_report(f"[Step {step}] Proposed: {action_summary}"))
+                _submit(_async_report("\n".join(parts)))
             except Exception as e:
-                logger.warning(f"Action streaming failed: {e}")
+                logger.warning(f"Observation streaming failed: {e}")
 
         return result
 
@@ -292,37 +347,38 @@ def _wrap_agent_for_streaming(
         # Stream screenshot if available
         screenshot_png = result.get("last_screenshot_png")
         if screenshot_png:
-            import asyncio
-
             try:
-                asyncio.run(_async_screenshot(screenshot_png, step))
+                if stream_screenshots:
+                    _submit(_async_screenshot(screenshot_png, step))
+                else:
+                    _submit(_async_report(f"[Screenshot Step {step}] {len(screenshot_png)} bytes"))
             except Exception as e:
                 logger.warning(f"Screenshot streaming failed: {e}")
 
-        # Report action result
+        # Report the results of all actions executed in this visit as one message
         step_logs = result.get("step_logs", [])
         if step_logs:
-            last_log = step_logs[-1]
-            action = last_log.get("executed_action", {})
-            result_text = last_log.get("result", "")
-
-            import asyncio
-
+            parts = []
+            for step_log in step_logs:
+                status = "✓" if "Success" in step_log.result else "✗"
+                parts.append(f"[Step {step}] {status} Executed: {step_log.formatted_action}")
             try:
-                action_name = action.get("name", "unknown")
-                args = action.get("args", {})
-                args_str = ", ".join(f"{k}={v}" for k, v in args.items())
-                status = "✓" if "Success" in result_text else "✗"
-                asyncio.run(
-                    _async_report(f"[Step {step}] {status} Executed: {action_name}({args_str})")
-                )
+                _submit(_async_report("\n".join(parts)))
             except Exception as e:
                 logger.warning(f"Result streaming failed: {e}")
 
         return result
 
+    def streaming_run(*args: Any, **kwargs: Any) -> dict[str, Any]:
+        """Wrapped run that waits for queued streaming messages afterwards."""
+        try:
+            return original_run(*args, **kwargs)
+        finally:
+            _flush_stream()
+
     # Replace node methods
     agent._propose_node = streaming_propose_node
     agent._act_node = streaming_act_node
+    agent.run = streaming_run
 
     return agent
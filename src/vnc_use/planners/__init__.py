@@ -1,8 +1,33 @@
-"""Planners for multi-model LLM support."""
+"""Planners for multi-model LLM support.
+
+Planner classes are imported on first access so that importing one provider
+(e.g. ``vnc_use.planners.gemini``) does not pull in the other provider's SDK.
+"""
+
+import importlib
+from typing import TYPE_CHECKING
 
-from .anthropic import AnthropicPlanner
 from .base import BasePlanner
-from .gemini import GeminiComputerUse, GeminiPlanner
 
 
+if TYPE_CHECKING:
+    from .anthropic import AnthropicPlanner
+    from .gemini import GeminiComputerUse, GeminiPlanner
+
+
+_LAZY_IMPORTS = {
+    "AnthropicPlanner": ".anthropic",
+    "GeminiComputerUse": ".gemini",
+    "GeminiPlanner": ".gemini",
+}
+
 __all__ = ["AnthropicPlanner", "BasePlanner", "GeminiComputerUse", "GeminiPlanner"]
+
+
+def __getattr__(name: str):
+    """Import planner classes from their provider module on first access."""
+    if name in _LAZY_IMPORTS:
+        value = getattr(importlib.import_module(_LAZY_IMPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
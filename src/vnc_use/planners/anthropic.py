@@ -1,16 +1,22 @@
 """Anthropic Claude planner for VNC desktop control using LangChain."""
 
-import base64
+import asyncio
+import functools
 import logging
 import os
+import re
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 
+import orjson
 from langchain_anthropic import ChatAnthropic
-from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_anthropic.chat_models import convert_to_anthropic_tool
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
 
-from .base import BasePlanner
-from .gemini import compress_screenshot
-from .vnc_tools import get_vnc_tools
+from .base import MAX_BATCH_CONCURRENCY, BasePlanner
+from .gemini import compress_screenshot_b64
+from .vnc_tools import VNC_TOOL_SCHEMAS, get_vnc_tools
 
 
 logger = logging.getLogger(__name__)
@@ -18,6 +24,48 @@ logger = logging.getLogger(__name__)
 # Default model for Anthropic
 DEFAULT_MODEL = "claude-haiku-4-5"
 
+# Responses are a short observation plus tool calls; a tight cap keeps a
+# rambling response from holding up the step
+MAX_TOKENS = 1024
+
+# Prompt caching marker: the tool schemas and the static system prompt are
+# identical on every turn, so the server can reuse their prefill
+_CACHE_CONTROL = {"type": "ephemeral"}
+
+# Phrases in a tool-call-free response that indicate the model refused the
+# task, matched in a single case-insensitive pass
+_REFUSAL_INDICATORS = (
+    "i cannot",
+    "i can't",
+    "i'm not able to",
+    "unsafe",
+    "dangerous",
+    "i shouldn't",
+    "i won't",
+    "cannot comply",
+)
+_REFUSAL_RE = re.compile("|".join(map(re.escape, _REFUSAL_INDICATORS)), re.IGNORECASE)
+
+# Static part of the system prompt; the task and action history follow it
+_SYSTEM_PROMPT = """You are controlling a computer via VNC (Virtual Network Computing).
+You can see screenshots of the desktop and propose actions to accomplish tasks.
+
+Available actions:
+- click_at: Click at coordinates (x, y normalized to 0-999)
+- double_click_at: Double-click at coordinates
+- type_text_at: Click at coordinates then type text
+- key_combination: Press keyboard shortcuts (e.g., 'control+c')
+- scroll_document: Scroll the current document
+- scroll_at: Scroll at specific coordinates
+- drag_and_drop: Drag from one location to another
+- hover_at: Move mouse to hover at coordinates
+
+Coordinates are normalized to a 0-999 grid. Convert screen positions proportionally."""
+
+# Per-turn part of the system prompt
+_TASK_TEMPLATE = "Current task: {task}"
+_HISTORY_HEADER = "\n\nActions taken so far:\n"
+
 
 class AnthropicPlanner(BasePlanner):
     """Anthropic Claude planner for VNC desktop control.
@@ -51,13 +99,17 @@ class AnthropicPlanner(BasePlanner):
             model=self.model,
             api_key=api_key,
             temperature=0.0,
+            max_tokens=MAX_TOKENS,
         )
 
         # Get VNC tool schemas (excluding specified actions)
         tool_schemas = get_vnc_tools(excluded_actions)
 
-        # Bind tools to LLM
-        self.llm_with_tools = self.llm.bind_tools(list(tool_schemas.values()))
+        # Bind tools to LLM, marking the last schema so the tool block is cached
+        tools = [dict(_tool_definition(name)) for name in tool_schemas]
+        if tools:
+            tools[-1]["cache_control"] = _CACHE_CONTROL
+        self.llm_with_tools = self.llm.bind_tools(tools)
 
         logger.info(f"Initialized Anthropic planner with model: {self.model}")
         logger.info(f"Available tools: {list(tool_schemas.keys())}")
@@ -72,44 +124,150 @@ class AnthropicPlanner(BasePlanner):
 
         Args:
             task: User's task description
-            action_history: List of text descriptions of past actions
+            action_history: Most recent past actions, already bounded by the caller
             screenshot_png: Current screenshot as PNG bytes
 
         Returns:
             LangChain AIMessage with tool calls
         """
-        # Compress screenshot
-        compressed = compress_screenshot(screenshot_png, max_width=512)
-        screenshot_b64 = base64.b64encode(compressed).decode("utf-8")
+        messages = self._build_messages(task, action_history, screenshot_png)
 
-        # Build messages
-        messages = []
+        # Invoke model with tools
+        response: AIMessage = self.llm_with_tools.invoke(messages)
 
-        # System message with task context
-        system_prompt = f"""You are controlling a computer via VNC (Virtual Network Computing).
-You can see screenshots of the desktop and propose actions to accomplish tasks.
+        logger.info(f"Received response with {len(response.tool_calls)} tool call(s)")
 
-Current task: {task}
+        return response
 
-Available actions:
-- click_at: Click at coordinates (x, y normalized to 0-999)
-- double_click_at: Double-click at coordinates
-- type_text_at: Click at coordinates then type text
-- key_combination: Press keyboard shortcuts (e.g., 'control+c')
-- scroll_document: Scroll the current document
-- scroll_at: Scroll at specific coordinates
-- drag_and_drop: Drag from one location to another
-- hover_at: Move mouse to hover at coordinates
+    async def agenerate_stateless(
+        self,
+        task: str,
+        action_history: list[str],
+        screenshot_png: bytes,
+    ) -> AIMessage:
+        """Async variant of generate_stateless.
+
+        Screenshot compression runs in a worker thread so the event loop
+        keeps serving other requests meanwhile.
+
+        Args:
+            task: User's task description
+            action_history: Most recent past actions, already bounded by the caller
+            screenshot_png: Current screenshot as PNG bytes
+
+        Returns:
+            LangChain AIMessage with tool calls
+        """
+        messages = await asyncio.to_thread(
+            self._build_messages, task, action_history, screenshot_png
+        )
+
+        response: AIMessage = await self.llm_with_tools.ainvoke(messages)
+
+        logger.info(f"Received response with {len(response.tool_calls)} tool call(s)")
+
+        return response
+
+    def generate_stateless_batch(self, jobs: list[tuple[str, list[str], bytes]]) -> list[AIMessage]:
+        """Generate responses for several independent requests concurrently.
 
-Coordinates are normalized to a 0-999 grid. Convert screen positions proportionally.
-"""
+        Args:
+            jobs: List of (task, action_history, screenshot_png) tuples
+
+        Returns:
+            LangChain AIMessages with tool calls, in job order
+        """
+        if not jobs:
+            return []
+
+        # Screenshot compression releases the GIL, so prepare requests in parallel
+        with ThreadPoolExecutor(max_workers=min(MAX_BATCH_CONCURRENCY, len(jobs))) as executor:
+            messages_list = list(executor.map(lambda job: self._build_messages(*job), jobs))
+
+        responses: list[AIMessage] = self.llm_with_tools.batch(
+            messages_list, config={"max_concurrency": MAX_BATCH_CONCURRENCY}
+        )
+
+        logger.info(f"Received {len(responses)} batched response(s)")
+
+        return responses
+
+    def stream_function_calls(
+        self,
+        task: str,
+        action_history: list[str],
+        screenshot_png: bytes,
+    ) -> Iterator[dict[str, Any]]:
+        """Stream the model response, yielding each tool call once complete.
+
+        A tool call is complete as soon as the next content block starts (or
+        the stream ends), so callers can start executing the first action
+        while the model is still generating the rest.
 
+        Args:
+            task: User's task description
+            action_history: Most recent past actions, already bounded by the caller
+            screenshot_png: Current screenshot as PNG bytes
+
+        Yields:
+            Dicts with 'name' and 'args' keys, in response order
+        """
+        messages = self._build_messages(task, action_history, screenshot_png)
+
+        index = None
+        name = ""
+        args_parts: list[str] = []
+        for chunk in self.llm_with_tools.stream(messages):
+            for tool_call_chunk in chunk.tool_call_chunks:
+                if tool_call_chunk["index"] != index:
+                    if index is not None:
+                        yield _parse_tool_call(name, args_parts)
+                    index = tool_call_chunk["index"]
+                    name = tool_call_chunk["name"] or ""
+                    args_parts = []
+                args_parts.append(tool_call_chunk["args"] or "")
+
+        if index is not None:
+            yield _parse_tool_call(name, args_parts)
+
+    def _build_messages(
+        self,
+        task: str,
+        action_history: list[str],
+        screenshot_png: bytes,
+    ) -> list[BaseMessage]:
+        """Build the system and user messages for one turn.
+
+        Args:
+            task: User's task description
+            action_history: Most recent past actions, already bounded by the caller
+            screenshot_png: Current screenshot as PNG bytes
+
+        Returns:
+            Messages to send to the model
+        """
+        # Compress screenshot (cached for repeated frames)
+        screenshot_b64 = compress_screenshot_b64(screenshot_png, max_width=512)
+
+        # Build messages
+        messages = []
+
+        # System message: cached static prefix, then the per-turn task context
+        task_context = _TASK_TEMPLATE.format(task=task)
         if action_history:
-            system_prompt += "\n\nActions taken so far:\n" + "\n".join(
-                f"{i + 1}. {action}" for i, action in enumerate(action_history)
+            task_context += _HISTORY_HEADER
+            task_context += "\n".join(
+                f"{i}. {action}" for i, action in enumerate(action_history, 1)
             )
 
-        messages.append(SystemMessage(content=system_prompt))
+        messages.append(
+            SystemMessage(
+                content=[
+                    {"type": "text", "text": _SYSTEM_PROMPT, "cache_control": _CACHE_CONTROL},
+                    {"type": "text", "text": task_context},
+                ]
+            )
+        )
 
         # User message with screenshot
         user_content = [
@@ -118,23 +276,19 @@ Coordinates are normalized to a 0-999 grid. Convert screen positions proportiona
                 "text": "Here is the current screenshot. What action(s) should I take next to accomplish the task?",
             },
             {
-                "type": "image_url",
-                "image_url": {"url": f"data:image/png;base64,{screenshot_b64}"},
+                "type": "image",
+                "source": {"type": "base64", "media_type": "image/png", "data": screenshot_b64},
             },
         ]
 
         messages.append(HumanMessage(content=user_content))
 
         logger.debug(
-            f"Calling Anthropic with screenshot ({len(screenshot_png)} -> {len(compressed)} bytes)"
+            f"Calling Anthropic with screenshot ({len(screenshot_png)} bytes, "
+            f"{len(screenshot_b64)} base64 chars)"
         )
 
-        # Invoke model with tools
-        response: AIMessage = self.llm_with_tools.invoke(messages)
-
-        logger.info(f"Received response with {len(response.tool_calls)} tool call(s)")
-
-        return response
+        return messages
 
     def extract_text(self, response: AIMessage) -> str:
         """Extract text observations/reasoning from model response.
@@ -191,22 +345,32 @@ Coordinates are normalized to a 0-999 grid. Convert screen positions proportiona
         # Check if response has no tool calls and contains refusal language
         if not response.tool_calls:
             text = self.extract_text(response)
-            refusal_indicators = [
-                "i cannot",
-                "i can't",
-                "i'm not able to",
-                "unsafe",
-                "dangerous",
-                "i shouldn't",
-                "i won't",
-                "cannot comply",
-            ]
-
-            text_lower = text.lower()
-            for indicator in refusal_indicators:
-                if indicator in text_lower:
-                    logger.warning(f"Detected potential refusal: {text[:100]}")
-                    return {"action": "block", "reason": f"Model refused: {text[:200]}"}
+            if _REFUSAL_RE.search(text):
+                logger.warning(f"Detected potential refusal: {text[:100]}")
+                return {"action": "block", "reason": f"Model refused: {text[:200]}"}
 
         # No safety concerns detected
         return None
+
+
+@functools.cache
+def _tool_definition(name: str) -> dict[str, Any]:
+    """Convert a VNC tool schema to an Anthropic tool definition once per process.
+
+    Pydantic JSON schema generation dominates planner construction, so the
+    result is shared by every planner (callers must copy before modifying).
+
+    Args:
+        name: Tool name in VNC_TOOL_SCHEMAS
+
+    Returns:
+        Anthropic tool definition (name, description, input_schema)
+    """
+    return dict(convert_to_anthropic_tool(VNC_TOOL_SCHEMAS[name]))
+
+
+def _parse_tool_call(name: str, args_parts: list[str]) -> dict[str, Any]:
+    """Assemble a streamed tool call from its name and JSON argument fragments."""
+    args_json = "".join(args_parts)
+    logger.debug(f"Streamed function call: {name}")
+    return {"name": name, "args": orjson.loads(args_json) if args_json else {}}
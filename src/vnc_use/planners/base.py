@@ -1,9 +1,14 @@
 """Abstract base planner interface for multi-model support."""
 
+import asyncio
 from abc import ABC, abstractmethod
 from typing import Any
 
 
+# Upper bound on concurrent requests issued by generate_stateless_batch
+MAX_BATCH_CONCURRENCY = 10
+
+
 class BasePlanner(ABC):
     """Abstract base class for LLM planners.
 
@@ -22,7 +27,7 @@ class BasePlanner(ABC):
 
         Args:
             task: User's task description
-            action_history: List of text descriptions of past actions
+            action_history: Most recent past actions, already bounded by the caller
             screenshot_png: Current screenshot as PNG bytes
 
         Returns:
@@ -30,6 +35,43 @@ class BasePlanner(ABC):
         """
         ...
 
+    async def agenerate_stateless(
+        self,
+        task: str,
+        action_history: list[str],
+        screenshot_png: bytes,
+    ) -> Any:
+        """Async variant of generate_stateless.
+
+        The default implementation runs generate_stateless in a worker
+        thread; providers override it with their native async clients.
+
+        Args:
+            task: User's task description
+            action_history: Most recent past actions, already bounded by the caller
+            screenshot_png: Current screenshot as PNG bytes
+
+        Returns:
+            Raw model response (format varies by provider)
+        """
+        return await asyncio.to_thread(
+            self.generate_stateless, task, action_history, screenshot_png
+        )
+
+    def generate_stateless_batch(self, jobs: list[tuple[str, list[str], bytes]]) -> list[Any]:
+        """Generate responses for several independent requests.
+
+        The default implementation calls generate_stateless for each job in
+        turn; providers override it to issue the requests concurrently.
+
+        Args:
+            jobs: List of (task, action_history, screenshot_png) tuples
+
+        Returns:
+            Raw model responses, in job order
+        """
+        return [self.generate_stateless(*job) for job in jobs]
+
     @abstractmethod
     def extract_text(self, response: Any) -> str:
         """Extract text observations/reasoning from model response.
@@ -67,3 +109,21 @@ class BasePlanner(ABC):
             Example: {"action": "require_confirmation", "reason": "Risky operation"}
         """
         ...
+
+    def extract_all(self, response: Any) -> tuple[str, list[dict[str, Any]], dict[str, Any] | None]:
+        """Extract text, function calls and safety decision in one call.
+
+        The default implementation calls the three extract_* methods;
+        providers override it to parse the response in a single pass.
+
+        Args:
+            response: Raw model response
+
+        Returns:
+            Tuple of (text, function_calls, safety_decision)
+        """
+        return (
+            self.extract_text(response),
+            self.extract_function_calls(response),
+            self.extract_safety_decision(response),
+        )
@@ -1,9 +1,18 @@
 """Gemini Computer Use wrapper for VNC desktop control."""
 
+import asyncio
 import base64
+import functools
+import hashlib
+import io
 import logging
 import os
-from typing import Any
+import struct
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from types import ModuleType
+from typing import Any, Literal
 
 from google import genai
 from google.genai.types import (
@@ -16,7 +25,7 @@ from google.genai.types import (
     Tool,
 )
 
-from .base import BasePlanner
+from .base import MAX_BATCH_CONCURRENCY, BasePlanner
 
 
 logger = logging.getLogger(__name__)
@@ -24,39 +33,267 @@ logger = logging.getLogger(__name__)
 # Model ID for Gemini Computer Use
 MODEL_ID = "gemini-2.5-computer-use-preview-10-2025"
 
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# IHDR colour types that need no mode conversion (greyscale, truecolour)
+_PNG_OPAQUE_COLOR_TYPES = (0, 2)
+# Small screenshots larger than this (e.g. stored uncompressed by the
+# capture path) are still re-encoded to shrink the request
+_PASSTHROUGH_MAX_BYTES = 200_000
 
-def compress_screenshot(png_bytes: bytes, max_width: int = 512) -> bytes:
+
+def png_size(png_bytes: bytes) -> tuple[int, int]:
+    """Read PNG dimensions from the IHDR chunk without decoding the image.
+
+    Args:
+        png_bytes: PNG bytes
+
+    Returns:
+        Tuple of (width, height) in pixels
+
+    Raises:
+        ValueError: If the bytes are not a PNG
+    """
+    if len(png_bytes) < 24 or png_bytes[:8] != PNG_SIGNATURE or png_bytes[12:16] != b"IHDR":
+        raise ValueError("Not a PNG image")
+    return struct.unpack(">II", png_bytes[16:24])
+
+
+# Per-thread encode buffer reused by compress_screenshot when no `out` is given
+_encode_buffers = threading.local()
+
+
+def _encode_buffer() -> io.BytesIO:
+    """Return this thread's reusable encode buffer."""
+    buf = getattr(_encode_buffers, "buf", None)
+    if buf is None:
+        buf = _encode_buffers.buf = io.BytesIO()
+    return buf
+
+
+@functools.cache
+def _import_pyspng() -> ModuleType | None:
+    """Import the optional pyspng encoder once per process.
+
+    Returns:
+        The pyspng module, or None if it (or numpy) is not installed
+    """
+    try:
+        import pyspng
+    except ImportError:
+        return None
+    return pyspng
+
+
+@functools.cache
+def _import_cv2() -> ModuleType | None:
+    """Import the optional OpenCV resizer once per process.
+
+    Returns:
+        The cv2 module, or None if opencv-python(-headless) is not installed
+    """
+    try:
+        import cv2
+    except ImportError:
+        return None
+    return cv2
+
+
+def compress_screenshot(
+    png_bytes: bytes,
+    max_width: int = 512,
+    out: io.BytesIO | None = None,
+    compress_level: int = 1,
+    image_format: Literal["PNG", "JPEG"] = "PNG",
+    quality: int = 75,
+    quantize: bool = False,
+) -> bytes:
     """Compress screenshot to reduce token count.
 
+    The result is sent to the model, which only cares about pixels, so PNGs
+    are deflated at a fast, low compression level by default. When the
+    optional pyspng package is installed it is used as the (faster) PNG
+    encoder, and when OpenCV is installed it downscales with INTER_AREA
+    instead of Pillow's LANCZOS; Pillow is still used for decoding.
+
     Args:
         png_bytes: Original PNG bytes
         max_width: Maximum width in pixels
+        out: Optional buffer to encode into (defaults to a per-thread buffer
+            reused across calls; unused when pyspng encodes the image)
+        compress_level: zlib level for PNG output (0-9)
+        image_format: Output format; "JPEG" is faster and smaller where exact
+            pixels do not matter (callers must send it as image/jpeg)
+        quality: JPEG quality (ignored for PNG)
+        quantize: Reduce PNG output to a 256-colour palette; desktop content
+            is mostly flat colours, so this is much smaller and faster to
+            deflate at little visible cost (encoded by Pillow, not pyspng)
 
     Returns:
-        Compressed PNG bytes
+        Compressed image bytes (the input itself if already small and opaque)
     """
-    import io
-
     from PIL import Image
 
+    # Screenshots within the size limit and without alpha/palette would be
+    # decoded and re-encoded unchanged; the header alone tells us that
+    width, _ = png_size(png_bytes)
+    if (
+        image_format == "PNG"
+        and width <= max_width
+        and len(png_bytes) <= _PASSTHROUGH_MAX_BYTES
+        and png_bytes[24] == 8
+        and png_bytes[25] in _PNG_OPAQUE_COLOR_TYPES
+    ):
+        logger.debug(f"Screenshot already within {max_width}px; skipping re-encode")
+        return png_bytes
+
     img = Image.open(io.BytesIO(png_bytes))
 
+    # Screenshots carry no meaningful transparency; dropping alpha/palette
+    # modes shrinks the payload and keeps the encoder on the fast RGB path
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+
     # Resize if too large
     if img.width > max_width:
         ratio = max_width / img.width
         new_size = (max_width, int(img.height * ratio))
-        img = img.resize(new_size, Image.Resampling.LANCZOS)
+        cv2 = _import_cv2()
+        if cv2 is not None:
+            import numpy as np
+
+            arr = cv2.resize(np.asarray(img), new_size, interpolation=cv2.INTER_AREA)
+            img = Image.fromarray(arr)
+        else:
+            img = img.resize(new_size, Image.Resampling.LANCZOS)
         logger.debug(f"Resized screenshot to {new_size}")
 
+    if quantize and image_format == "PNG":
+        img = img.quantize(colors=256, method=Image.Quantize.FASTOCTREE)
+
     # Compress
-    buf = io.BytesIO()
-    img.save(buf, format="PNG", optimize=True, compress_level=9)
-    compressed = buf.getvalue()
+    spng = _import_pyspng() if image_format == "PNG" and img.mode != "P" else None
+    if spng is not None:
+        import numpy as np
+
+        compressed = spng.encode(np.asarray(img), compress_level=compress_level)
+    else:
+        # Overwrite from the start and truncate afterwards: truncating an
+        # empty buffer first would release its allocation
+        buf = _encode_buffer() if out is None else out
+        buf.seek(0)
+        if image_format == "JPEG":
+            img.save(buf, format="JPEG", quality=quality)
+        else:
+            img.save(buf, format="PNG", compress_level=compress_level)
+        buf.truncate()
+        compressed = buf.getvalue()
 
     logger.debug(f"Compressed screenshot: {len(png_bytes)} -> {len(compressed)} bytes")
     return compressed
 
 
+def _has_screenshot(part: Part) -> bool:
+    """Check whether a part is a function response carrying a screenshot."""
+    fr = getattr(part, "function_response", None)
+    return bool(fr and fr.response and "screenshot" in fr.response)
+
+
+def _strip_screenshots(content: Content) -> Content:
+    """Return content with screenshots removed from its function responses.
+
+    Args:
+        content: History item
+
+    Returns:
+        The content itself if it carries no screenshot, otherwise a copy whose
+        function responses keep only the url and error fields
+    """
+    parts = getattr(content, "parts", None)
+    if not parts or not any(_has_screenshot(part) for part in parts):
+        return content
+
+    cleaned_parts = []
+    for part in parts:
+        if _has_screenshot(part):
+            fr = part.function_response
+            cleaned_response = {"url": fr.response.get("url", "")}
+            if "error" in fr.response:
+                cleaned_response["error"] = fr.response["error"]
+            cleaned_parts.append(
+                Part(function_response=FunctionResponse(name=fr.name, response=cleaned_response))
+            )
+        else:
+            # Keep other parts as-is (text, function_call, etc)
+            cleaned_parts.append(part)
+
+    return Content(role=content.role, parts=cleaned_parts)
+
+
+# Recently compressed screenshots keyed by (content hash, max_width); repeated
+# frames (e.g. while waiting for a page to load) skip the re-encode
+_SCREENSHOT_CACHE_SIZE = 8
+_screenshot_cache: OrderedDict[tuple[bytes, int], list[Any]] = OrderedDict()
+_screenshot_cache_lock = threading.Lock()
+# (png_bytes, max_width, entry) of the last lookup: retries within a turn pass
+# the very same bytes object, which then skips hashing as well
+_last_screenshot: tuple[bytes, int, list[Any]] | None = None
+
+
+def _cached_screenshot_entry(png_bytes: bytes, max_width: int) -> list[Any]:
+    """Return the [compressed, base64 or None] cache entry for a screenshot."""
+    global _last_screenshot
+
+    last = _last_screenshot
+    if last is not None and last[0] is png_bytes and last[1] == max_width:
+        return last[2]
+
+    key = (hashlib.blake2b(png_bytes, digest_size=16).digest(), max_width)
+    with _screenshot_cache_lock:
+        entry = _screenshot_cache.get(key)
+        if entry is not None:
+            _screenshot_cache.move_to_end(key)
+    if entry is None:
+        entry = [compress_screenshot(png_bytes, max_width=max_width, quantize=True), None]
+        with _screenshot_cache_lock:
+            _screenshot_cache[key] = entry
+            if len(_screenshot_cache) > _SCREENSHOT_CACHE_SIZE:
+                _screenshot_cache.popitem(last=False)
+
+    _last_screenshot = (png_bytes, max_width, entry)
+    return entry
+
+
+def compress_screenshot_cached(png_bytes: bytes, max_width: int = 512) -> bytes:
+    """Compress a screenshot for the planner, reusing results for identical frames.
+
+    Screenshots are palette-quantized (see compress_screenshot).
+
+    Args:
+        png_bytes: Original PNG bytes
+        max_width: Maximum width in pixels
+
+    Returns:
+        Compressed PNG bytes
+    """
+    return _cached_screenshot_entry(png_bytes, max_width)[0]
+
+
+def compress_screenshot_b64(png_bytes: bytes, max_width: int = 512) -> str:
+    """Compress and base64-encode a screenshot, cached like compress_screenshot_cached.
+
+    Args:
+        png_bytes: Original PNG bytes
+        max_width: Maximum width in pixels
+
+    Returns:
+        Base64-encoded compressed PNG
+    """
+    entry = _cached_screenshot_entry(png_bytes, max_width)
+    if entry[1] is None:
+        entry[1] = base64.b64encode(entry[0]).decode("ascii")
+    return entry[1]
+
+
 class GeminiPlanner(BasePlanner):
     """Gemini 2.5 Computer Use planner for VNC desktop control.
 
@@ -85,26 +322,40 @@ class GeminiPlanner(BasePlanner):
         if not api_key:
             raise ValueError("GEMINI_API_KEY or GOOGLE_API_KEY environment variable not set")
 
+        # One client (and its HTTP connection pool) is shared by all requests
         self.client = genai.Client(api_key=api_key)
+        self._config: GenerateContentConfig | None = None
+        self._config_key: tuple[tuple[str, ...], bool] | None = None
+        # (response, first candidate, its parts) of the last response walked
+        self._last_walk: tuple[Any, Any, list[Any]] | None = None
+        # id(content) -> (content, copy without screenshots) for generate()
+        self._stripped_contents: dict[int, tuple[Content, Content]] = {}
         logger.info(f"Initialized Gemini client with model: {MODEL_ID}")
 
     def build_config(self) -> GenerateContentConfig:
         """Build GenerateContentConfig with Computer Use tool.
 
+        The config only depends on excluded_actions and include_thoughts, so
+        it is built on first use and reused until either setting changes.
+
         Returns:
             Configuration for Gemini API request
         """
-        computer_use = ComputerUse(
-            environment="ENVIRONMENT_BROWSER",
-            excluded_predefined_functions=self.excluded_actions,
-        )
+        key = (tuple(self.excluded_actions), self.include_thoughts)
+        if self._config is None or key != self._config_key:
+            computer_use = ComputerUse(
+                environment="ENVIRONMENT_BROWSER",
+                excluded_predefined_functions=list(key[0]),
+            )
 
-        thinking_config = ThinkingConfig(include_thoughts=self.include_thoughts)
+            thinking_config = ThinkingConfig(include_thoughts=self.include_thoughts)
 
-        return GenerateContentConfig(
-            tools=[Tool(computer_use=computer_use)],
-            thinking_config=thinking_config,
-        )
+            self._config = GenerateContentConfig(
+                tools=[Tool(computer_use=computer_use)],
+                thinking_config=thinking_config,
+            )
+            self._config_key = key
+        return self._config
 
     def start_contents(
         self,
@@ -127,17 +378,10 @@ class GeminiPlanner(BasePlanner):
 
         # Add initial screenshot if provided
         if initial_screenshot_png:
-            # Compress and base64 encode the PNG
-            compressed = compress_screenshot(initial_screenshot_png)
-            png_b64 = base64.b64encode(compressed).decode("utf-8")
-            parts.append(
-                Part(
-                    inline_data={
-                        "mime_type": "image/png",
-                        "data": png_b64,
-                    }
-                )
-            )
+            # Pass raw bytes: the SDK base64-encodes inline data itself, so a
+            # pre-encoded string would only be decoded back to bytes
+            compressed = compress_screenshot_cached(initial_screenshot_png)
+            parts.append(Part.from_bytes(data=compressed, mime_type="image/png"))
             logger.debug(f"Added initial screenshot ({len(initial_screenshot_png)} bytes)")
 
         return [Content(role="user", parts=parts)]
@@ -159,45 +403,22 @@ class GeminiPlanner(BasePlanner):
         if config is None:
             config = self.build_config()
 
-        # Strip old screenshots from history to avoid token limits
-        # Keep only the most recent screenshot in the last function response
+        # Strip old screenshots from history to avoid token limits, keeping
+        # only the most recent screenshot in the last function response.
+        # Stripped copies are reused while the caller keeps passing the same
+        # Content objects, so each turn only strips the newly added items.
+        previous = self._stripped_contents
+        self._stripped_contents = {}
         cleaned_contents = []
-        for i, content in enumerate(contents):
-            if i == len(contents) - 1:
-                # Keep last item as-is (most recent screenshot)
-                cleaned_contents.append(content)
+        for content in contents[:-1]:
+            cached = previous.get(id(content))
+            if cached is not None and cached[0] is content:
+                stripped = cached[1]
             else:
-                # For older items, remove screenshot data from function responses
-                if hasattr(content, "parts") and content.parts:
-                    cleaned_parts = []
-                    for part in content.parts:
-                        if hasattr(part, "function_response") and part.function_response:
-                            # Keep function response but remove screenshot
-                            fr = part.function_response
-                            cleaned_response = {
-                                "url": fr.response.get("url", ""),
-                            }
-                            if "error" in fr.response:
-                                cleaned_response["error"] = fr.response["error"]
-
-                            from google.genai.types import FunctionResponse, Part
-
-                            cleaned_parts.append(
-                                Part(
-                                    function_response=FunctionResponse(
-                                        name=fr.name, response=cleaned_response
-                                    )
-                                )
-                            )
-                        else:
-                            # Keep other parts as-is (text, function_call, etc)
-                            cleaned_parts.append(part)
-
-                    from google.genai.types import Content
-
-                    cleaned_contents.append(Content(role=content.role, parts=cleaned_parts))
-                else:
-                    cleaned_contents.append(content)
+                stripped = _strip_screenshots(content)
+            self._stripped_contents[id(content)] = (content, stripped)
+            cleaned_contents.append(stripped)
+        cleaned_contents.extend(contents[-1:])
 
         logger.info(
             f"Calling Gemini with {len(cleaned_contents)} content items (old screenshots removed)"
@@ -211,32 +432,41 @@ class GeminiPlanner(BasePlanner):
 
         return response
 
-    def extract_text(self, response: Any) -> str:
-        """Extract text observations/reasoning from Gemini response.
+    def _candidate_parts(self, response: Any) -> tuple[Any, list[Any]]:
+        """Return the first candidate of a response and its content parts.
+
+        The agent calls all extract_* methods on the same response, so the
+        walk is memoized for the most recent response.
 
         Args:
             response: Raw Gemini API response
 
         Returns:
-            Text content from model (empty string if none)
+            Tuple of (candidate or None, parts list, empty if missing)
         """
-        if not hasattr(response, "candidates") or not response.candidates:
-            return ""
+        last_walk = self._last_walk
+        if last_walk is not None and last_walk[0] is response:
+            return last_walk[1], last_walk[2]
 
-        candidate = response.candidates[0]
-        if not hasattr(candidate, "content") or not candidate.content:
-            return ""
+        candidates = getattr(response, "candidates", None)
+        candidate = candidates[0] if candidates else None
+        content = getattr(candidate, "content", None)
+        parts = (getattr(content, "parts", None) if content else None) or []
 
-        content = candidate.content
-        if not hasattr(content, "parts") or not content.parts:
-            return ""
+        self._last_walk = (response, candidate, parts)
+        return candidate, parts
 
-        # Extract text from parts
-        text_parts = []
-        for part in content.parts:
-            if hasattr(part, "text") and part.text:
-                text_parts.append(part.text)
+    def extract_text(self, response: Any) -> str:
+        """Extract text observations/reasoning from Gemini response.
+
+        Args:
+            response: Raw Gemini API response
 
+        Returns:
+            Text content from model (empty string if none)
+        """
+        _, parts = self._candidate_parts(response)
+        text_parts = [part.text for part in parts if getattr(part, "text", None)]
         return " ".join(text_parts).strip()
 
     def extract_function_calls(self, response: Any) -> list[dict[str, Any]]:
@@ -250,30 +480,19 @@ class GeminiPlanner(BasePlanner):
         """
         function_calls: list[dict[str, Any]] = []
 
-        # Navigate response structure
-        if not hasattr(response, "candidates") or not response.candidates:
+        candidate, parts = self._candidate_parts(response)
+        if candidate is None:
             logger.warning("No candidates in response")
             return function_calls
-
-        candidate = response.candidates[0]
-        if not hasattr(candidate, "content") or not candidate.content:
-            logger.warning("No content in candidate")
-            return function_calls
-
-        content = candidate.content
-        if not hasattr(content, "parts") or not content.parts:
+        if not parts:
             logger.warning("No parts in content")
             return function_calls
 
         # Extract function calls from parts
-        for part in content.parts:
-            if hasattr(part, "function_call") and part.function_call:
-                fc = part.function_call
-                call_dict = {
-                    "name": fc.name,
-                    "args": dict(fc.args) if fc.args else {},
-                }
-                function_calls.append(call_dict)
+        for part in parts:
+            fc = getattr(part, "function_call", None)
+            if fc:
+                function_calls.append({"name": fc.name, "args": dict(fc.args) if fc.args else {}})
                 logger.debug(f"Extracted function call: {fc.name}")
 
         return function_calls
@@ -287,18 +506,49 @@ class GeminiPlanner(BasePlanner):
         Returns:
             Safety decision dict or None
         """
-        # Check if response has safety_decision
-        if hasattr(response, "candidates") and response.candidates:
-            candidate = response.candidates[0]
-            if hasattr(candidate, "safety_decision") and candidate.safety_decision:
-                decision = candidate.safety_decision
-                return {
-                    "action": getattr(decision, "action", None),
-                    "reason": getattr(decision, "reason", None),
-                }
+        candidate, _ = self._candidate_parts(response)
+        decision = getattr(candidate, "safety_decision", None)
+        if decision:
+            return {
+                "action": getattr(decision, "action", None),
+                "reason": getattr(decision, "reason", None),
+            }
 
         return None
 
+    def extract_all(self, response: Any) -> tuple[str, list[dict[str, Any]], dict[str, Any] | None]:
+        """Extract text, function calls and safety decision in one pass over the parts.
+
+        Args:
+            response: Raw Gemini API response
+
+        Returns:
+            Tuple of (text, function_calls, safety_decision), as returned by
+            extract_text, extract_function_calls and extract_safety_decision
+        """
+        candidate, parts = self._candidate_parts(response)
+        if candidate is None:
+            logger.warning("No candidates in response")
+        elif not parts:
+            logger.warning("No parts in content")
+
+        text_parts = []
+        function_calls: list[dict[str, Any]] = []
+        for part in parts:
+            text = getattr(part, "text", None)
+            if text:
+                text_parts.append(text)
+            fc = getattr(part, "function_call", None)
+            if fc:
+                function_calls.append({"name": fc.name, "args": dict(fc.args) if fc.args else {}})
+                logger.debug(f"Extracted function call: {fc.name}")
+
+        return (
+            " ".join(text_parts).strip(),
+            function_calls,
+            self.extract_safety_decision(response),
+        )
+
     def build_function_response(
         self,
         function_name: str,
@@ -318,8 +568,7 @@ class GeminiPlanner(BasePlanner):
             Part containing FunctionResponse
         """
         # Compress and base64 encode the screenshot
-        compressed = compress_screenshot(screenshot_png)
-        png_b64 = base64.b64encode(compressed).decode("utf-8")
+        png_b64 = compress_screenshot_b64(screenshot_png)
 
         # Build response data
         response_data = {
@@ -376,6 +625,39 @@ class GeminiPlanner(BasePlanner):
 
         return contents
 
+    def append_function_responses(
+        self,
+        contents: list[Content],
+        results: list[tuple[str, bytes, str, str | None]],
+    ) -> list[Content]:
+        """Append the responses to several parallel function calls as one turn.
+
+        When the model proposes several calls at once, answering all of them
+        in a single user message needs one generate() round-trip instead of
+        one per call.
+
+        Args:
+            contents: Existing conversation history
+            results: (function_name, screenshot_png, url, error) per executed
+                call, in the order the model proposed them
+
+        Returns:
+            Updated contents list
+        """
+        parts = [
+            self.build_function_response(
+                function_name=function_name,
+                screenshot_png=screenshot_png,
+                url=url,
+                error=error,
+            )
+            for function_name, screenshot_png, url, error in results
+        ]
+        if parts:
+            contents.append(Content(role="user", parts=parts))
+
+        return contents
+
     def generate_stateless(
         self,
         task: str,
@@ -390,51 +672,120 @@ class GeminiPlanner(BasePlanner):
 
         Args:
             task: Original user task
-            action_history: Text log of previous actions and observations
+            action_history: Most recent past actions, already bounded by the caller
             screenshot_png: Current screenshot
 
         Returns:
             Raw response from Gemini API
         """
-        # Build context message
-        context_parts = [f"Task: {task}"]
+        contents = self._stateless_contents(task, action_history, screenshot_png)
+        config = self.build_config()
 
-        if action_history:
-            context_parts.append("\nPrevious actions:")
-            context_parts.extend(
-                f"- {action}" for action in action_history[-10:]
-            )  # Last 10 actions
+        logger.info(f"Stateless call with {len(action_history)} actions in history")
 
-        context_parts.append("\nCurrent screen:")
-        context_text = "\n".join(context_parts)
+        response = self.client.models.generate_content(
+            model=MODEL_ID,
+            contents=contents,
+            config=config,
+        )
 
-        # Compress and encode screenshot
-        compressed = compress_screenshot(screenshot_png)
-        png_b64 = base64.b64encode(compressed).decode("utf-8")
+        return response
 
-        # Build single-turn request
-        parts = [
-            Part(text=context_text),
-            Part(
-                inline_data={
-                    "mime_type": "image/png",
-                    "data": png_b64,
-                }
-            ),
-        ]
+    async def agenerate_stateless(
+        self,
+        task: str,
+        action_history: list[str],
+        screenshot_png: bytes,
+    ) -> Any:
+        """Async variant of generate_stateless using the SDK's async client.
+
+        Screenshot compression runs in a worker thread so the event loop
+        keeps serving other requests meanwhile.
+
+        Args:
+            task: Original user task
+            action_history: Most recent past actions, already bounded by the caller
+            screenshot_png: Current screenshot
 
-        contents = [Content(role="user", parts=parts)]
+        Returns:
+            Raw response from Gemini API
+        """
+        contents = await asyncio.to_thread(
+            self._stateless_contents, task, action_history, screenshot_png
+        )
         config = self.build_config()
 
-        logger.info(f"Stateless call with {len(action_history)} actions in history")
+        logger.info(f"Async stateless call with {len(action_history)} actions in history")
 
-        response = self.client.models.generate_content(
+        return await self.client.aio.models.generate_content(
             model=MODEL_ID,
             contents=contents,
             config=config,
         )
 
-        return response
+    def generate_stateless_batch(self, jobs: list[tuple[str, list[str], bytes]]) -> list[Any]:
+        """Run several stateless calls concurrently.
+
+        Requests share the client's connection pool; each job is prepared and
+        sent on a worker thread.
+
+        Args:
+            jobs: List of (task, action_history, screenshot_png) tuples
+
+        Returns:
+            Raw responses from Gemini API, in job order
+        """
+        if not jobs:
+            return []
+
+        config = self.build_config()
+
+        def run(job: tuple[str, list[str], bytes]) -> Any:
+            return self.client.models.generate_content(
+                model=MODEL_ID,
+                contents=self._stateless_contents(*job),
+                config=config,
+            )
+
+        logger.info(f"Batched stateless call with {len(jobs)} request(s)")
+
+        with ThreadPoolExecutor(max_workers=min(MAX_BATCH_CONCURRENCY, len(jobs))) as executor:
+            return list(executor.map(run, jobs))
+
+    def _stateless_contents(
+        self,
+        task: str,
+        action_history: list[str],
+        screenshot_png: bytes,
+    ) -> list[Content]:
+        """Build the single-turn request for a stateless call.
+
+        Args:
+            task: Original user task
+            action_history: Most recent past actions, already bounded by the caller
+            screenshot_png: Current screenshot
+
+        Returns:
+            Contents with the text context and the compressed screenshot
+        """
+        # Build context message (the caller already limits the history)
+        context_parts = [f"Task: {task}"]
+        if action_history:
+            context_parts.append("\nPrevious actions:")
+            context_parts.extend(f"- {action}" for action in action_history)
+        context_parts.append("\nCurrent screen:")
+        context_text = "\n".join(context_parts)
+
+        # Compress screenshot (sent as raw bytes; the SDK does the base64 encoding)
+        compressed = compress_screenshot_cached(screenshot_png)
+
+        # Build single-turn request
+        parts = [
+            Part(text=context_text),
+            Part.from_bytes(data=compressed, mime_type="image/png"),
+        ]
+
+        return [Content(role="user", parts=parts)]
 
 
 # Backward compatibility alias
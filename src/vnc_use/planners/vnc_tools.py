@@ -103,7 +103,6 @@ class Wait5SecondsTool(BaseModel):
     """
 
 
-
 # Tool name to Pydantic model mapping
 VNC_TOOL_SCHEMAS = {
     "click_at": ClickAtTool,
@@ -127,5 +126,7 @@ def get_vnc_tools(excluded_actions: list[str] | None = None) -> dict[str, type[B
     Returns:
         Dictionary mapping tool names to Pydantic schemas
     """
-    excluded = set(excluded_actions or [])
+    if not excluded_actions:
+        return dict(VNC_TOOL_SCHEMAS)
+    excluded = set(excluded_actions)
     return {name: schema for name, schema in VNC_TOOL_SCHEMAS.items() if name not in excluded}
@@ -7,36 +7,46 @@ from typing import Literal
 logger = logging.getLogger(__name__)
 
 
+# Accepted safety_decision actions (compared case-insensitively)
+_CONFIRM_ACTIONS = frozenset(
+    {"require_confirmation", "requires_confirmation", "confirm", "confirmation_required"}
+)
+_BLOCK_ACTIONS = frozenset({"block", "deny", "reject"})
+
+
+def _normalized_action(safety_decision: dict | None) -> str | None:
+    """Return the case-folded action of a safety decision, if any."""
+    if not safety_decision:
+        return None
+    action = safety_decision.get("action")
+    return action.casefold() if action else None
+
+
 def requires_confirmation(safety_decision: dict | None) -> bool:
     """Check if safety decision requires user confirmation.
 
     Args:
-        safety_decision: Safety decision from Gemini response
+        safety_decision: Safety decision from Gemini response; its action must
+            be one of require_confirmation, requires_confirmation, confirm or
+            confirmation_required
 
     Returns:
         True if confirmation required
     """
-    if not safety_decision:
-        return False
-
-    action = safety_decision.get("action", "").lower()
-    return "confirm" in action or action == "require_confirmation"
+    return _normalized_action(safety_decision) in _CONFIRM_ACTIONS
 
 
 def should_block(safety_decision: dict | None) -> bool:
     """Check if safety decision blocks execution.
 
     Args:
-        safety_decision: Safety decision from Gemini response
+        safety_decision: Safety decision from Gemini response; its action must
+            be one of block, deny or reject
 
     Returns:
         True if execution should be blocked
     """
-    if not safety_decision:
-        return False
-
-    action = safety_decision.get("action", "").lower()
-    return action in ("block", "deny", "reject")
+    return _normalized_action(safety_decision) in _BLOCK_ACTIONS
 
 
 class HITLGate:
@@ -45,6 +55,8 @@ class HITLGate:
     Manages approval/denial state for actions requiring confirmation.
     """
 
+    __slots__ = ("pending_decision", "pending_reason")
+
     def __init__(self) -> None:
         """Initialize HITL gate."""
         self.pending_decision: Literal["approve", "deny"] | None = None
@@ -58,8 +70,9 @@ class HITLGate:
             pending_calls: Pending function calls
         """
         reason = safety_decision.get("reason", "Unknown reason")
-        logger.warning(f"⚠️  HITL confirmation required: {reason}")
-        logger.info(f"Pending calls: {[c['name'] for c in pending_calls]}")
+        logger.warning("⚠️  HITL confirmation required: %s", reason)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Pending calls: %s", [c["name"] for c in pending_calls])
 
     def set_decision(self, decision: Literal["approve", "deny"], reason: str = "") -> None:
         """Set user decision.
@@ -70,7 +83,7 @@ class HITLGate:
         """
         self.pending_decision = decision
         self.pending_reason = reason
-        logger.info(f"HITL decision: {decision} ({reason})")
+        logger.info("HITL decision: %s (%s)", decision, reason)
 
     def approve(self, reason: str = "User approved") -> None:
         """Approve pending action.
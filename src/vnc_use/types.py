@@ -1,20 +1,28 @@
 """Type definitions for vnc-use agent."""
 
-from typing import Any, Literal, TypedDict
+import operator
+from dataclasses import dataclass, field, fields
+from typing import Annotated, Any, Literal, TypedDict
 
-from pydantic import BaseModel, Field
 
-
-class StepLog(TypedDict):
+@dataclass(slots=True, frozen=True)
+class StepLog:
     """Log entry for a single execution step."""
 
     step_number: int
     observation: str  # Model's text observation/reasoning
-    proposed_actions: list[dict[str, Any]]  # All actions proposed by model
+    proposed_actions: tuple[dict[str, Any], ...]  # All actions proposed by model
     executed_action: dict[str, Any]  # The action that was executed
     result: str  # Success/Error message
     screenshot_path: str | None  # Path to screenshot after this step
     timestamp: float  # When this step occurred
+    # "name(k=v, ...)" for history, report and streaming; formatted once here
+    formatted_action: str = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        args_str = ", ".join(f"{k}={v}" for k, v in self.executed_action.get("args", {}).items())
+        name = self.executed_action.get("name", "unknown")
+        object.__setattr__(self, "formatted_action", f"{name}({args_str})")
 
 
 class CUAState(TypedDict):
@@ -23,21 +31,25 @@ class CUAState(TypedDict):
     Tracks text-only action history (no screenshots), pending function calls
     to execute, and execution status. Screenshots are sent to Gemini on each
     turn but not stored in history to avoid token limits.
+
+    action_history and step_logs are append-only: nodes return only the new
+    entries and LangGraph concatenates them onto the existing lists.
     """
 
     task: str
-    action_history: list[str]  # Text-only log of actions and observations
-    step_logs: list[StepLog]  # Structured logs for report generation
+    action_history: Annotated[list[str], operator.add]  # Text-only log of actions and observations
+    step_logs: Annotated[list[StepLog], operator.add]  # Structured logs for report generation
     pending_calls: list[dict[str, Any]]  # buffered function calls from last response
     last_screenshot_png: bytes | None
     step: int
     done: bool
     safety: dict[str, Any] | None  # last safety_decision (if any)
-    start_time: float  # wall-clock start for timeout
+    deadline: float  # monotonic seconds (time.monotonic()) at which the run times out
     error: str | None  # terminal error message
 
 
-class ActionResult(BaseModel):
+@dataclass(slots=True, frozen=True, kw_only=True)
+class ActionResult:
     """Result of executing a single action on VNC."""
 
     success: bool
@@ -46,63 +58,152 @@ class ActionResult(BaseModel):
     url: str = ""  # empty for VNC desktop; populated if browser URL available
 
 
-class VNCAction(BaseModel):
+@dataclass(slots=True, frozen=True, kw_only=True)
+class VNCAction:
     """Parsed action from Gemini function call."""
 
     name: str
     args: dict[str, Any]
 
 
-class ClickAction(BaseModel):
+_COORDINATE_MAX = 999
+_DIRECTIONS = ("up", "down", "left", "right")
+
+
+def _check_coordinates(action: object, *names: str) -> None:
+    """Raise ValueError unless the named fields are ints on the 0-999 grid."""
+    for name in names:
+        value = getattr(action, name)
+        if not isinstance(value, int) or not 0 <= value <= _COORDINATE_MAX:
+            raise ValueError(
+                f"{name} must be an int between 0 and {_COORDINATE_MAX}, got {value!r}"
+            )
+
+
+def _check_direction(direction: str) -> None:
+    """Raise ValueError for an unknown scroll direction."""
+    if direction not in _DIRECTIONS:
+        raise ValueError(f"direction must be one of {_DIRECTIONS}, got {direction!r}")
+
+
+def _coerce_int(name: str, value: Any) -> int:
+    """Convert a function call arg to int, accepting "5" and 5.0 but not 5.5."""
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            pass
+    raise ValueError(f"{name} must be an integer, got {value!r}")
+
+
+class _Action:
+    """Base for typed action arguments built from function call args.
+
+    Constructing an action directly expects correctly typed values; coordinates
+    that are not ints on the 0-999 grid raise ValueError. from_args() is the
+    entry point for model output and first converts integral values given as
+    strings or floats for int fields.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def from_args(cls, args: dict[str, Any]) -> "_Action":
+        """Build the action from a function call's args dict.
+
+        Raises:
+            ValueError: If an int field is not integral or a value is out of range
+            TypeError: If args has unknown or missing keys
+        """
+        int_fields = {f.name for f in fields(cls) if f.type is int}
+        return cls(
+            **{
+                name: _coerce_int(name, value) if name in int_fields else value
+                for name, value in args.items()
+            }
+        )
+
+
+@dataclass(slots=True, frozen=True, kw_only=True)
+class ClickAction(_Action):
     """Click at normalized coordinates."""
 
-    x: int = Field(ge=0, le=999)
-    y: int = Field(ge=0, le=999)
+    x: int
+    y: int
 
+    def __post_init__(self) -> None:
+        _check_coordinates(self, "x", "y")
 
-class HoverAction(BaseModel):
+
+@dataclass(slots=True, frozen=True, kw_only=True)
+class HoverAction(_Action):
     """Hover at normalized coordinates."""
 
-    x: int = Field(ge=0, le=999)
-    y: int = Field(ge=0, le=999)
+    x: int
+    y: int
+
+    def __post_init__(self) -> None:
+        _check_coordinates(self, "x", "y")
 
 
-class TypeTextAction(BaseModel):
+@dataclass(slots=True, frozen=True, kw_only=True)
+class TypeTextAction(_Action):
     """Type text at normalized coordinates."""
 
-    x: int = Field(ge=0, le=999)
-    y: int = Field(ge=0, le=999)
+    x: int
+    y: int
     text: str
     press_enter: bool = False
     clear_before_typing: bool = False
 
+    def __post_init__(self) -> None:
+        _check_coordinates(self, "x", "y")
+
 
-class KeyCombinationAction(BaseModel):
+@dataclass(slots=True, frozen=True, kw_only=True)
+class KeyCombinationAction(_Action):
     """Execute keyboard shortcut."""
 
     keys: str  # e.g., "control+a", "alt+tab"
 
 
-class ScrollDocumentAction(BaseModel):
+@dataclass(slots=True, frozen=True, kw_only=True)
+class ScrollDocumentAction(_Action):
     """Scroll the whole document."""
 
     direction: Literal["up", "down", "left", "right"]
     magnitude: int = 800
 
+    def __post_init__(self) -> None:
+        _check_direction(self.direction)
 
-class ScrollAtAction(BaseModel):
+
+@dataclass(slots=True, frozen=True, kw_only=True)
+class ScrollAtAction(_Action):
     """Scroll at specific normalized coordinates."""
 
-    x: int = Field(ge=0, le=999)
-    y: int = Field(ge=0, le=999)
+    x: int
+    y: int
     direction: Literal["up", "down", "left", "right"]
     magnitude: int = 800
 
+    def __post_init__(self) -> None:
+        _check_coordinates(self, "x", "y")
+        _check_direction(self.direction)
+
 
-class DragAndDropAction(BaseModel):
+@dataclass(slots=True, frozen=True, kw_only=True)
+class DragAndDropAction(_Action):
     """Drag from one point to another."""
 
-    x: int = Field(ge=0, le=999)
-    y: int = Field(ge=0, le=999)
-    destination_x: int = Field(ge=0, le=999)
-    destination_y: int = Field(ge=0, le=999)
+    x: int
+    y: int
+    destination_x: int
+    destination_y: int
+
+    def __post_init__(self) -> None:
+        _check_coordinates(self, "x", "y", "destination_x", "destination_y")
@@ -0,0 +1,52 @@
+"""Shared pytest fixtures."""
+
+import os
+from contextlib import AsyncExitStack
+
+import pytest
+import pytest_asyncio
+from fastmcp import Client
+
+
+MCP_URL = "http://localhost:8001/mcp"
+
+
+@pytest.fixture(scope="session")
+def require_gemini_key() -> str:
+    """Gemini API key from the environment; skips the requesting test when none is set."""
+    key = os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
+    if not key:
+        pytest.skip("No GOOGLE_API_KEY or GEMINI_API_KEY found")
+    return key
+
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def mcp_client():
+    """Connected MCP client shared by all tests that talk to the HTTP server.
+
+    Skips the requesting tests when no server is listening (e.g. docker-compose is down).
+    """
+    async with AsyncExitStack() as stack:
+        try:
+            client = await stack.enter_async_context(Client(MCP_URL))
+        except (RuntimeError, OSError) as e:
+            pytest.skip(f"MCP server {MCP_URL} not reachable: {e}")
+        yield client
+
+
+@pytest.fixture
+def risky_click_state() -> dict:
+    """HITL gate state: a click flagged as requiring confirmation."""
+    return {
+        "safety": {"action": "require_confirmation", "reason": "Test risky action"},
+        "pending_calls": [{"name": "click_at", "args": {"x": 100, "y": 200}}],
+    }
+
+
+@pytest.fixture
+def dangerous_key_state() -> dict:
+    """HITL gate state: a system key combination flagged as requiring confirmation."""
+    return {
+        "safety": {"action": "require_confirmation", "reason": "Test risky action"},
+        "pending_calls": [{"name": "key_combination", "args": {"keys": "control+alt+delete"}}],
+    }
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""Tests for agent graph nodes (no VNC server or API calls)."""
+
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from vnc_use.agent import ACTION_HISTORY_WINDOW, VncUseAgent
+from vnc_use.types import ActionResult
+
+
+def make_agent() -> VncUseAgent:
+    """Create an agent whose VNC controller is mocked."""
+    agent = VncUseAgent(
+        vnc_server="localhost::5901",
+        vnc_password="test",
+        api_key="fake_key_for_testing",
+    )
+    agent.vnc = MagicMock()
+    agent.vnc.execute_action.side_effect = lambda name, args, capture=True: ActionResult(
+        success=True, screenshot_png=b"png" if capture else b""
+    )
+    return agent
+
+
+def make_state(pending_calls: list) -> dict:
+    """Create a minimal state for the act node."""
+    return {"pending_calls": pending_calls, "step": 1}
+
+
+def test_act_batches_calls_without_coordinates():
+    """Test that calls without coordinates run in one act visit with one screenshot."""
+    agent = make_agent()
+    pending = [
+        {"name": "click_at", "args": {"x": 100, "y": 200}},
+        {"name": "key_combination", "args": {"keys": "control+a"}},
+        {"name": "scroll_document", "args": {"direction": "down"}},
+    ]
+
+    result = agent._act_node(make_state(pending))
+
+    captures = [call.kwargs["capture"] for call in agent.vnc.execute_action.call_args_list]
+    assert captures == [False, False, True]
+    assert result["pending_calls"] == []
+    assert result["last_screenshot_png"] == b"png"
+    assert len(result["action_history"]) == 3
+    assert [log.executed_action["name"] for log in result["step_logs"]] == [
+        "click_at",
+        "key_combination",
+        "scroll_document",
+    ]
+
+
+def test_act_stops_before_coordinate_call():
+    """Test that a coordinate-targeted call waits for a fresh observation."""
+    agent = make_agent()
+    pending = [
+        {"name": "key_combination", "args": {"keys": "enter"}},
+        {"name": "click_at", "args": {"x": 100, "y": 200}},
+    ]
+
+    result = agent._act_node(make_state(pending))
+
+    assert agent.vnc.execute_action.call_count == 1
+    assert result["pending_calls"] == pending[1:]
+    assert result["last_screenshot_png"] == b"png"
+
+
+def test_act_stops_batch_on_error():
+    """Test that a failing call ends the batch."""
+    agent = make_agent()
+    agent.vnc.execute_action.side_effect = lambda name, args, capture=True: ActionResult(
+        success=False, error="boom", screenshot_png=b"err"
+    )
+    pending = [
+        {"name": "key_combination", "args": {"keys": "enter"}},
+        {"name": "scroll_document", "args": {"direction": "down"}},
+    ]
+
+    result = agent._act_node(make_state(pending))
+
+    assert agent.vnc.execute_action.call_count == 1
+    assert result["pending_calls"] == pending[1:]
+    assert result["action_history"] == ["Executed key_combination(keys=enter) - Error: boom"]
+    assert result["last_screenshot_png"] == b"err"
+
+
+def test_propose_guard_uses_monotonic_deadline():
+    """Test that the timeout guard compares against the monotonic deadline."""
+    agent = make_agent()
+    state = {"step": 1, "last_screenshot_png": b"png", "deadline": time.monotonic() + 60}
+
+    assert agent._check_propose_guards(state) is None
+
+    state["deadline"] = time.monotonic() - 1
+    assert agent._check_propose_guards(state) == {
+        "done": True,
+        "error": f"Timeout reached: {agent.seconds_timeout}s",
+    }
+
+
+def test_propose_sends_history_window():
+    """Test that the agent, not the planner, bounds the history sent each turn."""
+    agent = make_agent()
+    agent.planner = MagicMock()
+    agent.planner.extract_all.return_value = ("Done", [], None)
+    history = [f"Executed action #{i}" for i in range(ACTION_HISTORY_WINDOW + 5)]
+    state = {
+        "task": "Task",
+        "step": 1,
+        "action_history": history,
+        "last_screenshot_png": b"png",
+        "deadline": time.monotonic() + 60,
+    }
+
+    agent._propose_node(state)
+
+    sent = agent.planner.generate_stateless.call_args.kwargs["action_history"]
+    assert sent == history[-ACTION_HISTORY_WINDOW:]
+
+
+@pytest.mark.asyncio
+async def test_apropose_awaits_async_planner():
+    """Test that the async propose node uses the planner's native async call."""
+    agent = make_agent()
+    agent.planner = MagicMock()
+    agent.planner.agenerate_stateless = AsyncMock(return_value="response")
+    agent.planner.extract_all.return_value = ("Done", [], None)
+    state = {
+        "task": "Task",
+        "step": 1,
+        "action_history": [],
+        "last_screenshot_png": b"png",
+        "deadline": time.monotonic() + 60,
+    }
+
+    result = await agent._apropose_node(state)
+
+    agent.planner.agenerate_stateless.assert_awaited_once()
+    agent.planner.generate_stateless.assert_not_called()
+    agent.planner.extract_all.assert_called_once_with("response")
+    assert result["done"] is True
+
+
+def test_run_iter_yields_states_then_result(tmp_path, monkeypatch):
+    """Test that run_iter streams graph states and ends with the run result."""
+    monkeypatch.chdir(tmp_path)  # Keep run artifacts out of the repo
+    agent = make_agent()
+    agent.vnc.screenshot_png.return_value = b"png"
+    agent.planner = MagicMock()
+    agent.planner.extract_all.side_effect = [
+        ("Clicking", [{"name": "click_at", "args": {"x": 100, "y": 200}}], None),
+        ("Done", [], None),
+    ]
+
+    *states, result = agent.run_iter("Click the button")
+
+    assert [state["step"] for state in states] == [0, 1, 1, 1]
+    assert "success" not in states[-1], "Only the run result carries success"
+    assert result["success"] is True
+    assert result["final_state"] is states[-1]
+    agent.vnc.disconnect.assert_called_once()
+
+
+def test_run_iter_closed_early(tmp_path, monkeypatch):
+    """Test that abandoning run_iter stops the run and disconnects VNC."""
+    monkeypatch.chdir(tmp_path)
+    agent = make_agent()
+    agent.vnc.screenshot_png.return_value = b"png"
+    agent.planner = MagicMock()
+
+    steps = agent.run_iter("Click the button")
+    assert next(steps)["step"] == 0
+    steps.close()
+
+    agent.planner.generate_stateless.assert_not_called()
+    agent.vnc.disconnect.assert_called_once()
+    assert not agent.run_logger._writer.is_alive(), "Run logger should be closed"
+
+
+@pytest.mark.parametrize("use_async", [False, True], ids=["run", "arun"])
+def test_connect_failure_closes_run_logger(tmp_path, monkeypatch, use_async):
+    """Test that a failed VNC connection gives the same result on both run paths."""
+    monkeypatch.chdir(tmp_path)
+    agent = make_agent()
+    agent.vnc.connect.side_effect = ConnectionRefusedError("no server")
+
+    if use_async:
+        result = asyncio.run(agent.arun("Click the button"))
+    else:
+        result = agent.run("Click the button")
+
+    assert result == {"success": False, "error": "VNC connection failed: no server"}
+    assert not agent.run_logger._writer.is_alive(), "Run logger should be closed"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
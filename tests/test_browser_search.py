@@ -9,6 +9,7 @@ Usage:
 import logging
 import os
 import sys
+import traceback
 
 from src.vnc_use import VncUseAgent
 
@@ -85,8 +86,6 @@ Report the first 3-5 blog post headlines you can see."""
 
     except Exception as e:
         print(f"\n✗ Test failed with exception: {e}")
-        import traceback
-
         traceback.print_exc()
         return False
 
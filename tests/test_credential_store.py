@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""Tests for VNC credential stores."""
+
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+from vnc_use import credentials_cli
+from vnc_use.credential_store import (
+    ChainedStore,
+    EnvironmentStore,
+    KeyringStore,
+    NetrcStore,
+    VNCCredentials,
+    get_default_store,
+)
+
+
+def test_default_store_cached():
+    """Test that the default store chain is built once per process."""
+    get_default_store.cache_clear()
+
+    store = get_default_store()
+
+    assert isinstance(store, ChainedStore)
+    assert get_default_store() is store, "Should reuse the cached chain"
+
+    get_default_store.cache_clear()
+    assert get_default_store() is not store, "cache_clear() should rebuild the chain"
+
+
+def test_keyring_store_requires_keyring():
+    """Test that KeyringStore checks for keyring without importing it."""
+    with patch("vnc_use.credential_store.importlib.util.find_spec", return_value=None):
+        with pytest.raises(ImportError, match="pip install keyring"):
+            KeyringStore()
+
+    with (
+        patch("vnc_use.credential_store.importlib.util.find_spec", return_value=object()),
+        patch("vnc_use.credential_store._import_keyring") as import_keyring,
+    ):
+        store = KeyringStore()
+        import_keyring.assert_not_called()
+        store.keyring.get_password.return_value = None
+        assert store.get("vnc-01") is None
+        import_keyring.assert_called()
+
+
+def test_keyring_payload_format():
+    """Test the NUL-separated keyring payload and the legacy JSON fallback."""
+    with (
+        patch("vnc_use.credential_store.importlib.util.find_spec", return_value=object()),
+        patch("vnc_use.credential_store._import_keyring") as import_keyring,
+    ):
+        backend = import_keyring.return_value
+        store = KeyringStore()
+
+        store.set("vnc-01", "vnc-01::5901", "secret")
+        payload = backend.set_password.call_args.args[2]
+        assert payload == "vnc-01::5901\0secret"
+
+        backend.get_password.return_value = payload
+        creds = store.get("vnc-01")
+        assert (creds.server, creds.password) == ("vnc-01::5901", "secret")
+
+        backend.get_password.return_value = "vnc-01::5901\0"
+        assert store.get("vnc-01").password is None
+
+        backend.get_password.return_value = '{"server": "vnc-01::5901", "password": "old"}'
+        creds = store.get("vnc-01")
+        assert (creds.server, creds.password) == ("vnc-01::5901", "old")
+
+
+def test_netrc_parse_cached(tmp_path):
+    """Test that netrc lookups reuse the parsed file until it changes."""
+    store = NetrcStore(str(tmp_path / "credentials"))
+    store.set("vnc-01", "vnc-01::5901", "secret")
+
+    with patch("vnc_use.credential_store.netrc.netrc", wraps=__import__("netrc").netrc) as parse:
+        assert store.get("vnc-01").password == "secret"
+        assert store.list_hosts() == ["vnc-01"]
+        assert parse.call_count == 1, "Unchanged file should be parsed once"
+
+        store.set("vnc-02", "vnc-02::5901", "other")
+        assert store.get("vnc-02").server == "vnc-02::5901"
+        assert parse.call_count == 2, "Modified file should be re-parsed"
+
+    assert NetrcStore(str(tmp_path / "missing")).get("vnc-01") is None
+
+
+def test_netrc_set_permissions(tmp_path):
+    """Test that the netrc file is created, or tightened, to owner-only permissions."""
+    path = tmp_path / "credentials"
+    NetrcStore(str(path)).set("vnc-01", "vnc-01::5901", "secret")
+    assert path.stat().st_mode & 0o777 == 0o600
+
+    loose = tmp_path / "loose"
+    loose.write_text("")
+    loose.chmod(0o644)
+    NetrcStore(str(loose)).set("vnc-01", "vnc-01::5901", "secret")
+    assert loose.stat().st_mode & 0o777 == 0o600
+
+
+def test_netrc_delete(tmp_path):
+    """Test that deleting a host keeps the other entries and file permissions."""
+    path = tmp_path / "credentials"
+    store = NetrcStore(str(path))
+    store.set("vnc-01", "vnc-01::5901", "one")
+    store.set("vnc-02", "vnc-02::5901", "two")
+    assert store.list_hosts() == ["vnc-01", "vnc-02"]
+
+    assert store.delete("vnc-01") is True
+
+    assert store.list_hosts() == ["vnc-02"], "Deleted host should be gone"
+    assert store.get("vnc-02").password == "two"
+    assert path.stat().st_mode & 0o777 == 0o600
+    assert list(tmp_path.iterdir()) == [path], "No temp files should be left behind"
+
+    store.set("vnc-020", "vnc-020::5901", "three")
+    assert store.delete("vnc-02") is True
+    assert store.list_hosts() == ["vnc-020"], "Hosts sharing a prefix should be kept"
+    assert store.delete("vnc-02") is False, "Unknown host should not rewrite the file"
+    assert NetrcStore(str(tmp_path / "missing")).delete("vnc-01") is False
+
+
+def test_chained_store_caches_lookups():
+    """Test that hits and misses are cached until set/delete or TTL expiry."""
+    backend = MagicMock()
+    backend.get.return_value = None
+    store = ChainedStore([backend])
+
+    assert store.get("vnc-01") is None
+    assert store.get("vnc-01") is None
+    assert backend.get.call_count == 1, "Miss should be cached"
+
+    store.set("vnc-01", "vnc-01::5901", "secret")
+    store.get("vnc-01")
+    assert backend.get.call_count == 2, "set() should invalidate the cached entry"
+
+    store.delete("vnc-01")
+    store.get("vnc-01")
+    assert backend.get.call_count == 3, "delete() should invalidate the cached entry"
+
+    uncached = ChainedStore([backend], ttl=0)
+    uncached.get("vnc-01")
+    uncached.get("vnc-01")
+    assert backend.get.call_count == 5, "ttl=0 should disable caching"
+
+
+def test_chained_store_list_hosts():
+    """Test that hosts are merged across stores and sorted only on request."""
+    first, second = MagicMock(), MagicMock()
+    first.list_hosts.return_value = ["vnc-02", "vnc-01"]
+    second.list_hosts.return_value = ["vnc-01"]
+    store = ChainedStore([first, second])
+
+    assert store.list_hosts() == ["vnc-01", "vnc-02"]
+    assert sorted(store.list_hosts(sort=False)) == ["vnc-01", "vnc-02"]
+
+
+def test_environment_store_reads_once(monkeypatch):
+    """Test that EnvironmentStore snapshots the environment at construction."""
+    monkeypatch.setenv("VNC_SERVER", "vnc-01::5901")
+    monkeypatch.setenv("VNC_PASSWORD", "secret")
+    store = EnvironmentStore()
+    monkeypatch.delenv("VNC_SERVER")
+
+    creds = store.get("ignored")
+    assert (creds.server, creds.password) == ("vnc-01::5901", "secret")
+    assert store.list_hosts() == ["vnc-01::5901"]
+    assert EnvironmentStore().get("ignored") is None
+
+
+def test_keyring_get_many_sequential():
+    """Test that batched keyring lookups run one at a time on the calling thread."""
+    calls = []
+    with (
+        patch("vnc_use.credential_store.importlib.util.find_spec", return_value=object()),
+        patch("vnc_use.credential_store._import_keyring") as import_keyring,
+    ):
+        import_keyring.return_value.get_password.side_effect = lambda service, host: (
+            calls.append((host, threading.get_ident())) or None
+        )
+        results = KeyringStore().get_many(["vnc-01", "vnc-02", "vnc-03"])
+
+    assert results == {"vnc-01": None, "vnc-02": None, "vnc-03": None}
+    assert calls == [(host, threading.get_ident()) for host in ("vnc-01", "vnc-02", "vnc-03")]
+
+
+def test_get_many(tmp_path):
+    """Test batch lookups across a chain of stores."""
+    netrc_store = NetrcStore(str(tmp_path / "credentials"))
+    netrc_store.set("vnc-01", "vnc-01::5901", "one")
+    fallback = MagicMock()
+    fallback.get_many.side_effect = lambda hosts: {
+        host: VNCCredentials(server=f"{host}::5902") for host in hosts
+    }
+    store = ChainedStore([netrc_store, fallback])
+
+    results = store.get_many(["vnc-01", "vnc-02"])
+
+    assert results["vnc-01"].password == "one"
+    assert results["vnc-02"].server == "vnc-02::5902"
+    fallback.get_many.assert_called_once_with(["vnc-02"])
+
+    store.get_many(["vnc-02"])
+    assert fallback.get_many.call_count == 1, "Batch results should be cached"
+    assert NetrcStore(str(tmp_path / "missing")).get_many(["vnc-01"]) == {"vnc-01": None}
+
+
+def test_chained_store_set_uses_first_writable():
+    """Test that set() writes to the first store that is not EnvironmentStore."""
+    writable = MagicMock()
+    store = ChainedStore([EnvironmentStore(), writable, MagicMock()])
+
+    store.set("vnc-01", "vnc-01::5901", "secret")
+    writable.set.assert_called_once_with("vnc-01", "vnc-01::5901", "secret")
+
+    with pytest.raises(RuntimeError, match="No writable credential store"):
+        ChainedStore([EnvironmentStore()]).set("vnc-01", "vnc-01::5901")
+
+
+def test_credentials_cli_dispatch(capsys):
+    """Test that a subcommand is dispatched without the full parser."""
+    store = MagicMock()
+    store.list_hosts.return_value = ["vnc-01"]
+
+    with (
+        patch("sys.argv", ["vnc-use-credentials", "list"]),
+        patch.object(credentials_cli, "get_default_store", return_value=store),
+        patch.object(credentials_cli, "_build_parser") as build_parser,
+    ):
+        assert credentials_cli.main() == 0
+        build_parser.assert_not_called()
+
+    assert "vnc-01" in capsys.readouterr().out
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -14,6 +14,7 @@ import argparse
 import logging
 import os
 import sys
+import traceback
 
 from src.vnc_use import VncUseAgent
 
@@ -69,8 +70,6 @@ def test_simple_task():
 
     except Exception as e:
         print(f"\n✗ Test failed with exception: {e}")
-        import traceback
-
         traceback.print_exc()
         return False
 
@@ -119,8 +118,6 @@ def test_browser_task():
 
     except Exception as e:
         print(f"\n✗ Test failed with exception: {e}")
-        import traceback
-
         traceback.print_exc()
         return False
 
@@ -10,31 +10,134 @@ Usage:
 """
 
 import argparse
+import base64
+import functools
 import io
 import os
+import struct
 import sys
-from unittest.mock import MagicMock
+import traceback
+import zlib
+from unittest.mock import MagicMock, patch
 
-from PIL import Image
+from PIL import Image, ImageColor
 
 from src.vnc_use.backends.vnc import denorm_x, denorm_y
-from src.vnc_use.planners.gemini import GeminiComputerUse
+from src.vnc_use.planners import gemini
+from src.vnc_use.planners.gemini import (
+    PNG_SIGNATURE,
+    GeminiComputerUse,
+    compress_screenshot,
+    compress_screenshot_b64,
+    compress_screenshot_cached,
+    png_size,
+)
+
+
+def _png_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    """Wrap data in a PNG chunk (length, type, data, CRC)."""
+    return (
+        struct.pack(">I", len(data))
+        + chunk_type
+        + data
+        + struct.pack(">I", zlib.crc32(chunk_type + data))
+    )
 
 
-def create_mock_screenshot(width: int = 1440, height: int = 900) -> bytes:
+@functools.lru_cache(maxsize=8)
+def create_mock_screenshot(width: int = 1440, height: int = 900, color: str = "blue") -> bytes:
     """Create a simple mock PNG screenshot.
 
+    The image is a single colour, so the PNG is assembled directly from one
+    repeated scanline instead of going through Pillow. It is built once per
+    (width, height, color) and shared between tests; callers must not rely
+    on getting a distinct bytes object.
+
     Args:
         width: Image width
         height: Image height
+        color: Fill color
 
     Returns:
         PNG bytes
     """
-    img = Image.new("RGB", (width, height), color="blue")
+    scanline = b"\x00" + bytes(ImageColor.getrgb(color)) * width  # filter type 0 (none)
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)  # 8-bit truecolour
+    return (
+        PNG_SIGNATURE
+        + _png_chunk(b"IHDR", ihdr)
+        + _png_chunk(b"IDAT", zlib.compress(scanline * height, 1))
+        + _png_chunk(b"IEND", b"")
+    )
+
+
+def test_compress_screenshot():
+    """Test screenshot downscaling and re-encoding for the planner."""
+    print("\n=== Testing Screenshot Compression ===")
+
+    compressed = compress_screenshot(create_mock_screenshot(), max_width=512)
+    img = Image.open(io.BytesIO(compressed))
+    assert img.format == "PNG", "Should stay PNG"
+    assert img.size == (512, 320), "Should scale to max_width keeping aspect ratio"
+
+    rgba = Image.new("RGBA", (640, 400), color=(0, 0, 255, 255))
+    buf = io.BytesIO()
+    rgba.save(buf, format="PNG")
+    assert Image.open(io.BytesIO(compress_screenshot(buf.getvalue()))).mode == "RGB", (
+        "Should drop alpha channel"
+    )
+
+    small = create_mock_screenshot(width=400, height=250)
+    assert png_size(small) == (400, 250), "Should read size from IHDR"
+    assert compress_screenshot(small, max_width=512) is small, "Should skip re-encoding"
+
     buf = io.BytesIO()
-    img.save(buf, format="PNG")
-    return buf.getvalue()
+    Image.effect_noise((400, 250), 100).convert("RGB").save(buf, format="PNG", compress_level=0)
+    uncompressed = buf.getvalue()
+    assert len(uncompressed) > 200_000
+    assert compress_screenshot(uncompressed) is not uncompressed, "Large PNGs should be re-encoded"
+
+    quantized = Image.open(io.BytesIO(compress_screenshot(create_mock_screenshot(), quantize=True)))
+    assert (quantized.mode, quantized.size) == ("P", (512, 320)), "Should encode a palette PNG"
+
+    jpeg = compress_screenshot(small, image_format="JPEG")
+    assert Image.open(io.BytesIO(jpeg)).format == "JPEG", "Should encode JPEG on request"
+
+    reused = io.BytesIO(b"stale data that must not leak into the output")
+    for _ in range(2):
+        assert compress_screenshot(create_mock_screenshot(), out=reused) == compressed, (
+            "Reused buffer should give the same bytes"
+        )
+
+    print(f"  ✓ Compressed screenshot to {img.size} ({len(compressed)} bytes)")
+
+
+def test_compressed_screenshot_cache():
+    """Test that identical frames are compressed once."""
+    print("\n=== Testing Compressed Screenshot Cache ===")
+
+    screenshot = create_mock_screenshot(width=1024, height=640)
+    with patch.object(gemini, "compress_screenshot", wraps=compress_screenshot) as compress:
+        first = compress_screenshot_cached(screenshot)
+        again = compress_screenshot_cached(bytes(bytearray(screenshot)))
+        b64 = compress_screenshot_b64(screenshot)
+        assert compress.call_count == 1, "Identical frame should not be re-encoded"
+        assert again is first
+        assert base64.b64decode(b64) == first
+
+        compress_screenshot_cached(screenshot, max_width=256)
+        assert compress.call_count == 2, "Different max_width is a different entry"
+
+    # Retrying with the same bytes object (e.g. after a rate limit) skips hashing too
+    with patch.object(gemini.hashlib, "blake2b", wraps=gemini.hashlib.blake2b) as blake2b:
+        assert compress_screenshot_b64(screenshot, max_width=256) is compress_screenshot_b64(
+            screenshot, max_width=256
+        )
+        assert blake2b.call_count == 0, "Same object should not be re-hashed"
+
+    assert len(gemini._screenshot_cache) <= gemini._SCREENSHOT_CACHE_SIZE
+
+    print(f"  ✓ Reused compressed frame ({len(first)} bytes)")
 
 
 def test_config_building():
@@ -56,6 +159,14 @@ def test_config_building():
         "Should exclude specified actions"
     )
     assert config.thinking_config.include_thoughts == False, "Should not include thoughts"
+    assert planner.build_config() is config, "Config should be built once and reused"
+
+    planner.excluded_actions.append("hover_at")
+    rebuilt = planner.build_config()
+    assert rebuilt is not config, "Changed settings should rebuild the config"
+    assert "hover_at" in rebuilt.tools[0].computer_use.excluded_predefined_functions
+    planner.include_thoughts = True
+    assert planner.build_config().thinking_config.include_thoughts is True
 
     print("  ✓ Config built successfully")
     print("  ✓ Computer Use tool configured")
@@ -81,6 +192,10 @@ def test_start_contents():
     contents_with_img = planner.start_contents("Click the button", screenshot)
     assert len(contents_with_img) == 1, "Should have one content item"
     assert len(contents_with_img[0].parts) == 2, "Should have two parts (text + image)"
+    image_data = contents_with_img[0].parts[1].inline_data.data
+    assert image_data == compress_screenshot(screenshot, quantize=True), (
+        "Should carry raw quantized PNG bytes"
+    )
     print(f"  ✓ Contents with screenshot built ({len(screenshot)} bytes)")
 
 
@@ -141,6 +256,46 @@ def test_append_function_response():
     assert updated[-1].role == "user", "Function response should be user role"
     print(f"  ✓ Function response appended (contents: {initial_len} -> {len(updated)})")
 
+    # Parallel calls are answered in a single user turn
+    batched = planner.append_function_responses(
+        contents,
+        [("type_text_at", screenshot, "", None), ("key_combination", screenshot, "", "boom")],
+    )
+    assert len(batched) == initial_len + 2, "Should add one content item for all calls"
+    names = [part.function_response.name for part in batched[-1].parts]
+    assert names == ["type_text_at", "key_combination"], "Should keep call order"
+    assert batched[-1].parts[1].function_response.response["error"] == "boom"
+    assert planner.append_function_responses(contents, []) is contents
+    assert len(contents) == initial_len + 2, "No results should add nothing"
+    print("  ✓ Parallel function responses appended in one turn")
+
+
+def test_generate_strips_old_screenshots():
+    """Test that only history items carrying screenshots are rebuilt, once."""
+    print("\n=== Testing History Screenshot Stripping ===")
+
+    planner = GeminiComputerUse(api_key="fake_key_for_testing")
+    planner.client = MagicMock()
+    screenshot = create_mock_screenshot()
+
+    contents = planner.start_contents("Do something")
+    for _ in range(2):
+        planner.append_function_response(contents, "click_at", screenshot, error="boom")
+
+    planner.generate(contents)
+    sent = planner.client.models.generate_content.call_args.kwargs["contents"]
+    assert sent[0] is contents[0], "Items without screenshots should be reused"
+    assert sent[1].parts[0].function_response.response == {"url": "", "error": "boom"}
+    assert sent[-1] is contents[-1], "Latest screenshot should be kept"
+
+    planner.append_function_response(contents, "click_at", screenshot)
+    planner.generate(contents)
+    resent = planner.client.models.generate_content.call_args.kwargs["contents"]
+    assert resent[1] is sent[1], "Stripped copies should be reused across calls"
+    assert "screenshot" not in resent[2].parts[0].function_response.response
+
+    print(f"  ✓ Stripped screenshots from {len(contents) - 1} history items")
+
 
 def test_coordinate_denormalization():
     """Test coordinate conversion (from VNC backend)."""
@@ -213,6 +368,23 @@ def test_extract_function_calls():
     assert calls[0]["args"]["x"] == 500, "Args should match"
     assert calls[0]["args"]["y"] == 300, "Args should match"
 
+    # The candidate walk is reused for further extract_* calls on the response
+    mock_response.candidates = []
+    assert planner.extract_function_calls(mock_response) == calls, "Walk should be memoized"
+    assert planner.extract_function_calls(MagicMock(candidates=[])) == []
+    assert planner.extract_text(MagicMock(candidates=None)) == ""
+
+    # The fused extractor matches the individual ones
+    mock_part.text = "Clicking the button"
+    mock_candidate.safety_decision = None
+    fresh = MagicMock(candidates=[mock_candidate])
+    assert planner.extract_all(fresh) == (
+        planner.extract_text(fresh),
+        planner.extract_function_calls(fresh),
+        planner.extract_safety_decision(fresh),
+    )
+    assert planner.extract_all(fresh)[0] == "Clicking the button"
+
     print("  ✓ Function calls extracted successfully")
     print(f"  ✓ Extracted: {calls[0]['name']}({calls[0]['args']})")
 
@@ -277,8 +449,6 @@ def test_with_real_api():
 
     except Exception as e:
         print(f"  ✗ API test failed: {e}")
-        import traceback
-
         traceback.print_exc()
         return False
 
@@ -299,10 +469,13 @@ def main():
 
     # Run mock tests (no API required)
     try:
+        test_compress_screenshot()
+        test_compressed_screenshot_cache()
         test_config_building()
         test_start_contents()
         test_function_response_building()
         test_append_function_response()
+        test_generate_strips_old_screenshots()
         test_coordinate_denormalization()
         test_extract_function_calls()
 
@@ -312,8 +485,6 @@ def main():
 
     except Exception as e:
         print(f"\n✗ Mock tests failed: {e}")
-        import traceback
-
         traceback.print_exc()
         sys.exit(1)
 
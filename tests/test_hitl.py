@@ -1,97 +1,93 @@
 #!/usr/bin/env python3
 """Test HITL callback integration."""
 
+import logging
+from unittest.mock import AsyncMock
 
+import pytest
 from vnc_use.agent import VncUseAgent
+from vnc_use.safety import requires_confirmation, should_block
 
 
-def test_hitl_callback():
-    """Test that HITL callback is invoked when safety decision requires confirmation."""
-    print("Testing HITL callback integration...")
-
-    # Track callback invocations
-    callback_invoked = False
-    callback_safety = None
-    callback_pending = None
-
-    async def mock_callback(safety_decision: dict, pending_calls: list) -> bool:
-        """Mock callback that records invocation."""
-        nonlocal callback_invoked, callback_safety, callback_pending
-        callback_invoked = True
-        callback_safety = safety_decision
-        callback_pending = pending_calls
-        print(f"✓ Callback invoked with safety: {safety_decision}")
-        print(f"✓ Callback invoked with pending: {pending_calls}")
-        # Auto-approve for testing
-        return True
-
-    # Create agent with callback
-    agent = VncUseAgent(
+logger = logging.getLogger(__name__)
+
+
+@pytest.fixture(scope="module")
+def hitl_agent() -> VncUseAgent:
+    """HITL agent shared by the tests in this module; tests set hitl_callback themselves."""
+    return VncUseAgent(
         vnc_server="localhost::5901",
         vnc_password="test",
         hitl_mode=True,
-        hitl_callback=mock_callback,
+        hitl_callback=None,
+        api_key="fake_key_for_testing",
     )
 
-    # Verify callback is set
-    assert agent.hitl_callback is not None, "HITL callback not set"
-    print("✓ Agent created with HITL callback")
 
-    # Test the _hitl_gate_node directly
-    state = {
-        "safety": {"action": "require_confirmation", "reason": "Test risky action"},
-        "pending_calls": [{"name": "click_at", "args": {"x": 100, "y": 200}}],
-    }
+def test_hitl_callback(hitl_agent, risky_click_state):
+    """Test that HITL callback is invoked when safety decision requires confirmation."""
+    logger.info("Testing HITL callback integration...")
 
-    print("\n✓ Invoking HITL gate node...")
-    result = agent._hitl_gate_node(state)
+    # Install an auto-approving callback on the shared agent
+    callback = AsyncMock(return_value=True)
+    hitl_agent.hitl_callback = callback
+    logger.info("✓ Agent created with HITL callback")
+
+    # Test the _hitl_gate_node directly
+    logger.info("✓ Invoking HITL gate node...")
+    result = hitl_agent._hitl_gate_node(risky_click_state)
 
     # Verify callback was invoked
-    assert callback_invoked, "Callback was not invoked"
-    assert callback_safety is not None, "Safety decision not passed to callback"
-    assert callback_pending is not None, "Pending calls not passed to callback"
+    callback.assert_awaited_once()
+    safety_arg, pending_arg = callback.await_args.args
+    assert safety_arg == risky_click_state["safety"], "Safety decision not passed to callback"
+    assert pending_arg == risky_click_state["pending_calls"], "Pending calls not passed to callback"
     assert result.get("done") is not True, "Action was denied unexpectedly"
 
-    print("\n✅ HITL CALLBACK TEST PASSED")
-    print("  ✓ Callback mechanism working")
-    print("  ✓ Safety decision passed correctly")
-    print("  ✓ Pending calls passed correctly")
-    print("  ✓ Approval flows through correctly")
-
 
-def test_hitl_denial():
+def test_hitl_denial(hitl_agent, dangerous_key_state):
     """Test that denial works correctly."""
-    print("\n\nTesting HITL denial...")
+    logger.info("Testing HITL denial...")
 
-    async def deny_callback(safety_decision: dict, pending_calls: list) -> bool:
-        """Mock callback that denies."""
-        print(f"✓ Callback denying action: {pending_calls}")
-        return False
+    callback = AsyncMock(return_value=False)
+    hitl_agent.hitl_callback = callback
 
-    agent = VncUseAgent(
-        vnc_server="localhost::5901",
-        vnc_password="test",
-        hitl_mode=True,
-        hitl_callback=deny_callback,
-    )
-
-    state = {
-        "safety": {"action": "require_confirmation", "reason": "Test risky action"},
-        "pending_calls": [{"name": "key_combination", "args": {"keys": "control+alt+delete"}}],
-    }
-
-    result = agent._hitl_gate_node(state)
+    result = hitl_agent._hitl_gate_node(dangerous_key_state)
 
     # Verify denial
+    callback.assert_awaited_once()
     assert result.get("done") is True, "Action should be marked done after denial"
     assert "denied" in result.get("error", "").lower(), "Error should mention denial"
 
-    print("\n✅ HITL DENIAL TEST PASSED")
-    print("  ✓ Denial mechanism working")
-    print("  ✓ Error message correct")
+
+@pytest.mark.asyncio
+async def test_hitl_callback_async_node(hitl_agent, risky_click_state):
+    """Test that the async HITL gate awaits the callback on the running loop."""
+    logger.info("Testing async HITL gate node...")
+
+    callback = AsyncMock(return_value=True)
+    hitl_agent.hitl_callback = callback
+
+    # Would raise "asyncio.run() cannot be called from a running event loop"
+    # if the callback were not awaited directly
+    result = await hitl_agent._ahitl_gate_node(risky_click_state)
+
+    callback.assert_awaited_once()
+    assert result == {}, "Approved action should not end the run"
+
+
+def test_safety_decision_actions():
+    """Test that safety actions are matched case-insensitively against known tokens."""
+    assert requires_confirmation({"action": "REQUIRE_CONFIRMATION"})
+    assert requires_confirmation({"action": "confirm"})
+    assert not requires_confirmation({"action": "block"})
+    assert not requires_confirmation({"action": None, "reason": "missing"})
+    assert not requires_confirmation(None)
+
+    assert should_block({"action": "Deny"})
+    assert not should_block({"action": "require_confirmation"})
+    assert not should_block({})
 
 
 if __name__ == "__main__":
-    test_hitl_callback()
-    test_hitl_denial()
-    print("\n\n🎉 ALL HITL TESTS PASSED")
+    pytest.main([__file__, "-v", "--log-cli-level=INFO"])
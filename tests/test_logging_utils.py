@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""Tests for run artifact logging."""
+
+import json
+from dataclasses import replace
+from datetime import datetime
+
+import pytest
+from vnc_use.logging_utils import RunLogger
+from vnc_use.types import StepLog
+
+
+def test_screenshots_written_by_finalize(tmp_path):
+    """Test that queued screenshots are on disk once the run is finalized."""
+    run_logger = RunLogger("Test task", run_id="test_run", base_dir=str(tmp_path))
+
+    paths = [run_logger.log_screenshot(step, b"png%d" % step, "after") for step in range(3)]
+    run_logger.finalize(done=True, final_state={})
+
+    assert [path.read_bytes() for path in paths] == [b"png0", b"png1", b"png2"]
+    assert paths[1].name == "step_001_after.png"
+    assert not run_logger._writer.is_alive(), "Writer thread should stop on finalize"
+
+    metadata = json.loads((tmp_path / "test_run" / "metadata.json").read_text())
+    assert metadata["task"] == "Test task"
+    assert metadata["done"] is True
+
+    # Closing again (e.g. from an error path) is a no-op
+    run_logger.close()
+
+
+def test_events_log(tmp_path):
+    """Test that requests, calls and errors are appended to events.jsonl."""
+    run_logger = RunLogger("Test task", run_id="test_run", base_dir=str(tmp_path))
+
+    request_path = run_logger.log_request(1, contents=["hello"], config={"temperature": 0})
+    run_logger.log_function_call(1, "click_at", {"x": 1, "y": 2}, {"success": True})
+    run_logger.log_error(2, "boom")
+    run_logger.finalize(done=False, final_state={})
+
+    assert json.loads(request_path.read_text())["contents"] == ["hello"]
+    lines = (tmp_path / "test_run" / "events.jsonl").read_text().splitlines()
+    events = [json.loads(line) for line in lines]
+    assert [event["event"] for event in events] == ["request", "function_call", "error"]
+    assert events[0]["path"] == "step_001_request.json"
+    assert events[1]["function"] == "click_at"
+    assert events[2]["error"] == "boom"
+    assert events[1]["t_ns"] <= events[2]["t_ns"], "Entries carry monotonic offsets"
+
+    metadata = json.loads((tmp_path / "test_run" / "metadata.json").read_text())
+    start = datetime.fromisoformat(metadata["start_time"])
+    call_time = datetime.fromisoformat(metadata["steps"][0]["timestamp"])
+    assert start <= call_time <= datetime.fromisoformat(metadata["end_time"])
+
+
+def test_sdk_objects_serialized(tmp_path):
+    """Test that arbitrary objects are serialized via their attributes."""
+
+    class Part:
+        def __init__(self):
+            self.text = "hi"
+            self.data = b"\x89PNG"
+
+    run_logger = RunLogger("Test task", run_id="test_run", base_dir=str(tmp_path))
+    path = run_logger.log_response(1, {"parts": (Part(),), 3: None})
+    run_logger.close()
+
+    response = json.loads(path.read_text())["response"]
+    assert response["parts"] == [{"text": "hi", "data": str(b"\x89PNG")}]
+    assert response["3"] is None
+
+
+def test_serialization_depth_limited(tmp_path, monkeypatch):
+    """Test that deeply nested and cyclic objects are truncated."""
+
+    class Node:
+        def __init__(self, child=None):
+            self.child = child
+
+    monkeypatch.setenv("VNC_LOG_DEPTH", "4")
+    run_logger = RunLogger("Test task", run_id="test_run", base_dir=str(tmp_path))
+    cyclic = Node()
+    cyclic.child = cyclic
+
+    deep_path = run_logger.log_response(1, Node(Node(Node())))
+    cyclic_path = run_logger.log_response(2, cyclic)
+    run_logger.close()
+
+    deep = json.loads(deep_path.read_text())["response"]
+    assert deep["child"]["child"].startswith("<truncated Node")
+    assert json.loads(cyclic_path.read_text())["response"]["child"].startswith("<cycle Node")
+
+
+def test_request_secrets_redacted(tmp_path):
+    """Test that secret-looking keys are redacted without touching the input."""
+    run_logger = RunLogger("Test task", run_id="test_run", base_dir=str(tmp_path))
+    config = {"api_key": "sk-123", "options": [{"X-Auth-Token": "abc", "model": "gemini"}]}
+
+    path = run_logger.log_request(1, contents=[], config=config)
+    run_logger.close()
+
+    logged = json.loads(path.read_text())["config"]
+    assert logged["api_key"] == "***REDACTED***"
+    assert logged["options"] == [{"X-Auth-Token": "***REDACTED***", "model": "gemini"}]
+    assert config["api_key"] == "sk-123", "Input should not be modified"
+
+
+def test_request_object_secrets_redacted(tmp_path):
+    """Test that secrets on SDK-style config objects are redacted while encoding."""
+
+    class HttpOptions:
+        def __init__(self):
+            self.headers = {"x-goog-api-key": "SECRET456", "User-Agent": "vnc-use"}
+
+    class Config:
+        def __init__(self):
+            self.api_key = "SECRET123"
+            self.max_output_tokens = 1024
+            self.http_options = HttpOptions()
+
+    run_logger = RunLogger("Test task", run_id="test_run", base_dir=str(tmp_path))
+
+    path = run_logger.log_request(1, [{"password": "pw"}], Config())
+    run_logger.close()
+
+    text = path.read_text()
+    assert "SECRET" not in text and '"pw"' not in text
+    logged = json.loads(text)["config"]
+    assert logged["api_key"] == "***REDACTED***"
+    assert logged["http_options"]["headers"]["x-goog-api-key"] == "***REDACTED***"
+    assert logged["max_output_tokens"] == 1024, "Token counts are not secrets"
+
+
+def test_compressed_events_log(tmp_path, monkeypatch):
+    """Test that VNC_LOG_COMPRESS=zstd writes a zstd-compressed event log."""
+    zstandard = pytest.importorskip("zstandard")
+    monkeypatch.setenv("VNC_LOG_COMPRESS", "zstd")
+    run_logger = RunLogger("Test task", run_id="test_run", base_dir=str(tmp_path))
+
+    run_logger.log_error(1, "boom")
+    run_logger.finalize(done=False, final_state={})
+
+    path = tmp_path / "test_run" / "events.jsonl.zst"
+    with zstandard.ZstdDecompressor().stream_reader(path.open("rb")) as reader:
+        events = [json.loads(line) for line in reader.read().splitlines()]
+    assert [event["error"] for event in events] == ["boom"]
+    assert not (tmp_path / "test_run" / "events.jsonl").exists()
+
+
+def test_artifact_level(tmp_path, monkeypatch):
+    """Test that VNC_LOG_ARTIFACTS limits which artifacts are written."""
+    monkeypatch.setenv("VNC_LOG_ARTIFACTS", "errors")
+    run_logger = RunLogger("Test task", run_id="test_run", base_dir=str(tmp_path))
+
+    request_path = run_logger.log_request(1, contents=[], config={})
+    after_path = run_logger.log_screenshot(1, b"png", "step_001_after")
+    error_path = run_logger.log_screenshot(1, b"png", "step_001_error")
+    run_logger.log_function_call(1, "click_at", {"x": 1, "y": 2}, {"success": True})
+    step_log = replace(make_step_log(1, timestamp=1000.0), screenshot_path=None)
+    run_logger.finalize(done=True, final_state={"step_logs": [step_log]})
+
+    assert not request_path.exists()
+    assert after_path is None, "Skipped screenshots should not report a path"
+    assert error_path.exists(), "Error screenshots should be kept"
+    report = (tmp_path / "test_run" / "EXECUTION_REPORT.md").read_text()
+    assert "![After Step" not in report, "Steps without a saved screenshot have no image"
+    assert "- **Screenshots Saved:** 1" in report
+    assert (tmp_path / "test_run" / "metadata.json").exists(), "Metadata is always written"
+
+    monkeypatch.setenv("VNC_LOG_ARTIFACTS", "bogus")
+    fallback = RunLogger("Test task", run_id="fallback", base_dir=str(tmp_path))
+    fallback.close()
+    assert fallback.artifact_level == "full", "Unknown levels should fall back to full"
+
+
+def make_step_log(step: int, timestamp: float, result: str = "Success") -> StepLog:
+    """Create a step log for a click action."""
+    return StepLog(
+        step_number=step,
+        observation=f"observation {step}",
+        proposed_actions=({"name": "click_at", "args": {"x": 1, "y": 2}},),
+        executed_action={"name": "click_at", "args": {"x": 1, "y": 2}},
+        result=result,
+        screenshot_path=f"step_{step:03d}_after.png",
+        timestamp=timestamp,
+    )
+
+
+def test_report_rendered_incrementally(tmp_path):
+    """Test that steps logged during the run end up in the execution report."""
+    run_logger = RunLogger("Test task", run_id="test_run", base_dir=str(tmp_path))
+    first = make_step_log(1, timestamp=1000.0)
+    second = make_step_log(2, timestamp=1002.5, result="Error: boom")
+
+    run_logger.log_step(first)
+    assert len(run_logger._report_steps) == 1, "Step should be rendered when logged"
+    run_logger.finalize(done=True, final_state={"done": True, "step_logs": [first, second]})
+
+    report = (tmp_path / "test_run" / "EXECUTION_REPORT.md").read_text()
+    assert report.startswith("# Agent Execution Report")
+    assert "### Step 2 (2.5s)" in report, "Duration should be relative to the previous step"
+    assert "**Result:** ✗ Error: boom" in report
+    assert "**Executed:** `click_at(x=1, y=2)`" in report
+    assert "![After Step 1](step_001_after.png)" in report
+    assert report.count("### Step") == 2, "Unlogged steps should be rendered once at finalize"
+    assert "- **Total Steps:** 2" in report
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -1,98 +1,79 @@
 #!/usr/bin/env python3
 """Test MCP server HITL integration."""
 
-import asyncio
+import logging
 
-from fastmcp import Client
+import pytest
 
 
-async def test_mcp_hitl():
+logger = logging.getLogger(__name__)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_mcp_hitl(mcp_client):
     """Test that MCP server has HITL enabled."""
-    print("Testing MCP server HITL integration...")
-
-    try:
-        async with Client("http://localhost:8001/mcp") as client:
-            print("✓ Connected to MCP server")
-
-            # Call the tool with a very simple, safe task
-            # This should complete without triggering HITL (no risky actions)
-            print("\n📋 Sending task to MCP server...")
-            print("   Task: Take a screenshot")
-            print("   Note: HITL enabled but won't trigger for safe actions\n")
-
-            result = await client.call_tool(
-                "execute_vnc_task",
-                {
-                    "hostname": "vnc-desktop",
-                    "task": "Take a screenshot and do nothing else. Just observe the desktop.",
-                    "step_limit": 5,
-                    "timeout": 30,
-                },
-            )
-
-            # Check result
-            if result.content:
-                content_text = result.content[0].text
-                print(f"\n📊 Result:\n{content_text}\n")
-
-                # Verify success
-                if "success" in content_text.lower():
-                    print("✅ MCP SERVER HITL TEST PASSED")
-                    print("  ✓ MCP server running with HITL enabled")
-                    print("  ✓ Task executed successfully")
-                    print("  ✓ No risky actions detected (no HITL trigger)")
-                    print("\n💡 HITL Mechanism:")
-                    print("  - Agent created with hitl_mode=True")
-                    print("  - Callback registered for ctx.elicit()")
-                    print("  - Will trigger when Gemini marks actions as require_confirmation")
-                    print("  - Safe actions proceed without approval")
-                else:
-                    print("⚠️  Task completed but may have encountered issues")
-                    print(f"   Response: {content_text}")
-            else:
-                print("✗ No content in response")
-
-    except Exception as e:
-        print(f"✗ Test failed: {e}")
-        import traceback
-
-        traceback.print_exc()
-        return False
-
-    return True
+    logger.info("Testing MCP server HITL integration...")
+    logger.info("✓ Connected to MCP server")
+
+    # Call the tool with a very simple, safe task
+    # This should complete without triggering HITL (no risky actions)
+    logger.info("📋 Sending task to MCP server...")
+    logger.info("   Task: Take a screenshot")
+    logger.info("   Note: HITL enabled but won't trigger for safe actions")
+
+    result = await mcp_client.call_tool(
+        "execute_vnc_task",
+        {
+            "hostname": "vnc-desktop",
+            "task": "Take a screenshot and do nothing else. Just observe the desktop.",
+            "step_limit": 5,
+            "timeout": 30,
+        },
+    )
+
+    # Check result
+    assert result.content, "No content in response"
+    content_text = result.content[0].text
+    logger.info("📊 Result:\n%s", content_text)
+
+    # Verify success
+    if "success" in content_text.lower():
+        logger.info("  ✓ MCP server running with HITL enabled")
+        logger.info("  ✓ Task executed successfully")
+        logger.info("  ✓ No risky actions detected (no HITL trigger)")
+        logger.info("💡 HITL Mechanism:")
+        logger.info("  - Agent created with hitl_mode=True")
+        logger.info("  - Callback registered for ctx.elicit()")
+        logger.info("  - Will trigger when Gemini marks actions as require_confirmation")
+        logger.info("  - Safe actions proceed without approval")
+    else:
+        logger.info("⚠️  Task completed but may have encountered issues")
+        logger.info("   Response: %s", content_text)
 
 
+@pytest.mark.asyncio(loop_scope="session")
 async def test_mcp_hitl_with_description():
     """Verify HITL is properly integrated by checking agent configuration."""
-    print("\n\n🔍 Verifying HITL Configuration...")
+    logger.info("🔍 Verifying HITL Configuration...")
 
     # The key verification is that:
     # 1. Agent is created with hitl_mode=True (in mcp_server.py:145)
     # 2. hitl_callback is set with ctx.elicit() integration (in mcp_server.py:95-137)
     # 3. Callback triggers on safety decisions requiring confirmation
 
-    print("\n✓ HITL Configuration (from code inspection):")
-    print("  1. mcp_server.py:145 - hitl_mode=True ✓")
-    print("  2. mcp_server.py:95-137 - hitl_callback with ctx.elicit() ✓")
-    print("  3. agent.py:327-341 - Callback invoked on require_confirmation ✓")
+    logger.info("✓ HITL Configuration (from code inspection):")
+    logger.info("  1. mcp_server.py:145 - hitl_mode=True ✓")
+    logger.info("  2. mcp_server.py:95-137 - hitl_callback with ctx.elicit() ✓")
+    logger.info("  3. agent.py:327-341 - Callback invoked on require_confirmation ✓")
 
-    print("\n📝 HITL Flow:")
-    print("  1. Gemini detects risky action")
-    print("  2. Returns safety_decision.action = 'require_confirmation'")
-    print("  3. Agent calls hitl_callback(safety_decision, pending_calls)")
-    print("  4. MCP server calls ctx.elicit() with approval prompt")
-    print("  5. User approves/declines/cancels via MCP client")
-    print("  6. Action proceeds only if approved")
-
-    print("\n✅ HITL INTEGRATION VERIFIED")
+    logger.info("📝 HITL Flow:")
+    logger.info("  1. Gemini detects risky action")
+    logger.info("  2. Returns safety_decision.action = 'require_confirmation'")
+    logger.info("  3. Agent calls hitl_callback(safety_decision, pending_calls)")
+    logger.info("  4. MCP server calls ctx.elicit() with approval prompt")
+    logger.info("  5. User approves/declines/cancels via MCP client")
+    logger.info("  6. Action proceeds only if approved")
 
 
 if __name__ == "__main__":
-    success = asyncio.run(test_mcp_hitl())
-    asyncio.run(test_mcp_hitl_with_description())
-
-    if success:
-        print("\n\n🎉 ALL MCP HITL TESTS PASSED")
-    else:
-        print("\n\n✗ MCP HITL TEST FAILED")
-        exit(1)
+    pytest.main([__file__, "-v", "--log-cli-level=INFO"])
@@ -1,14 +1,23 @@
 #!/usr/bin/env python3
 """Basic tests for multi-model support."""
 
-import os
+import asyncio
+import io
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
+from langchain_core.messages import AIMessage, AIMessageChunk
+from PIL import Image
 from vnc_use.agent import VncUseAgent
 from vnc_use.planners import AnthropicPlanner, GeminiPlanner
+from vnc_use.planners import anthropic
 from vnc_use.planners.base import BasePlanner
 
 
+GEMINI_KEYS = ("GOOGLE_API_KEY", "GEMINI_API_KEY")
+ANTHROPIC_KEYS = ("ANTHROPIC_API_KEY",)
+
+
 def test_gemini_planner_implements_base():
     """Test that GeminiPlanner implements BasePlanner interface."""
     assert issubclass(GeminiPlanner, BasePlanner)
@@ -19,46 +28,26 @@ def test_anthropic_planner_implements_base():
     assert issubclass(AnthropicPlanner, BasePlanner)
 
 
-def test_agent_default_model_provider():
-    """Test that agent defaults to Gemini when no provider specified."""
-    # Skip if no API keys available
-    if not os.getenv("GOOGLE_API_KEY") and not os.getenv("GEMINI_API_KEY"):
-        pytest.skip("No Gemini API key available")
-
-    agent = VncUseAgent(
-        vnc_server="localhost::5901",
-        vnc_password="test",
-    )
-
-    assert isinstance(agent.planner, GeminiPlanner)
-
-
-def test_agent_gemini_provider():
-    """Test that agent creates GeminiPlanner when provider='gemini'."""
-    if not os.getenv("GOOGLE_API_KEY") and not os.getenv("GEMINI_API_KEY"):
-        pytest.skip("No Gemini API key available")
-
-    agent = VncUseAgent(
-        vnc_server="localhost::5901",
-        vnc_password="test",
-        model_provider="gemini",
-    )
-
-    assert isinstance(agent.planner, GeminiPlanner)
-
-
-def test_agent_anthropic_provider():
-    """Test that agent creates AnthropicPlanner when provider='anthropic'."""
-    if not os.getenv("ANTHROPIC_API_KEY"):
-        pytest.skip("No Anthropic API key available")
+@pytest.mark.parametrize(
+    ("provider", "planner_cls"),
+    [
+        pytest.param(None, GeminiPlanner, id="default"),
+        pytest.param("gemini", GeminiPlanner, id="gemini"),
+        pytest.param("anthropic", AnthropicPlanner, id="anthropic"),
+    ],
+)
+def test_agent_model_provider(provider, planner_cls):
+    """Test that the agent creates the planner for the requested provider (Gemini by default)."""
+    kwargs = {"model_provider": provider} if provider else {}
 
     agent = VncUseAgent(
         vnc_server="localhost::5901",
         vnc_password="test",
-        model_provider="anthropic",
+        api_key="fake_key_for_testing",
+        **kwargs,
     )
 
-    assert isinstance(agent.planner, AnthropicPlanner)
+    assert isinstance(agent.planner, planner_cls)
 
 
 def test_agent_invalid_provider():
@@ -71,27 +60,193 @@ def test_agent_invalid_provider():
         )
 
 
-def test_anthropic_planner_initialization():
-    """Test that AnthropicPlanner can be initialized."""
-    if not os.getenv("ANTHROPIC_API_KEY"):
-        pytest.skip("No Anthropic API key available")
+@pytest.mark.parametrize(
+    ("planner_cls", "env_keys", "attributes"),
+    [
+        pytest.param(AnthropicPlanner, ANTHROPIC_KEYS, ("llm", "llm_with_tools"), id="anthropic"),
+        pytest.param(GeminiPlanner, GEMINI_KEYS, ("client",), id="gemini"),
+    ],
+)
+def test_planner_initialization(monkeypatch, planner_cls, env_keys, attributes):
+    """Test that each planner can be initialized from its environment API key."""
+    for key in env_keys:
+        monkeypatch.delenv(key, raising=False)
+    monkeypatch.setenv(env_keys[0], "fake_key_for_testing")
 
-    planner = AnthropicPlanner(excluded_actions=["drag_and_drop"])
+    planner = planner_cls(excluded_actions=["drag_and_drop"])
 
     assert planner is not None
-    assert hasattr(planner, "llm")
-    assert hasattr(planner, "llm_with_tools")
+    for attribute in attributes:
+        assert hasattr(planner, attribute)
+
+
+def test_anthropic_prompt_caching():
+    """Test that the static system prompt and tool schemas carry cache_control."""
+    planner = AnthropicPlanner(api_key="fake_key_for_testing")
+    bound = planner.llm_with_tools
+    planner.llm_with_tools = MagicMock()
+    planner.llm_with_tools.invoke.return_value = AIMessage(content="")
+    buf = io.BytesIO()
+    Image.new("RGB", (100, 50)).save(buf, format="PNG")
+
+    planner.generate_stateless("Open a terminal", ["Executed click_at(x=1, y=2)"], buf.getvalue())
+
+    messages = planner.llm_with_tools.invoke.call_args.args[0]
+    payload = planner.llm._get_request_payload(messages, **bound.kwargs)
+    static, dynamic = payload["system"]
+    assert static["cache_control"] == {"type": "ephemeral"}
+    assert "Open a terminal" not in static["text"], "Task must stay out of the cached prefix"
+    assert "cache_control" not in dynamic
+    assert "1. Executed click_at(x=1, y=2)" in dynamic["text"]
+    assert payload["tools"][-1]["cache_control"] == {"type": "ephemeral"}
+    assert payload["messages"][0]["content"][1]["source"]["type"] == "base64"
+
+
+def test_anthropic_tool_definitions_cached():
+    """Test that tool schemas are generated once and shared across planners."""
+    anthropic._tool_definition.cache_clear()
+
+    with patch.object(
+        anthropic, "convert_to_anthropic_tool", wraps=anthropic.convert_to_anthropic_tool
+    ) as convert:
+        AnthropicPlanner(api_key="fake_key_for_testing")
+        count = convert.call_count
+        second = AnthropicPlanner(api_key="fake_key_for_testing", excluded_actions=["hover_at"])
+        assert convert.call_count == count, "Schemas should only be generated once"
+
+    tools = second.llm_with_tools.kwargs["tools"]
+    assert tools[-1]["cache_control"] == {"type": "ephemeral"}
+    shared = [anthropic._tool_definition(name) for name in anthropic.VNC_TOOL_SCHEMAS]
+    assert all("cache_control" not in tool for tool in shared), "Cache must not be modified"
+
+
+def test_anthropic_stream_function_calls():
+    """Test that streamed tool calls are yielded as soon as they are complete."""
+    planner = AnthropicPlanner(api_key="fake_key_for_testing")
+    consumed = []
+
+    def stream(messages):
+        for chunk in [
+            AIMessageChunk(
+                content="",
+                tool_call_chunks=[{"name": "click_at", "args": '{"x": 1', "id": "a", "index": 1}],
+            ),
+            AIMessageChunk(
+                content="",
+                tool_call_chunks=[{"name": None, "args": ', "y": 2}', "id": None, "index": 1}],
+            ),
+            AIMessageChunk(
+                content="",
+                tool_call_chunks=[{"name": "wait_5_seconds", "args": "", "id": "b", "index": 2}],
+            ),
+            AIMessageChunk(content="", response_metadata={"stop_reason": "tool_use"}),
+        ]:
+            consumed.append(chunk)
+            yield chunk
+
+    planner.llm_with_tools = MagicMock()
+    planner.llm_with_tools.stream.side_effect = stream
+    buf = io.BytesIO()
+    Image.new("RGB", (100, 50)).save(buf, format="PNG")
+
+    calls = planner.stream_function_calls("Open a terminal", [], buf.getvalue())
+
+    assert next(calls) == {"name": "click_at", "args": {"x": 1, "y": 2}}
+    assert len(consumed) == 3, "First call should be yielded before the stream ends"
+    assert list(calls) == [{"name": "wait_5_seconds", "args": {}}]
+
+
+def test_anthropic_refusal_detection():
+    """Test that refusals are detected case-insensitively only without tool calls."""
+    planner = AnthropicPlanner(api_key="fake_key_for_testing")
+
+    refusal = AIMessage(content="Sorry, I CAN'T help with deleting system files.")
+    decision = planner.extract_safety_decision(refusal)
+    assert decision["action"] == "block"
+    assert decision["reason"].startswith("Model refused: Sorry")
+
+    assert planner.extract_safety_decision(AIMessage(content="Opening the terminal now.")) is None
+    with_call = AIMessage(
+        content="This looks dangerous, clicking cancel.",
+        tool_calls=[{"name": "click_at", "args": {"x": 1, "y": 2}, "id": "a"}],
+    )
+    assert planner.extract_safety_decision(with_call) is None
 
 
-def test_gemini_planner_initialization():
-    """Test that GeminiPlanner can be initialized."""
-    if not os.getenv("GOOGLE_API_KEY") and not os.getenv("GEMINI_API_KEY"):
-        pytest.skip("No Gemini API key available")
+def test_planner_history_sent_as_given():
+    """Test that planners send the caller's (already windowed) history without re-slicing."""
+    buf = io.BytesIO()
+    Image.new("RGB", (100, 50)).save(buf, format="PNG")
+    history = [f"Executed wait_5_seconds #{i}" for i in range(1, 26)]
 
-    planner = GeminiPlanner(excluded_actions=["drag_and_drop"])
+    messages = AnthropicPlanner(api_key="fake_key_for_testing")._build_messages(
+        "Wait", history, buf.getvalue()
+    )
+    task_context = messages[0].content[1]["text"]
+    assert task_context.count("Executed") == 25
+    assert task_context.endswith("25. Executed wait_5_seconds #25")
 
-    assert planner is not None
-    assert hasattr(planner, "client")
+    contents = GeminiPlanner(api_key="fake_key_for_testing")._stateless_contents(
+        "Wait", history, buf.getvalue()
+    )
+    assert contents[0].parts[0].text.count("Executed") == 25
+
+
+def test_generate_stateless_batch():
+    """Test that both planners batch requests and keep job order."""
+    buf = io.BytesIO()
+    Image.new("RGB", (100, 50)).save(buf, format="PNG")
+    jobs = [("Task A", [], buf.getvalue()), ("Task B", ["Executed wait_5_seconds"], buf.getvalue())]
+
+    anthropic = AnthropicPlanner(api_key="fake_key_for_testing")
+    anthropic.llm_with_tools = MagicMock()
+    anthropic.llm_with_tools.batch.side_effect = lambda messages_list, config: [
+        AIMessage(content=messages[0].content[1]["text"]) for messages in messages_list
+    ]
+    responses = anthropic.generate_stateless_batch(jobs)
+    assert [response.content for response in responses] == [
+        "Current task: Task A",
+        "Current task: Task B\n\nActions taken so far:\n1. Executed wait_5_seconds",
+    ]
+    assert anthropic.llm_with_tools.batch.call_args.kwargs["config"]["max_concurrency"] == 10
+
+    gemini = GeminiPlanner(api_key="fake_key_for_testing")
+    gemini.client = MagicMock()
+    gemini.client.models.generate_content.side_effect = lambda model, contents, config: contents
+    responses = gemini.generate_stateless_batch(jobs)
+    assert [contents[0].parts[0].text.splitlines()[0] for contents in responses] == [
+        "Task: Task A",
+        "Task: Task B",
+    ]
+    assert gemini.generate_stateless_batch([]) == []
+
+
+def test_agenerate_stateless():
+    """Test the async planner entry points with mocked clients."""
+    buf = io.BytesIO()
+    Image.new("RGB", (100, 50)).save(buf, format="PNG")
+
+    anthropic_planner = AnthropicPlanner(api_key="fake_key_for_testing")
+    anthropic_planner.llm_with_tools = MagicMock()
+    anthropic_planner.llm_with_tools.ainvoke = AsyncMock(return_value=AIMessage(content="ok"))
+    response = asyncio.run(anthropic_planner.agenerate_stateless("Task", [], buf.getvalue()))
+    assert response.content == "ok"
+    anthropic_planner.llm_with_tools.invoke.assert_not_called()
+
+    gemini = GeminiPlanner(api_key="fake_key_for_testing")
+    gemini.client = MagicMock()
+    gemini.client.aio.models.generate_content = AsyncMock(return_value="response")
+    assert asyncio.run(gemini.agenerate_stateless("Task", [], buf.getvalue())) == "response"
+    sent = gemini.client.aio.models.generate_content.call_args.kwargs["contents"]
+    assert sent[0].parts[0].text.startswith("Task: Task")
+
+    class SyncPlanner(BasePlanner):
+        def generate_stateless(self, task, action_history, screenshot_png):
+            return task
+
+        extract_text = extract_function_calls = extract_safety_decision = MagicMock()
+
+    assert asyncio.run(SyncPlanner().agenerate_stateless("Sync", [], b"")) == "Sync"
 
 
 if __name__ == "__main__":
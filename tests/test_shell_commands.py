@@ -6,48 +6,75 @@ shell commands to retrieve system information.
 
 Usage:
     docker-compose up -d
-    GEMINI_API_KEY=your_key python tests/test_shell_commands.py
+    GEMINI_API_KEY=your_key python tests/test_shell_commands.py [--test df|free|all]
+
+The tests are independent, so with a second VNC desktop published on port
+5902 they can run concurrently under pytest-xdist; each worker drives its
+own display (gw0 -> localhost::5901, gw1 -> localhost::5902):
+
+    GEMINI_API_KEY=your_key pytest -n 2 -s tests/test_shell_commands.py
 """
 
+import argparse
 import logging
 import os
+import socket
 import sys
 
+import pytest
 from src.vnc_use import VncUseAgent
 
 
-def test_df_memory_check():
-    """Test opening terminal, running 'df -h' to check disk space."""
-    print("\n" + "=" * 70)
-    print("Testing: Shell Command - Check Free Memory with 'df -h'")
-    print("=" * 70)
+def worker_vnc_server() -> str:
+    """VNC server for this test process; each pytest-xdist worker gets its own display."""
+    worker = os.getenv("PYTEST_XDIST_WORKER", "gw0")
+    return f"localhost::{5901 + int(worker.removeprefix('gw'))}"
 
-    # Check prerequisites
-    api_key = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        print("✗ Error: GEMINI_API_KEY or GOOGLE_API_KEY not set")
-        return False
 
-    print("\n✓ API key found")
-    print("✓ Make sure docker-compose is running (docker-compose up -d)")
+@pytest.fixture(scope="module")
+def vnc_server() -> str:
+    """This worker's VNC server; skips the tests when nothing is listening on it."""
+    server = worker_vnc_server()
+    host, port = server.split("::")
+    try:
+        socket.create_connection((host, int(port)), timeout=0.2).close()
+    except OSError:
+        pytest.skip(f"VNC server {server} not reachable (is docker-compose running?)")
+    return server
 
-    # Setup logging
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(levelname)s: %(message)s",
-    )
 
-    print("\n1. Initializing agent...")
-    agent = VncUseAgent(
-        vnc_server="localhost::5901",
+@pytest.fixture(scope="module")
+def agent(require_gemini_key, vnc_server) -> VncUseAgent:
+    """Agent shared by the shell command tests (make sure docker-compose is running)."""
+    return VncUseAgent(
+        vnc_server=vnc_server,
         vnc_password="vncpassword",
         step_limit=30,  # Allow enough steps to open terminal and run command
         seconds_timeout=300,  # 5 minutes
         hitl_mode=False,  # No human intervention
+        api_key=require_gemini_key,
     )
-    print("   ✓ Agent initialized")
 
-    print("\n2. Running shell command task...")
+
+def run_task(agent: VncUseAgent, task: str) -> dict:
+    """Run a task, printing each step as soon as the agent reaches it."""
+    step = 0
+    for update in agent.run_iter(task):
+        if "success" in update:
+            return update
+        if update["step"] > step:
+            step = update["step"]
+            print(f"   ✓ step {step}")
+    raise AssertionError("run_iter ended without a result")
+
+
+def test_df_memory_check(agent):
+    """Test opening terminal, running 'df -h' to check disk space."""
+    print("\n" + "=" * 70)
+    print("Testing: Shell Command - Check Free Memory with 'df -h'")
+    print("=" * 70)
+
+    print("\n1. Running shell command task...")
     print("   Task: Open terminal and check disk space using 'df -h'")
 
     # Create detailed task instructions
@@ -57,77 +84,38 @@ Wait for the command output to appear.
 Read and report the disk space information shown by the df command.
 Focus on the filesystem mounted at '/' (root) and report its size, used space, available space, and usage percentage."""
 
-    try:
-        result = agent.run(task)
-
-        print("\n3. Results:")
-        print(f"   Success: {result.get('success')}")
-        print(f"   Steps completed: {result.get('final_state', {}).get('step', 0)}")
-        print(f"   Run directory: {result.get('run_dir')}")
-
-        if result.get("error"):
-            print(f"   Error: {result.get('error')}")
-
-        # Check if we got far enough
-        final_state = result.get("final_state", {})
-        steps = final_state.get("step", 0)
-
-        if result.get("success") and steps >= 5:
-            print("\n✓ Test completed!")
-            print(f"  The agent executed {steps} steps.")
-            print(f"  Check the run artifacts for screenshots: {result.get('run_dir')}")
-            print("  Look at the EXECUTION_REPORT.md for the df command output")
-            print("\nNote: The agent should have:")
-            print("  - Opened a terminal application")
-            print("  - Typed and executed 'df -h'")
-            print("  - Read the disk space information from the output")
-            return True
-        print("\n⚠ Test incomplete")
-        print(f"  Only {steps} steps completed (expected at least 5)")
-        if result.get("error"):
-            print(f"  Error: {result.get('error')}")
-        return False
-
-    except Exception as e:
-        print(f"\n✗ Test failed with exception: {e}")
-        import traceback
-
-        traceback.print_exc()
-        return False
-
-
-def test_free_memory_check():
-    """Test running 'free -h' to check memory usage."""
-    print("\n" + "=" * 70)
-    print("Testing: Shell Command - Check Memory Usage with 'free -h'")
-    print("=" * 70)
+    result = run_task(agent, task)
 
-    # Check prerequisites
-    api_key = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        print("✗ Error: GEMINI_API_KEY or GOOGLE_API_KEY not set")
-        return False
+    print("\n2. Results:")
+    print(f"   Success: {result.get('success')}")
+    print(f"   Steps completed: {result.get('final_state', {}).get('step', 0)}")
+    print(f"   Run directory: {result.get('run_dir')}")
 
-    print("\n✓ API key found")
-    print("✓ Make sure docker-compose is running (docker-compose up -d)")
+    if result.get("error"):
+        print(f"   Error: {result.get('error')}")
 
-    # Setup logging
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(levelname)s: %(message)s",
-    )
+    # Check if we got far enough
+    steps = result.get("final_state", {}).get("step", 0)
+    assert result.get("success"), f"Task failed: {result.get('error')}"
+    assert steps >= 5, f"Only {steps} steps completed (expected at least 5)"
 
-    print("\n1. Initializing agent...")
-    agent = VncUseAgent(
-        vnc_server="localhost::5901",
-        vnc_password="vncpassword",
-        step_limit=30,  # Allow enough steps to open terminal and run command
-        seconds_timeout=300,  # 5 minutes
-        hitl_mode=False,  # No human intervention
-    )
-    print("   ✓ Agent initialized")
+    print("\n✓ Test completed!")
+    print(f"  The agent executed {steps} steps.")
+    print(f"  Check the run artifacts for screenshots: {result.get('run_dir')}")
+    print("  Look at the EXECUTION_REPORT.md for the df command output")
+    print("\nNote: The agent should have:")
+    print("  - Opened a terminal application")
+    print("  - Typed and executed 'df -h'")
+    print("  - Read the disk space information from the output")
+
+
+def test_free_memory_check(agent):
+    """Test running 'free -h' to check memory usage."""
+    print("\n" + "=" * 70)
+    print("Testing: Shell Command - Check Memory Usage with 'free -h'")
+    print("=" * 70)
 
-    print("\n2. Running shell command task...")
+    print("\n1. Running shell command task...")
     print("   Task: Open terminal and check memory usage with 'free -h'")
 
     # Create detailed task instructions
@@ -136,48 +124,32 @@ Once the terminal is open, type the command 'free -h' and press Enter to execute
 Wait for the command output to appear.
 Read and report the memory usage information, including total memory, used memory, free memory, and available memory."""
 
-    try:
-        result = agent.run(task)
-
-        print("\n3. Results:")
-        print(f"   Success: {result.get('success')}")
-        print(f"   Steps completed: {result.get('final_state', {}).get('step', 0)}")
-        print(f"   Run directory: {result.get('run_dir')}")
-
-        if result.get("error"):
-            print(f"   Error: {result.get('error')}")
-
-        # Check if we got far enough
-        final_state = result.get("final_state", {})
-        steps = final_state.get("step", 0)
-
-        if result.get("success") and steps >= 5:
-            print("\n✓ Test completed!")
-            print(f"  The agent executed {steps} steps.")
-            print(f"  Check the run artifacts for screenshots: {result.get('run_dir')}")
-            print("  Look at the EXECUTION_REPORT.md for the free command output")
-            print("\nNote: The agent should have:")
-            print("  - Opened a terminal application")
-            print("  - Typed and executed 'free -h'")
-            print("  - Read the memory usage information from the output")
-            return True
-        print("\n⚠ Test incomplete")
-        print(f"  Only {steps} steps completed (expected at least 5)")
-        if result.get("error"):
-            print(f"  Error: {result.get('error')}")
-        return False
-
-    except Exception as e:
-        print(f"\n✗ Test failed with exception: {e}")
-        import traceback
-
-        traceback.print_exc()
-        return False
+    result = run_task(agent, task)
 
+    print("\n2. Results:")
+    print(f"   Success: {result.get('success')}")
+    print(f"   Steps completed: {result.get('final_state', {}).get('step', 0)}")
+    print(f"   Run directory: {result.get('run_dir')}")
 
-def main():
-    import argparse
+    if result.get("error"):
+        print(f"   Error: {result.get('error')}")
+
+    # Check if we got far enough
+    steps = result.get("final_state", {}).get("step", 0)
+    assert result.get("success"), f"Task failed: {result.get('error')}"
+    assert steps >= 5, f"Only {steps} steps completed (expected at least 5)"
 
+    print("\n✓ Test completed!")
+    print(f"  The agent executed {steps} steps.")
+    print(f"  Check the run artifacts for screenshots: {result.get('run_dir')}")
+    print("  Look at the EXECUTION_REPORT.md for the free command output")
+    print("\nNote: The agent should have:")
+    print("  - Opened a terminal application")
+    print("  - Typed and executed 'free -h'")
+    print("  - Read the memory usage information from the output")
+
+
+def main():
     parser = argparse.ArgumentParser(description="Shell command integration tests")
     parser.add_argument(
         "--test",
@@ -188,66 +160,20 @@ def main():
 
     args = parser.parse_args()
 
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(levelname)s: %(message)s",
+    )
+
     print("=" * 70)
     print("Shell Command Integration Tests for VNC Computer Use Agent")
     print("=" * 70)
+    print("\nNote: The agent uses Computer Use to visually interact")
+    print("with the terminal and read command output.")
+    print("=" * 70)
 
-    if args.test == "df":
-        print("\nThis test will:")
-        print("  1. Open a terminal in the VNC desktop")
-        print("  2. Type and execute 'df -h' command")
-        print("  3. Read and report disk space information")
-        print("\nNote: The agent uses Computer Use to visually interact")
-        print("with the terminal and read command output.")
-        print("=" * 70)
-
-        success = test_df_memory_check()
-
-        print("\n" + "=" * 70)
-        if success:
-            print("Test completed - check run artifacts for results")
-        else:
-            print("Test incomplete - see error messages above")
-        print("=" * 70)
-
-        sys.exit(0 if success else 1)
-
-    elif args.test == "free":
-        print("\nThis test will:")
-        print("  1. Open a terminal in the VNC desktop")
-        print("  2. Type and execute 'free -h' command")
-        print("  3. Read and report memory usage information")
-        print("\nNote: The agent uses Computer Use to visually interact")
-        print("with the terminal and read command output.")
-        print("=" * 70)
-
-        success = test_free_memory_check()
-
-        print("\n" + "=" * 70)
-        if success:
-            print("Test completed - check run artifacts for results")
-        else:
-            print("Test incomplete - see error messages above")
-        print("=" * 70)
-
-        sys.exit(0 if success else 1)
-
-    elif args.test == "all":
-        print("\nThis will run both shell command tests:")
-        print("  1. df -h (disk space)")
-        print("  2. free -h (memory usage)")
-        print("=" * 70)
-
-        success1 = test_df_memory_check()
-        success2 = test_free_memory_check()
-
-        print("\n" + "=" * 70)
-        print("Summary:")
-        print(f"  df -h test: {'✓ PASS' if success1 else '✗ FAIL'}")
-        print(f"  free -h test: {'✓ PASS' if success2 else '✗ FAIL'}")
-        print("=" * 70)
-
-        sys.exit(0 if (success1 and success2) else 1)
+    selected = {"df": ["-k", "df_memory"], "free": ["-k", "free_memory"], "all": []}[args.test]
+    sys.exit(pytest.main([__file__, "-v", "-s", *selected]))
 
 
 if __name__ == "__main__":
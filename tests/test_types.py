@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Tests for typed action arguments."""
+
+import pytest
+from vnc_use.types import (
+    ClickAction,
+    DragAndDropAction,
+    KeyCombinationAction,
+    ScrollAtAction,
+    ScrollDocumentAction,
+)
+
+
+@pytest.mark.parametrize("value", [0, 999])
+def test_coordinate_bounds_inclusive(value):
+    """Test that both ends of the 0-999 grid are accepted."""
+    assert ClickAction(x=value, y=value).x == value
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        pytest.param({"x": -1, "y": 0}, id="negative"),
+        pytest.param({"x": 0, "y": 1000}, id="above-grid"),
+        pytest.param({"x": "5", "y": 0}, id="string"),
+        pytest.param({"x": 5.0, "y": 0}, id="float"),
+    ],
+)
+def test_coordinates_rejected(kwargs):
+    """Test that direct construction rejects out-of-range and non-int coordinates."""
+    with pytest.raises(ValueError, match="must be an int between 0 and 999"):
+        ClickAction(**kwargs)
+
+
+def test_destination_coordinates_checked():
+    """Test that drag destinations are checked like the start point."""
+    with pytest.raises(ValueError, match="destination_y"):
+        DragAndDropAction(x=0, y=0, destination_x=10, destination_y=1000)
+
+
+def test_scroll_direction_checked():
+    """Test that scroll actions only accept the four directions."""
+    assert ScrollDocumentAction(direction="left").magnitude == 800
+    with pytest.raises(ValueError, match="direction must be one of"):
+        ScrollDocumentAction(direction="sideways")
+    with pytest.raises(ValueError, match="direction must be one of"):
+        ScrollAtAction(x=1, y=2, direction="UP")
+
+
+def test_from_args_coerces_integral_values():
+    """Test that from_args converts integral strings and floats for int fields."""
+    action = ScrollAtAction.from_args({"x": "5", "y": 7.0, "direction": "down", "magnitude": "400"})
+
+    assert action == ScrollAtAction(x=5, y=7, direction="down", magnitude=400)
+    assert KeyCombinationAction.from_args({"keys": "control+a"}).keys == "control+a"
+
+
+@pytest.mark.parametrize(
+    ("args", "error"),
+    [
+        pytest.param({"x": 5.5, "y": 0}, ValueError, id="fractional"),
+        pytest.param({"x": "five", "y": 0}, ValueError, id="non-numeric"),
+        pytest.param({"x": "1000", "y": 0}, ValueError, id="out-of-range"),
+        pytest.param({"x": 5}, TypeError, id="missing"),
+        pytest.param({"x": 5, "y": 0, "z": 1}, TypeError, id="unknown"),
+    ],
+)
+def test_from_args_rejects_invalid(args, error):
+    """Test that from_args raises for values it cannot convert or check."""
+    with pytest.raises(error):
+        ClickAction.from_args(args)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -3,6 +3,7 @@
 
 Usage:
     python test_vnc_backend.py --vnc localhost::5901 [--password PASSWORD]
+    TEST_VNC_SERVER=localhost::5901 pytest tests/test_vnc_backend.py
 
 Tests:
 1. Connection and screenshot capture
@@ -13,127 +14,465 @@ Tests:
 """
 
 import argparse
+import io
+import logging
+import logging.handlers
+import os
 import sys
+import threading
 from pathlib import Path
+from unittest.mock import MagicMock, patch
 
-from src.vnc_use.backends.vnc import VNCController, denorm_x, denorm_y
+import pytest
+from PIL import Image
+from twisted.internet.task import Clock
+from vncdotool.client import VNCDoToolClient
 
+from src.vnc_use.backends.vnc import (
+    FULL_REFRESH_INTERVAL,
+    INCREMENTAL_UPDATE_TIMEOUT,
+    BatchingVNCClient,
+    BatchingVNCFactory,
+    VNCController,
+    denorm_x,
+    denorm_y,
+)
 
-def test_denormalization():
+
+logger = logging.getLogger(__name__)
+
+
+# Corners and center of a 1440x900 screen with their expected pixels
+# (999 maps to width-1/height-1 due to the 0-999 range)
+DENORMALIZATION_CASES = [
+    pytest.param(0, 0, 0, 0, id="top-left"),
+    pytest.param(999, 0, 1439, 0, id="top-right"),
+    pytest.param(0, 999, 0, 899, id="bottom-left"),
+    pytest.param(999, 999, 1439, 899, id="bottom-right"),
+    pytest.param(500, 500, 720, 450, id="center"),
+]
+
+
+@pytest.mark.parametrize(("norm_x", "norm_y", "expected_x", "expected_y"), DENORMALIZATION_CASES)
+def test_denormalization(norm_x, norm_y, expected_x, expected_y):
     """Test coordinate conversion from 0-999 to pixels."""
-    print("\n=== Testing Coordinate Denormalization ===")
+    assert (denorm_x(norm_x, 1440), denorm_y(norm_y, 900)) == (expected_x, expected_y)
 
-    # Test with 1440x900 screen
-    width, height = 1440, 900
-
-    # Test corners and center
-    test_cases = [
-        (0, 0, "top-left"),
-        (999, 0, "top-right"),
-        (0, 999, "bottom-left"),
-        (999, 999, "bottom-right"),
-        (500, 500, "center"),
-    ]
-
-    for norm_x, norm_y, desc in test_cases:
-        px = denorm_x(norm_x, width)
-        py = denorm_y(norm_y, height)
-        print(f"  {desc:12} ({norm_x:3}, {norm_y:3}) -> ({px:4}, {py:3})")
-
-    # Verify specific expectations (999 maps to width-1 due to 0-999 range)
-    assert denorm_x(0, width) == 0, "Left edge should be 0"
-    assert denorm_x(999, width) == 1439, "Right edge should be width-1"
-    assert denorm_x(500, width) == 720, "Center x should be ~half width"
-    assert denorm_y(0, height) == 0, "Top edge should be 0"
-    assert denorm_y(999, height) == 899, "Bottom edge should be height-1"
-    assert denorm_y(500, height) == 450, "Center y should be ~half height"
 
-    print("  ✓ All denormalization tests passed")
+def make_controller(screen: Image.Image | None = None) -> VNCController:
+    """Create a controller whose mocked client snapshots ``client.screen`` on capture."""
+    controller = VNCController()
+    controller.client = MagicMock()
+    controller.client.screen = screen
+    controller.client.snapshotScreen.side_effect = lambda incremental, timeout: (
+        controller.client.screen.copy()
+    )
+    return controller
+
+
+def test_screenshot_from_framebuffer():
+    """Test that screenshots are encoded from the in-memory framebuffer."""
+    print("\n=== Testing Framebuffer Screenshot ===")
+
+    controller = make_controller(Image.new("RGB", (320, 200), color="blue"))
+
+    screenshot = controller.screenshot_png()
+
+    controller.client.snapshotScreen.assert_called_once_with(False, INCREMENTAL_UPDATE_TIMEOUT)
+    assert Image.open(io.BytesIO(screenshot)).size == (320, 200), "PNG should match framebuffer"
+    assert controller.get_screen_size() == (320, 200), "Screen size should be cached"
+
+    print(f"  ✓ Screenshot encoded from framebuffer: {len(screenshot)} bytes")
+
+
+def test_incremental_screenshots():
+    """Test that only the first and every Nth screenshot request a full frame."""
+    print("\n=== Testing Incremental Screenshots ===")
+
+    controller = make_controller(Image.new("RGB", (320, 200)))
+
+    def incremental_flags() -> list[bool]:
+        return [call.args[0] for call in controller.client.snapshotScreen.call_args_list]
+
+    for _ in range(FULL_REFRESH_INTERVAL + 1):
+        controller.screenshot_png()
+    assert incremental_flags() == [False] + [True] * FULL_REFRESH_INTERVAL, (
+        "Only first capture should be full"
+    )
+
+    controller.screenshot_png()
+    assert incremental_flags()[-1] is False, "Interval should force full capture"
+    controller.screenshot_png(full_refresh=True)
+    assert incremental_flags()[-1] is False, "full_refresh should force capture"
+
+    # A static screen never answers an incremental request; the refresh must expire
+    protocol = BatchingVNCClient()
+    protocol.factory = BatchingVNCFactory()
+    protocol.framebufferUpdateRequest = MagicMock()
+    clock = Clock()
+    with (
+        patch("src.vnc_use.backends.vnc.reactor", clock),
+        patch("src.vnc_use.backends.vnc.logger") as log,
+    ):
+        done = []
+        protocol.refreshScreenIncremental(0.25).addCallback(done.append)
+        protocol.framebufferUpdateRequest.assert_called_once_with(incremental=True)
+        assert not done, "Refresh should wait for an update"
+        clock.advance(0.25)
+    assert done == [protocol], "Refresh should complete after the timeout"
+    assert protocol.deferred is None
+    log.info.assert_called_once()  # Possibly stale captures are visible in the log
+
+    print("  ✓ Incremental updates used between full captures")
+
+
+def test_capture_snapshots_framebuffer():
+    """Test that captures copy the framebuffer when the refresh completes."""
+    print("\n=== Testing Framebuffer Snapshot ===")
+
+    protocol = BatchingVNCClient()
+    protocol.factory = BatchingVNCFactory()
+    protocol.framebufferUpdateRequest = MagicMock()
+    protocol.screen = Image.new("RGB", (320, 200), color="blue")
+
+    snapshots = []
+    protocol.snapshotScreen(False, 0.25).addCallback(snapshots.append)
+    assert not snapshots, "Capture should wait for the update"
+    protocol.commitUpdate(rectangles=[object()])
+
+    (snapshot,) = snapshots
+    assert snapshot is not protocol.screen, "Capture should be a copy"
+    protocol.screen.putpixel((0, 0), (255, 0, 0))
+    assert snapshot.getpixel((0, 0)) == (0, 0, 255), "Later pastes should not reach the copy"
+
+    assert BatchingVNCClient.captureScreen is VNCDoToolClient.captureScreen, (
+        "vncdotool's captureScreen(fp, ...) must stay intact"
+    )
+
+    print("  ✓ Framebuffer snapshot taken when the refresh completes")
+
+
+def test_unchanged_screenshot_not_reencoded():
+    """Test that an unchanged framebuffer reuses the previous PNG."""
+    print("\n=== Testing Unchanged Screenshot Cache ===")
+
+    controller = make_controller(Image.new("RGB", (320, 200), color="blue"))
+
+    first = controller.screenshot_png()
+    assert controller.screenshot_png() is first, "Unchanged frame should not be re-encoded"
+
+    controller.client.screen.putpixel((10, 10), (255, 0, 0))
+    changed = controller.screenshot_png()
+    assert changed != first, "Changed frame should be encoded again"
+    assert Image.open(io.BytesIO(changed)).getpixel((10, 10)) == (255, 0, 0)
+
+    print("  ✓ Unchanged framebuffer answered from cached PNG")
+
+
+def test_error_screenshot():
+    """Test that error screenshots never raise."""
+    print("\n=== Testing Error Screenshot ===")
+
+    controller = VNCController()
+    assert controller.error_screenshot_png() == b"", "Disconnected controller has no screenshot"
+
+    controller.client = MagicMock()
+    controller.client.snapshotScreen.side_effect = TimeoutError("VNC server gone")
+    assert controller.error_screenshot_png() == b"", "Capture failures should be swallowed"
+
+    result = controller.execute_action("hover_at", {"x": 1, "y": 2})
+    assert not result.success and result.screenshot_png == b"", "Should report failure"
+
+    print("  ✓ Error screenshots degrade to empty bytes")
+
+
+def test_refresh_size():
+    """Test that screen size is read from the framebuffer geometry."""
+    print("\n=== Testing Screen Size Refresh ===")
+
+    controller = VNCController()
+    controller.client = MagicMock()
+    controller.client.protocol.screen = None
+    controller.client.protocol.width = 1440
+    controller.client.protocol.height = 900
+
+    assert controller.refresh_size() == (1440, 900), "Size should come from server init"
+
+    controller.client.protocol.screen = Image.new("RGB", (1920, 1080))
+    assert controller.refresh_size() == (1920, 1080), "Size should track resized framebuffer"
+    assert controller.get_screen_size() == (1920, 1080), "Refreshed size should be cached"
+
+    print("  ✓ Screen size refreshed from framebuffer")
+
+
+def test_batched_typing():
+    """Test that typing a string emits all key events in one client call."""
+    print("\n=== Testing Batched Typing ===")
+
+    protocol = BatchingVNCClient()
+    protocol.factory = BatchingVNCFactory()
+    protocol.keyEvent = MagicMock()
+
+    protocol.typeText("ab")
+
+    events = [call.args[0] for call in protocol.keyEvent.call_args_list]
+    assert events == [ord("a"), ord("a"), ord("b"), ord("b")], "Should press and release each key"
+
+    controller = VNCController()
+    controller.client = MagicMock()
+    controller.type_text("hello", press_enter=True)
+    controller.client.typeText.assert_called_once_with("hello")
+    controller.client.keyPress.assert_called_once_with("enter")
+
+    print("  ✓ Text typed in a single batched call")
+
+
+def test_batched_scroll():
+    """Test that scroll key repeats are sent in one client call."""
+    print("\n=== Testing Batched Scroll ===")
+
+    protocol = BatchingVNCClient()
+    protocol.factory = BatchingVNCFactory()
+    protocol.keyPress = MagicMock()
+
+    protocol.repeatKeyPress("pgdn", 3)
+    assert protocol.keyPress.call_count == 3, "Should press the key three times"
+
+    controller = VNCController()
+    controller.client = MagicMock()
+    controller.scroll("down", magnitude=3200)
+    controller.client.repeatKeyPress.assert_called_once_with("pgdn", 8)
+    controller.client.keyPress.assert_not_called()
+
+    print("  ✓ Scroll sent in a single batched call")
+
+
+def test_batched_double_click():
+    """Test that a double-click is sent as one move plus two clicks."""
+    print("\n=== Testing Batched Double-Click ===")
 
+    protocol = BatchingVNCClient()
+    protocol.factory = BatchingVNCFactory()
+    protocol.pointerEvent = MagicMock()
 
-def test_vnc_connection(vnc_server: str, password: str | None = None):
-    """Test VNC connection and basic operations."""
-    print(f"\n=== Testing VNC Connection to {vnc_server} ===")
+    protocol.doubleClick(10, 20)
+
+    masks = [call.kwargs["buttonmask"] for call in protocol.pointerEvent.call_args_list[1:]]
+    assert protocol.pointerEvent.call_args_list[0].args[:2] == (10, 20), "Should move first"
+    assert masks == [1, 0, 1, 0], "Should press and release twice"
+
+    print("  ✓ Double-click sent in a single batched call")
+
+
+def test_redundant_moves_skipped():
+    """Test that clicking where the pointer already is sends no extra move."""
+    print("\n=== Testing Redundant Pointer Moves ===")
 
     controller = VNCController()
+    controller.client = MagicMock()
+
+    controller.click(10, 20)
+    controller.click(10, 20)
+    controller.move(10, 20)
+    assert controller.client.mouseMove.call_count == 1, "Should move only once"
+    assert controller.client.mousePress.call_count == 2, "Should still click twice"
+
+    controller.double_click(30, 40)
+    controller.click(30, 40)
+    assert controller.client.mouseMove.call_count == 1, "double_click leaves pointer at target"
+
+    controller.click(50, 60)
+    controller.client.mouseMove.assert_called_with(50, 60)
+
+    print("  ✓ Redundant pointer moves skipped")
+
+
+def test_action_coordinates():
+    """Test that actions map normalized coordinates like denorm_x/denorm_y."""
+    print("\n=== Testing Action Coordinate Mapping ===")
+
+    controller = make_controller(Image.new("RGB", (1920, 1080)))
+    controller._set_screen_size((1920, 1080))
+
+    for norm in (0, 1, 499, 500, 999):
+        assert controller._to_pixels(norm, norm) == (denorm_x(norm, 1920), denorm_y(norm, 1080))
+    assert controller._to_pixels(500.0, 1000) == (960, 1080), "Should handle out-of-table values"
+
+    result = controller.execute_action("hover_at", {"x": 999, "y": 500})
+    assert result.success, "hover_at should succeed"
+    controller.client.mouseMove.assert_called_once_with(1918, 540)
+
+    print("  ✓ Action coordinates mapped correctly")
+
+
+def test_unsupported_action_reuses_screenshot():
+    """Test that browser-only actions skip the post-action capture."""
+    print("\n=== Testing Unsupported Action Short-Circuit ===")
 
+    controller = make_controller(Image.new("RGB", (320, 200)))
+    screenshot = controller.screenshot_png()
+
+    result = controller.execute_action("open_web_browser", {})
+
+    assert not result.success, "Unsupported action should not report success"
+    assert result.screenshot_png is screenshot, "Should reuse the cached screenshot"
+    assert controller.client.snapshotScreen.call_count == 1, "Should not capture again"
+
+    print("  ✓ Unsupported action answered from cached screenshot")
+
+
+# Background screenshot writes, joined before the controller disconnects
+_pending_writes: list[threading.Thread] = []
+
+
+def connect_controller(vnc_server: str, password: str | None) -> VNCController:
+    """Connect a controller to the given VNC server."""
+    logger.info("=== Testing VNC Connection to %s ===", vnc_server)
+    controller = VNCController()
+    logger.info("  Connecting...")
+    controller.connect(vnc_server, password)
+    logger.info("  ✓ Connected successfully")
+    return controller
+
+
+def disconnect_controller(controller: VNCController) -> None:
+    """Wait for pending screenshot writes, then disconnect."""
+    for writer in _pending_writes:
+        writer.join()
+    _pending_writes.clear()
+    logger.info("  Disconnecting...")
+    controller.disconnect()
+    logger.info("  ✓ Disconnected")
+
+
+@pytest.fixture(scope="module")
+def controller():
+    """Controller connected once for all connection tests; skips without a VNC server.
+
+    The server and password come from TEST_VNC_SERVER and TEST_VNC_PASSWORD
+    (defaults match docker-compose).
+    """
+    vnc_server = os.getenv("TEST_VNC_SERVER", "localhost::5901")
     try:
-        # Test connection
-        print("  Connecting...")
-        controller.connect(vnc_server, password)
-        print("  ✓ Connected successfully")
-
-        # Test screenshot capture
-        print("  Capturing screenshot...")
-        screenshot = controller.screenshot_png()
-        print(f"  ✓ Screenshot captured: {len(screenshot)} bytes")
-
-        # Get screen size
-        width, height = controller.get_screen_size()
-        print(f"  ✓ Screen size: {width}x{height}")
-
-        # Save screenshot for inspection
-        output_path = Path("test_screenshot.png")
-        output_path.write_bytes(screenshot)
-        print(f"  ✓ Screenshot saved to {output_path}")
-
-        # Test mouse movement to center
-        print("\n  Testing mouse movement to center...")
-        center_x = denorm_x(500, width)
-        center_y = denorm_y(500, height)
-        controller.move(center_x, center_y)
-        print(f"  ✓ Moved mouse to center ({center_x}, {center_y})")
-
-        # Test click at current position
-        print("  Testing click at center...")
-        controller.click(center_x, center_y)
-        print("  ✓ Click executed")
-
-        # Test keyboard input
-        print("  Testing keyboard input...")
-        controller.type_text("test", press_enter=False)
-        print("  ✓ Typed 'test'")
-
-        # Test key combo
-        print("  Testing key combination...")
-        controller.key_combo("ctrl+a")
-        print("  ✓ Pressed Ctrl+A")
-
-        # Test scroll
-        print("  Testing scroll down...")
-        controller.scroll("down", magnitude=400)
-        print("  ✓ Scrolled down")
+        controller = connect_controller(vnc_server, os.getenv("TEST_VNC_PASSWORD", "vncpassword"))
+    except Exception as e:
+        pytest.skip(f"No VNC server at {vnc_server}: {e}")
+    yield controller
+    disconnect_controller(controller)
 
-        # Capture final screenshot
-        print("\n  Capturing final screenshot...")
-        final_screenshot = controller.screenshot_png()
-        final_path = Path("test_screenshot_final.png")
-        final_path.write_bytes(final_screenshot)
-        print(f"  ✓ Final screenshot saved to {final_path}")
-
-        # Test execute_action wrapper
-        print("\n  Testing execute_action wrapper...")
-        result = controller.execute_action(
-            "click_at",
-            {"x": 500, "y": 500},
-        )
-        print(f"  ✓ execute_action succeeded: {result.success}")
-        if result.error:
-            print(f"    Warning: {result.error}")
 
-        print("\n✓ All VNC tests passed!")
+def screen_center(controller: VNCController) -> tuple[int, int]:
+    """Return the pixel coordinates of the screen center."""
+    width, height = controller.get_screen_size()
+    return denorm_x(500, width), denorm_y(500, height)
+
+
+def test_screenshot(controller):
+    """Test screenshot capture and screen size detection."""
+    logger.info("  Capturing screenshot...")
+    screenshot = controller.screenshot_png()
+    logger.info("  ✓ Screenshot captured: %s bytes", len(screenshot))
+    assert screenshot.startswith(b"\x89PNG"), "Screenshot should be a PNG"
+
+    width, height = controller.get_screen_size()
+    logger.info("  ✓ Screen size: %sx%s", width, height)
+    assert width > 0 and height > 0
+
+    # Save screenshot for inspection while the input tests run
+    output_path = Path("test_screenshot.png")
+    writer = threading.Thread(target=output_path.write_bytes, args=(screenshot,))
+    writer.start()
+    _pending_writes.append(writer)
+    logger.info("  ✓ Saving screenshot to %s", output_path)
 
+
+def test_move(controller):
+    """Test mouse movement to the screen center."""
+    logger.info("  Testing mouse movement to center...")
+    center_x, center_y = screen_center(controller)
+    controller.move(center_x, center_y)
+    logger.info("  ✓ Moved mouse to center (%s, %s)", center_x, center_y)
+
+
+def test_click(controller):
+    """Test a click at the screen center."""
+    logger.info("  Testing click at center...")
+    controller.click(*screen_center(controller))
+    logger.info("  ✓ Click executed")
+
+
+def test_type(controller):
+    """Test keyboard input."""
+    logger.info("  Testing keyboard input...")
+    controller.type_text("test", press_enter=False)
+    logger.info("  ✓ Typed 'test'")
+
+
+def test_key_combo(controller):
+    """Test a key combination."""
+    logger.info("  Testing key combination...")
+    controller.key_combo("ctrl+a")
+    logger.info("  ✓ Pressed Ctrl+A")
+
+
+def test_scroll(controller):
+    """Test scrolling down."""
+    logger.info("  Testing scroll down...")
+    controller.scroll("down", magnitude=400)
+    logger.info("  ✓ Scrolled down")
+
+
+def test_execute_action(controller):
+    """Test the execute_action wrapper."""
+    logger.info("  Testing execute_action wrapper...")
+    result = controller.execute_action("click_at", {"x": 500, "y": 500})
+    logger.info("  ✓ execute_action succeeded: %s", result.success)
+    if result.error:
+        logger.warning("    Warning: %s", result.error)
+    assert result.success
+
+
+CONNECTION_TESTS = (
+    test_screenshot,
+    test_move,
+    test_click,
+    test_type,
+    test_key_combo,
+    test_scroll,
+)
+
+
+def run_connection_tests(vnc_server: str, password: str | None, save_final: bool) -> bool:
+    """Run the connection tests on one controller, as the script entry point does.
+
+    The final screenshot is only captured and saved when save_final is set.
+    """
+    try:
+        controller = connect_controller(vnc_server, password)
     except Exception as e:
-        print(f"\n✗ Test failed: {e}")
-        import traceback
+        logger.exception("✗ Test failed: %s", e)
+        return False
+
+    try:
+        for test in CONNECTION_TESTS:
+            test(controller)
+
+        # Capture final screenshot
+        if save_final:
+            logger.info("  Capturing final screenshot...")
+            final_path = Path("test_screenshot_final.png")
+            final_path.write_bytes(controller.screenshot_png())
+            logger.info("  ✓ Final screenshot saved to %s", final_path)
+
+        test_execute_action(controller)
+        logger.info("✓ All VNC tests passed!")
 
-        traceback.print_exc()
+    except Exception as e:
+        logger.exception("✗ Test failed: %s", e)
         return False
 
     finally:
-        print("\n  Disconnecting...")
-        controller.disconnect()
-        print("  ✓ Disconnected")
+        disconnect_controller(controller)
 
     return True
 
@@ -158,15 +497,44 @@ def main():
         action="store_true",
         help="Skip connection tests (only test denormalization)",
     )
+    parser.add_argument(
+        "--save-final",
+        action="store_true",
+        help="Also capture and save a screenshot after the input tests",
+    )
 
     args = parser.parse_args()
 
-    # Always test denormalization (no VNC required)
-    test_denormalization()
+    # Always test denormalization and framebuffer encoding (no VNC required)
+    print("\n=== Testing Coordinate Denormalization ===")
+    for case in DENORMALIZATION_CASES:
+        test_denormalization(*case.values)
+    print("  ✓ All denormalization tests passed")
+    test_screenshot_from_framebuffer()
+    test_incremental_screenshots()
+    test_capture_snapshots_framebuffer()
+    test_unchanged_screenshot_not_reencoded()
+    test_error_screenshot()
+    test_refresh_size()
+    test_batched_typing()
+    test_batched_scroll()
+    test_batched_double_click()
+    test_redundant_moves_skipped()
+    test_action_coordinates()
+    test_unsupported_action_reuses_screenshot()
 
     # Test VNC connection if not skipped
     if not args.skip_connection:
-        success = test_vnc_connection(args.vnc, args.password)
+        # Buffer the connection test's progress and write it out once at the end
+        handler = logging.handlers.MemoryHandler(
+            capacity=1000, target=logging.StreamHandler(sys.stdout)
+        )
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        try:
+            success = run_connection_tests(args.vnc, args.password, save_final=args.save_final)
+        finally:
+            handler.close()
         sys.exit(0 if success else 1)
     else:
         print("\n(Skipping VNC connection tests)")